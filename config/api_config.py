@@ -16,17 +16,66 @@ class APIConfig:
     API_KEY_TEAM_2: str = os.getenv("JETBRAINS_API_KEY_TEAM_2", "")
     CUSTOMER_CODE: str = os.getenv("JETBRAINS_CUSTOMER_CODE", "")
     
+    # "http" talks to BASE_URL; "inmemory" serves the license endpoints from utils/inmemory_transport.py
+    TRANSPORT: str = os.getenv("JETBRAINS_API_TRANSPORT", "http").lower()
+    
+    if TRANSPORT == "inmemory":
+        # The in-memory model accepts whatever keys are configured, so credentials are optional
+        API_KEY = API_KEY or "inmemory-api-key"
+        API_KEY_TEAM_1 = API_KEY_TEAM_1 or "inmemory-api-key-team-1"
+        API_KEY_TEAM_2 = API_KEY_TEAM_2 or "inmemory-api-key-team-2"
+        CUSTOMER_CODE = CUSTOMER_CODE or "inmemory-customer"
+    
     if not API_KEY:
         raise ValueError("JETBRAINS_API_KEY environment variable is required")
     if not CUSTOMER_CODE:
         raise ValueError("JETBRAINS_CUSTOMER_CODE environment variable is required")
     
     TIMEOUT: int = 30
+    CONNECT_TIMEOUT: int = 5
+    # Overall budget for one logical call, including urllib3 retries and backoff
+    OPERATION_DEADLINE: int = 60
     MAX_RETRIES: int = 3
     RETRY_DELAY: int = 1
+    # Connections kept per host; thread-safe clients share one pool across threads
+    POOL_MAXSIZE: int = 32
+    
+    # Keep-alive connections opened per client pool before the first request
+    WARM_CONNECTIONS: int = int(os.getenv("JETBRAINS_WARM_CONNECTIONS", "2"))
+    DNS_CACHE_TTL: int = 300
+    
+    # Opt-in hedging of idempotent GETs: a second request goes out when the first is slower
+    # than the endpoint's HEDGE_PERCENTILE latency; hedges are capped at HEDGE_MAX_EXTRA_RATIO of requests
+    HEDGE_READS: bool = os.getenv("JETBRAINS_HEDGE_READS", "false").lower() == "true"
+    HEDGE_PERCENTILE: float = 95
+    HEDGE_MAX_EXTRA_RATIO: float = 0.05
+    HEDGE_DEFAULT_DELAY: float = 1.0
+    
+    # Return APIResult wrappers (body decoded once, typed error codes) instead of raw responses
+    TYPED_RESULTS: bool = os.getenv("JETBRAINS_TYPED_RESULTS", "false").lower() == "true"
+    
+    # On-disk inventory snapshot shared by all local test processes; it is re-fetched once older than MAX_AGE seconds
+    INVENTORY_SNAPSHOT_PATH: str = os.getenv("JETBRAINS_INVENTORY_SNAPSHOT", "reports/inventory_snapshot.db")
+    INVENTORY_SNAPSHOT_MAX_AGE: int = int(os.getenv("JETBRAINS_INVENTORY_SNAPSHOT_MAX_AGE", "300"))
     
     TEST_EMAIL_DOMAIN: str = "@jetbrains-test.com"
     
+    # Opt-in background replenisher for TEAM_IDS: a team below LOW_WATERMARK available licenses is topped up to
+    # HIGH_WATERMARK by revoking test-owned assignments older than STALE_AFTER seconds or moving spare licenses
+    # from the other teams
+    LICENSE_POOL_REPLENISH: bool = os.getenv("JETBRAINS_LICENSE_POOL_REPLENISH", "false").lower() == "true"
+    LICENSE_POOL_LOW_WATERMARK: int = int(os.getenv("JETBRAINS_LICENSE_POOL_LOW_WATERMARK", "3"))
+    LICENSE_POOL_HIGH_WATERMARK: int = int(os.getenv("JETBRAINS_LICENSE_POOL_HIGH_WATERMARK", "6"))
+    LICENSE_POOL_INTERVAL: int = 30
+    LICENSE_POOL_STALE_AFTER: int = int(os.getenv("JETBRAINS_LICENSE_POOL_STALE_AFTER", "300"))
+    
+    # Multi-tenant fan-out (utils/multi_tenant.py): JSON file of tenant credentials, and the request budget
+    # of each tenant (requests per second, with bursts of up to TENANT_BURST) and its in-flight operations
+    TENANTS_FILE: str = os.getenv("JETBRAINS_TENANTS_FILE", "")
+    TENANT_RATE_LIMIT: float = float(os.getenv("JETBRAINS_TENANT_RATE_LIMIT", "10"))
+    TENANT_BURST: int = 10
+    TENANT_CONCURRENCY: int = 4
+    
     TEAM_IDS: dict = {
         "Team 1": 2573297,
         "Team 2": 2717496
@@ -42,6 +91,15 @@ class EndpointsConfig:
     GET_LICENSES = "/customer/licenses"
     GET_TEAM_LICENSES = "/customer/teams/{team_id}/licenses"
     REVOKE_LICENSE = "/customer/licenses/revoke"
+    
+    # (connect, read) timeouts per endpoint; endpoints not listed use CONNECT_TIMEOUT / TIMEOUT
+    TIMEOUTS = {
+        ASSIGN_LICENSE: (5, 15),
+        CHANGE_LICENSE_TEAM: (5, 30),
+        GET_LICENSES: (5, 30),
+        GET_TEAM_LICENSES: (5, 20),
+        REVOKE_LICENSE: (5, 15),
+    }
 
 
 class HTTPStatusCodes:
@@ -1,6 +1,7 @@
 """
 Shared pytest fixtures for all test suites
 """
+import os
 import sys
 from pathlib import Path
 import time
@@ -14,36 +15,100 @@ import pytest
 from utils.api_client import LicenseAPIClient
 from config.api_config import config
 from utils.test_helpers import test_data_generator
+from utils.connection_warmup import DNSCache
+from utils.inmemory_transport import InMemoryLicenseAdapter, LicenseModel
+from utils.inventory_snapshot import InventorySnapshot
+from utils.inventory_sync import InventorySync
+from utils.license_pool import LicensePoolReplenisher
+
+pytest_plugins = ["utils.duration_scheduler", "utils.timing_db", "utils.profiling", "utils.tracing_plugin", "utils.impact_selection", "utils.results_stream"]
+
+
+@pytest.fixture(scope="session", autouse=True)
+def dns_cache():
+    """ Process-wide DNS cache so each worker resolves the API host once """
+    cache = DNSCache(ttl=config.DNS_CACHE_TTL).install()
+    yield cache
+    cache.uninstall()
+
+
+@pytest.fixture(scope="session")
+def inventory_snapshot(license_client):
+    """ Inventory shared by all local workers: whichever worker finds it stale fetches it, the rest just read it """
+    snapshot = license_client.open_inventory_snapshot(config.INVENTORY_SNAPSHOT_PATH, config.INVENTORY_SNAPSHOT_MAX_AGE)
+    yield snapshot
+    if snapshot.consumed:
+        # Report the real state of consumed licenses, so the next run can claim the ones left unassigned
+        InventorySync(snapshot).refresh(license_client.get_license_inventory)
+    snapshot.close()
+
+
+@pytest.fixture(scope="session")
+def snapshot_owner():
+    """ Identifies this process in snapshot claims """
+    return f"{os.getenv('PYTEST_XDIST_WORKER', 'master')}:{os.getpid()}"
+
+
+@pytest.fixture(scope="session")
+def license_pool(inventory_snapshot):
+    """ Keeps TEAM_IDS teams stocked with assignable licenses; None when replenishment is disabled """
+    if not config.LICENSE_POOL_REPLENISH:
+        yield None
+        return
+    
+    # Own client and snapshot connection: the background thread must not share the test thread's
+    watermarks = {
+        team_id: (config.LICENSE_POOL_LOW_WATERMARK, config.LICENSE_POOL_HIGH_WATERMARK)
+        for team_id in config.TEAM_IDS.values()
+    }
+    snapshot = InventorySnapshot(inventory_snapshot.path, source=inventory_snapshot.source)
+    pool_client = LicenseAPIClient()
+    pool = LicensePoolReplenisher(
+        pool_client, watermarks, config.LICENSE_POOL_INTERVAL, InventorySync(snapshot), config.LICENSE_POOL_STALE_AFTER
+    )
+    # One background loop per run is enough; other xdist workers only top up on demand
+    if os.getenv("PYTEST_XDIST_WORKER", "gw0") == "gw0":
+        pool.start()
+    yield pool
+    pool.stop()
+    pool_client.close()
+    snapshot.close()
+    pool.raise_failures()
 
 
 @pytest.fixture()
-def available_license_id():
+def available_license_id(inventory_snapshot, snapshot_owner):
     try:
-        license_client = LicenseAPIClient()
-        license_id = license_client.get_available_license()
-        return license_id
+        license_id = inventory_snapshot.claim_available(owner=snapshot_owner)[0]
     except IndexError:
         error_msg = "Failed to access license from list - list appears to be empty"
         pytest.skip(error_msg)
     except Exception as e:
         error_msg = f"Failed to get available license: {str(e)}"
         pytest.fail(error_msg)
+    yield license_id
+    # The test may have assigned or moved it
+    inventory_snapshot.mark_consumed([license_id])
 
 
 @pytest.fixture()
-def available_licenses_from_team(request):
+def available_licenses_from_team(request, inventory_snapshot, snapshot_owner, license_pool):
     # Usage: @pytest.mark.parametrize("available_licenses_from_team", [(team_id, count)], indirect=True)
     try:
         team_id, license_count = request.param
-        license_client = LicenseAPIClient()
         
-        available_licenses = license_client.get_team_available_licenses(team_id=str(team_id))
+        available_count = inventory_snapshot.count_available(team_id=team_id)
+        if available_count < license_count and license_pool is not None:
+            available_count = license_pool.ensure(team_id, license_count)
         
-        if len(available_licenses) < license_count:
-            pytest.skip(f"Not enough available licenses in team {team_id}. Required: {license_count}, Available: {len(available_licenses)}")
+        if available_count < license_count:
+            pytest.skip(f"Not enough available licenses in team {team_id}. Required: {license_count}, Available: {available_count}")
         
-        selected_licenses = available_licenses[:license_count]
-        return selected_licenses
+        selected_licenses = inventory_snapshot.claim_available(license_count, team_id=team_id, owner=snapshot_owner)
+        if len(selected_licenses) < license_count:
+            # Hold none rather than some while skipping
+            inventory_snapshot.release(selected_licenses, snapshot_owner)
+            pytest.skip(f"Not enough unclaimed licenses in team {team_id}. Required: {license_count}, Claimed: {len(selected_licenses)}")
         
     except (ValueError, TypeError) as e:
         error_msg = f"Invalid parameters for available_licenses_from_team: {request.param}. Expected (team_id, license_count)"
@@ -54,6 +119,8 @@ def available_licenses_from_team(request):
     except Exception as e:
         error_msg = f"Failed to get available licenses from team {team_id}: {str(e)}"
         pytest.fail(error_msg)
+    yield selected_licenses
+    inventory_snapshot.mark_consumed(selected_licenses)
 
 
 @pytest.fixture()
@@ -65,48 +132,65 @@ def random_team_id():
 def license_client():
     """ Session-scoped license client for all tests"""
     license_client = LicenseAPIClient()
-    return license_client
-    #Could use yield to close the session after ALL tests complete:
-    #yield license_client
-    #license_client.session.close()
+    license_client.warm_up()
+    yield license_client
+    license_client.close()
 
 @pytest.fixture(scope="session")
 def license_client_team_1():
     """ Session-scoped license client for Team 1 with team-specific API key """
-    license_client = LicenseAPIClient()
-    
     team_1_api_key = config.API_KEY_TEAM_1
     if not team_1_api_key:
         pytest.skip("JETBRAINS_API_KEY_TEAM_1 environment variable not set")
     
-    license_client.session.headers.update({"X-Api-Key": team_1_api_key})
-    return license_client
+    license_client = LicenseAPIClient(api_key=team_1_api_key)
+    license_client.warm_up()
+    yield license_client
+    license_client.close()
 
 @pytest.fixture(scope="session")
 def license_client_team_2():
     """ Session-scoped license client for Team 2 with team-specific API key """
-    license_client = LicenseAPIClient()
-    
     team_2_api_key = config.API_KEY_TEAM_2
     if not team_2_api_key:
         pytest.skip("JETBRAINS_API_KEY_TEAM_2 environment variable not set")
     
-    license_client.session.headers.update({"X-Api-Key": team_2_api_key})
-    return license_client    
+    license_client = LicenseAPIClient(api_key=team_2_api_key)
+    license_client.warm_up()
+    yield license_client
+    license_client.close()
 
 @pytest.fixture(scope="session")
 def unauthorized_license_client():
-    """nSession-scoped unauthorized client """
-    license_client = LicenseAPIClient()
-    license_client.session.headers = {}
-    return license_client
+    """ Session-scoped unauthorized client (no X-Api-Key header) """
+    license_client = LicenseAPIClient(api_key="")
+    yield license_client
+    license_client.close()
 
 @pytest.fixture(scope="session")
 def invalid_api_key_license_client():
     """ Session-scoped invalid API key client """
-    license_client = LicenseAPIClient()
-    license_client.session.headers.update({"X-Api-Key": "invalid_api_key_12345"})
-    return license_client
+    license_client = LicenseAPIClient(api_key="invalid_api_key_12345")
+    yield license_client
+    license_client.close()
+
+
+@pytest.fixture()
+def license_model():
+    """ Fresh in-memory organization for unit tests: 8 licenses per TEAM_IDS team, 2 of them assigned """
+    return LicenseModel(licenses_per_team=8, assigned_per_team=2)
+
+@pytest.fixture()
+def model_client(request, license_model):
+    """
+    Client whose calls are served by license_model instead of the API
+    Usage: @pytest.mark.parametrize("model_client", [{"thread_safe": True}], indirect=True) for other client options
+    """
+    options = {"hedge_reads": False, **getattr(request, "param", {})}
+    license_client = LicenseAPIClient(**options)
+    license_client.session.mount(config.BASE_URL, InMemoryLicenseAdapter(config.BASE_URL, license_model))
+    yield license_client
+    license_client.close()
 
 
 @pytest.fixture(autouse=True)
@@ -0,0 +1,86 @@
+"""
+Test Cases for the thread-safe client mode
+utils/api_client.py
+"""
+import threading
+import time
+
+import pytest
+import pytest_check as check
+
+from config.api_config import config
+from utils.api_client import LicenseAPIClient
+from utils.deadline import current_deadline, deadline_scope
+
+
+@pytest.mark.parametrize("model_client", [{"thread_safe": True}], indirect=True)
+class TestMapConcurrent:
+    """Test suite for map_concurrent ordering, error propagation and context"""
+
+    @pytest.mark.unit
+    def test_results_keep_input_order(self, model_client):
+        """
+        Test Case: Map over items whose calls finish in reverse order
+
+        Expected Result: Results come back in input order, computed on several threads
+        """
+        threads = set()
+
+        def square(item):
+            time.sleep((5 - item) * 0.01)
+            threads.add(threading.current_thread().name)
+            return item * item
+
+        check.equal(model_client.map_concurrent(square, range(6), max_workers=6), [0, 1, 4, 9, 16, 25],
+                    "Results should be in input order")
+        check.greater(len(threads), 1, "Items should run on several threads")
+
+    @pytest.mark.unit
+    def test_first_error_is_raised_after_all_items(self, model_client):
+        """
+        Test Case: Map over items where two calls fail
+
+        Expected Result: Every item is processed, then the error of the first failing item (in input
+        order) is raised
+        """
+        processed = []
+
+        def check_item(item):
+            processed.append(item)
+            if item in (2, 4):
+                time.sleep(0.05 if item == 2 else 0)
+                raise ValueError(f"bad item {item}")
+            return item
+
+        with pytest.raises(ValueError, match="bad item 2"):
+            model_client.map_concurrent(check_item, range(6), max_workers=3)
+        check.equal(sorted(processed), list(range(6)), "All items should be processed")
+
+    @pytest.mark.unit
+    def test_workers_see_the_callers_deadline(self, model_client):
+        """
+        Test Case: Map inside a deadline scope
+
+        Expected Result: Every worker sees the caller's deadline, and API calls made there succeed
+        """
+        with deadline_scope(30) as deadline:
+            seen = model_client.map_concurrent(lambda _: current_deadline(), range(4))
+            team_ids = [str(team_id) for team_id in config.TEAM_IDS.values()]
+            inventories = model_client.map_concurrent(lambda team_id: model_client.get_team_licenses(team_id=team_id), team_ids)
+        check.is_true(all(worker_deadline is deadline for worker_deadline in seen), "Workers should share the deadline")
+        check.is_true(all(response.status_code == 200 for response in inventories), "Calls from workers should succeed")
+
+
+class TestThreadSafeMode:
+    """Test suite for the guard on clients that are not thread-safe"""
+
+    @pytest.mark.unit
+    def test_map_concurrent_requires_thread_safe_client(self):
+        """
+        Test Case: Call map_concurrent on a client created without thread_safe=True
+
+        Expected Result: ValueError, before any work is submitted
+        """
+        with LicenseAPIClient(hedge_reads=False) as client:
+            with pytest.raises(ValueError, match="thread_safe=True"):
+                client.map_concurrent(str, range(3))
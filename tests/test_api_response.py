@@ -0,0 +1,126 @@
+"""
+Test Cases for the typed, lazily-decoded response wrapper
+utils/api_response.py
+"""
+import json
+
+import pytest
+import pytest_check as check
+import requests
+
+from config.api_config import config, error_codes
+from utils.api_response import APIResult, ErrorCode
+from utils.license_models import LicenseInventory
+
+
+LICENSES = [
+    {"licenseId": "L1", "team": {"id": 1, "name": "Team 1"}, "product": {"code": "II"}, "isAvailableToAssign": True},
+    {"licenseId": "L2", "team": {"id": 1, "name": "Team 1"}, "product": {"code": "PC"}, "isAvailableToAssign": False,
+     "assignee": {"email": "user@example.com"}},
+]
+
+
+def make_response(status_code, body):
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = body if isinstance(body, bytes) else json.dumps(body).encode()
+    return response
+
+
+def count_decodes(monkeypatch, response):
+    """ Count calls to response.json(); returns the list the calls are appended to """
+    decodes = []
+    decode = response.json
+
+    def counting_json(**kwargs):
+        decodes.append(kwargs)
+        return decode(**kwargs)
+
+    monkeypatch.setattr(response, "json", counting_json)
+    return decodes
+
+
+class TestAPIResult:
+    """Test suite for cached decoding, typed error codes and inventory views"""
+
+    @pytest.mark.unit
+    def test_body_is_decoded_once(self, monkeypatch):
+        """
+        Test Case: Read json(), the error code and the error description of an error response
+
+        Expected Result: The body is decoded a single time and every accessor sees the same value
+        """
+        response = make_response(400, error_codes.INVALID_TOKEN)
+        decodes = count_decodes(monkeypatch, response)
+        result = APIResult(response)
+
+        check.equal(result.json(), error_codes.INVALID_TOKEN, "The body should be decoded")
+        check.equal(result.error_code, ErrorCode.INVALID_TOKEN, "The code should map to ErrorCode")
+        check.is_true(result.matches(error_codes.INVALID_TOKEN), "The error body should match its ErrorCodes entry")
+        check.is_true(result.json() is result.json(), "The same decoded value should be returned")
+        check.equal(len(decodes), 1, "The body should be decoded only once")
+
+    @pytest.mark.unit
+    def test_decoding_failure_is_cached(self, monkeypatch):
+        """
+        Test Case: Read json() twice from a response whose body is not JSON
+
+        Expected Result: Both calls raise ValueError from a single decoding attempt, and the error
+        accessors report no code instead of raising
+        """
+        response = make_response(500, b"<html>Internal error</html>")
+        decodes = count_decodes(monkeypatch, response)
+        result = APIResult(response)
+
+        for _ in range(2):
+            with pytest.raises(ValueError):
+                result.json()
+        check.is_none(result.error_code, "A body that is not JSON has no error code")
+        check.equal(len(decodes), 1, "The failed decoding should not be retried")
+
+    @pytest.mark.unit
+    def test_unknown_error_code_keeps_raw_value(self):
+        """
+        Test Case: An error body with a code ErrorCodes does not know
+
+        Expected Result: error_code is None while raw_error_code keeps the code as sent
+        """
+        result = APIResult(make_response(409, {"code": "SOMETHING_NEW", "description": "new"}))
+        check.is_none(result.error_code, "An unknown code should not map to ErrorCode")
+        check.equal(result.raw_error_code, "SOMETHING_NEW", "The raw code should be kept")
+        check.equal(result.error_description, "new", "The description should be exposed")
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("decode_first", [False, True], ids=["from content", "from decoded json"])
+    def test_inventory_is_built_once(self, monkeypatch, decode_first):
+        """
+        Test Case: Build the inventory of a license list, with and without json() called first
+
+        Expected Result: The same inventory is returned on every access; after json() it is built
+        from the decoded body instead of parsing the content again
+        """
+        result = APIResult(make_response(200, LICENSES))
+        if decode_first:
+            result.json()
+            monkeypatch.setattr(LicenseInventory, "from_json", classmethod(lambda cls, content: pytest.fail("parsed again")))
+        inventory = result.inventory
+
+        check.is_true(result.inventory is inventory, "The inventory should be cached")
+        check.equal(inventory.available_ids(), ["L1"], "L1 should be available")
+        check.equal(inventory.assigned_ids(), ["L2"], "L2 should be assigned")
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("model_client", [{"typed_results": True}], indirect=True)
+    def test_typed_client_returns_results(self, model_client):
+        """
+        Test Case: Make a successful and a failing call with a typed_results client
+
+        Expected Result: Both come back as APIResult, with the failing one's error code typed
+        """
+        team_id = str(next(iter(config.TEAM_IDS.values())))
+        licenses = model_client.get_team_licenses(team_id=team_id)
+        rejected = model_client.assign_license(email=f"typed{config.TEST_EMAIL_DOMAIN}", first_name="Typed",
+                                               last_name="Result", license_id="no-such-license", team_id=int(team_id))
+        check.is_instance(licenses, APIResult, "Responses should be wrapped")
+        check.is_true(len(licenses.inventory) > 0, "The team's licenses should be listed")
+        check.is_instance(rejected.error_code, ErrorCode, f"The rejection should carry a known code: {rejected.text}")
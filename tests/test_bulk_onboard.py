@@ -0,0 +1,84 @@
+"""
+Test Cases for bulk onboarding and its resume journal
+utils/bulk_onboard.py
+"""
+import pytest
+import pytest_check as check
+
+from config.api_config import config
+from utils.bulk_onboard import BulkOnboarder, Journal
+
+
+def records(count):
+    return [{"email": f"onboard_{index}{config.TEST_EMAIL_DOMAIN}", "firstName": "Onboard", "lastName": "User"}
+            for index in range(count)]
+
+
+def completed(path):
+    journal = Journal(path)
+    journal.close()
+    return journal.completed
+
+
+class Crash(BaseException):
+    """ Stands in for the process being killed mid-run """
+
+
+@pytest.mark.parametrize("model_client", [{"thread_safe": True}], indirect=True)
+class TestBulkOnboard:
+    """Test suite for journaling outcomes as they happen and resuming from the journal"""
+
+    @pytest.mark.unit
+    def test_resume_skips_journaled_users(self, tmp_path, model_client):
+        """
+        Test Case: A journal from an earlier run lists two users as assigned; onboard five users
+
+        Expected Result: The two journaled users are skipped and only the other three get a license
+        """
+        path = tmp_path / "users.journal"
+        journal = Journal(path)
+        for record in records(2):
+            journal.record(record["email"].upper(), "assigned", licenseId="earlier")
+        journal.close()
+
+        journal = Journal(path)
+        try:
+            counts = BulkOnboarder(model_client, journal, workers=2).run(iter(records(5)))
+        finally:
+            journal.close()
+
+        check.equal(counts, {"assigned": 3, "skipped": 2, "failed": 0}, "Journaled users should be skipped")
+        check.equal(completed(path), {record["email"] for record in records(5)},
+                    "All five users should be journaled as assigned")
+
+    @pytest.mark.unit
+    def test_crash_loses_no_completed_assignment(self, tmp_path, model_client, license_model):
+        """
+        Test Case: The process dies (an exception that is not an Exception) during the third of
+        eight assignments, with more records already in flight
+
+        Expected Result: Every user who got a license is journaled as assigned, so a resumed run
+        never assigns them a second license
+        """
+        path = tmp_path / "users.journal"
+        assign_license = model_client.assign_license
+        calls = []
+
+        def assign_or_crash(**kwargs):
+            calls.append(kwargs["email"])
+            if len(calls) == 3:
+                raise Crash()
+            return assign_license(**kwargs)
+
+        model_client.assign_license = assign_or_crash
+        journal = Journal(path)
+        try:
+            with pytest.raises(Crash):
+                BulkOnboarder(model_client, journal, workers=1).run(iter(records(8)))
+        finally:
+            journal.close()
+
+        licensed = {data["assignee"]["email"] for data in license_model.licenses.values()
+                    if data["assignee"] and data["assignee"]["email"].startswith("onboard_")}
+        check.is_true(len(licensed) >= 2, f"Assignments before the crash should have been made: {sorted(licensed)}")
+        check.equal(completed(path), licensed, "Every assigned user should be in the journal")
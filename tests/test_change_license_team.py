@@ -13,12 +13,15 @@ class TestChangeLicenseTeam:
     """Test suite for license team change functionality"""
         
     @pytest.fixture
-    def valid_test_data(self, request, license_client):
+    def valid_test_data(self, request, license_client, license_pool):
         #Usage: @pytest.mark.parametrize("valid_test_data", [("Team 1", "Team 2", 3), ("Team 2", "Team 1", 3)], indirect=True)
         source_team_name, target_team_name, license_count = request.param
         source_team_id = config.TEAM_IDS[source_team_name]
         target_team_id = config.TEAM_IDS[target_team_name]
         
+        if license_pool is not None:
+            license_pool.ensure(source_team_id, license_count)
+        
         # Get all available licenses from source team
         available_licenses = license_client.get_team_available_licenses(team_id=str(source_team_id))
         
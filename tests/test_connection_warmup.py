@@ -0,0 +1,110 @@
+"""
+Test Cases for connection and DNS pre-warming
+utils/connection_warmup.py
+"""
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import pytest_check as check
+import requests
+
+from config.api_config import config
+from utils.connection_warmup import DNSCache, warm_up_pool
+from utils.inmemory_transport import InMemoryLicenseAdapter
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    """ Answers every GET with an empty 200 and keeps the connection open """
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CountingServer(ThreadingHTTPServer):
+    """ Counts accepted connections """
+
+    daemon_threads = True
+    accepted = 0
+
+    def get_request(self):
+        request = super().get_request()
+        self.accepted += 1
+        return request
+
+
+class TestConnectionWarmup:
+    """Test suite for pre-opened keep-alive connections and the DNS cache"""
+
+    @pytest.fixture()
+    def server(self):
+        server = CountingServer(("127.0.0.1", 0), KeepAliveHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+    @pytest.fixture()
+    def session(self):
+        session = requests.Session()
+        yield session
+        session.close()
+
+    @pytest.mark.unit
+    def test_requests_reuse_warmed_connections(self, server, session):
+        """
+        Test Case: Warm three connections, warm again, then send two requests
+
+        Expected Result: Three connections are opened once, the second warm-up opens none, and the
+        requests go over the warmed sockets without new connections
+        """
+        url = f"http://127.0.0.1:{server.server_port}/"
+        check.equal(warm_up_pool(session, url, 3, timeout=5), 3, "Three connections should be opened")
+        check.equal(warm_up_pool(session, url, 3, timeout=5), 0, "Open connections should not be reopened")
+        for _ in range(2):
+            check.equal(session.get(url, timeout=5).status_code, 200, "Requests should succeed")
+        check.equal(server.accepted, 3, "Requests should not open new connections")
+
+    @pytest.mark.unit
+    def test_nothing_to_warm_for_the_inmemory_transport(self, session):
+        """
+        Test Case: Warm a session whose API prefix is served by the in-memory adapter
+
+        Expected Result: No connection is opened
+        """
+        session.mount(config.BASE_URL, InMemoryLicenseAdapter(config.BASE_URL))
+        check.equal(warm_up_pool(session, config.BASE_URL, 4), 0, "Nothing should be warmed")
+
+    @pytest.mark.unit
+    def test_dns_cache_reuses_lookups_until_ttl(self, monkeypatch):
+        """
+        Test Case: Resolve the same host repeatedly through caches with a long and a zero TTL
+
+        Expected Result: The long TTL resolves once, the zero TTL every time, and uninstall
+        restores the original resolver
+        """
+        lookups = []
+
+        def resolve(host, port, family=0, type=0, proto=0, flags=0):
+            lookups.append(host)
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("127.0.0.1", port))]
+
+        monkeypatch.setattr(socket, "getaddrinfo", resolve)
+        for ttl, expected in ((60, 1), (0, 3)):
+            lookups.clear()
+            cache = DNSCache(ttl).install()
+            try:
+                for _ in range(3):
+                    socket.getaddrinfo("api.example.test", 443)
+            finally:
+                cache.uninstall()
+            check.equal(len(lookups), expected, f"Unexpected lookups with a TTL of {ttl}s")
+        check.is_true(socket.getaddrinfo is resolve, "Uninstall should restore the original resolver")
@@ -0,0 +1,156 @@
+"""
+Test Cases for deadline-aware timeouts and retries
+utils/deadline.py
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import pytest_check as check
+import requests
+from urllib3.exceptions import MaxRetryError, ReadTimeoutError
+
+from utils.api_client import LicenseAPIClient
+from utils.deadline import DeadlineRetry, DeadlineTimeout, current_deadline, deadline_scope, submit_bounded
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    """ Answers every request after server.delay seconds """
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        try:
+            self.send_response(200)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+        except OSError:
+            # The client gave up before the answer
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestDeadline:
+    """Test suite for deadline propagation, per-attempt timeouts and retries"""
+
+    @pytest.fixture()
+    def slow_server(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+        server.daemon_threads = True
+        server.delay = 0
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        yield server
+        server.shutdown()
+        server.server_close()
+
+    @pytest.mark.unit
+    def test_nested_scope_never_extends_outer_deadline(self):
+        """
+        Test Case: Open a longer deadline scope inside a shorter one
+
+        Expected Result: The inner scope keeps the outer, earlier deadline
+        """
+        with deadline_scope(1) as outer:
+            with deadline_scope(60) as inner:
+                check.is_true(inner is outer, "Inner scope should reuse the earlier outer deadline")
+                check.is_true(current_deadline() is outer, "Current deadline should be the outer one")
+        check.is_none(current_deadline(), "No deadline should be active outside the scopes")
+
+    @pytest.mark.unit
+    def test_timeout_clone_is_capped_by_remaining_budget(self):
+        """
+        Test Case: Clone a per-attempt timeout whose deadline has less time left than its timeouts
+
+        Expected Result: Connect and read timeouts of the attempt are cut to the remaining budget
+        """
+        with deadline_scope(0.5) as deadline:
+            attempt = DeadlineTimeout(5, 30, deadline).clone()
+        check.less_equal(attempt.connect_timeout, 0.5, "Connect timeout should not exceed the remaining budget")
+        check.less_equal(attempt.read_timeout, 0.5, "Read timeout should not exceed the remaining budget")
+
+        with deadline_scope(60) as deadline:
+            attempt = DeadlineTimeout(5, 30, deadline).clone()
+        check.equal((attempt.connect_timeout, attempt.read_timeout), (5, 30), "Timeouts within the budget should be kept")
+
+    @pytest.mark.unit
+    def test_retry_refused_when_backoff_overruns_deadline(self):
+        """
+        Test Case: Increment a retry whose backoff is longer than the remaining deadline
+
+        Expected Result: MaxRetryError is raised instead of sleeping past the deadline
+        """
+        retry = DeadlineRetry(total=3, backoff_factor=10)
+        error = ReadTimeoutError(None, "/", "read timed out")
+        with deadline_scope(5):
+            # The first retry has no backoff in urllib3 2; the second one waits backoff_factor * 2
+            retry = retry.increment(method="GET", url="/", error=error)
+            with pytest.raises(MaxRetryError):
+                retry.increment(method="GET", url="/", error=error)
+
+    @pytest.mark.unit
+    def test_retry_allowed_within_deadline(self):
+        """
+        Test Case: Increment a retry whose backoff fits in the remaining deadline, and one outside any deadline
+
+        Expected Result: Both return the next retry with one attempt less
+        """
+        error = ReadTimeoutError(None, "/", "read timed out")
+        with deadline_scope(60):
+            retry = DeadlineRetry(total=3, backoff_factor=0.1).increment(method="GET", url="/", error=error)
+            retry = retry.increment(method="GET", url="/", error=error)
+        check.equal(retry.total, 1, "Two retries should have been used")
+        check.equal(DeadlineRetry(total=3, backoff_factor=100).increment(method="GET", url="/", error=error).total, 2,
+                    "Without a deadline the backoff is not limited")
+
+    @pytest.mark.unit
+    def test_retried_attempts_stay_within_deadline(self, slow_server):
+        """
+        Test Case: GET with timeout=(0.5, 1.0) and deadline=1.5 against a server taking 1.5 s to answer
+
+        Expected Result: The retried attempt only gets the remaining budget, so the call fails
+        after about 1.5 s instead of 1.0 s + a full 1.0 s retry
+
+        Status Code: none (requests.exceptions.RequestException)
+        """
+        slow_server.delay = 1.5
+        client = LicenseAPIClient(base_url=f"http://127.0.0.1:{slow_server.server_port}", hedge_reads=False)
+        try:
+            start = time.monotonic()
+            with pytest.raises(requests.exceptions.RequestException):
+                client.get("/slow", timeout=(0.5, 1.0), deadline=1.5)
+            elapsed = time.monotonic() - start
+        finally:
+            client.close()
+        check.less(elapsed, 1.8, f"Call should end at its 1.5 s deadline, took {elapsed:.2f}s")
+
+    @pytest.mark.unit
+    def test_submit_bounded_caps_in_flight_and_keeps_deadline(self):
+        """
+        Test Case: Submit 20 items with at most 3 in flight on 4 workers inside a deadline scope
+
+        Expected Result: Every item completes exactly once, no more than 3 run at a time, and the
+        workers see the caller's deadline
+        """
+        lock = threading.Lock()
+        running, peak, deadlines, done = [0], [0], set(), []
+
+        def work(item):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.005)
+            with lock:
+                running[0] -= 1
+            deadlines.add(current_deadline())
+            return item * 2
+
+        with deadline_scope(60) as deadline, ThreadPoolExecutor(max_workers=4) as executor:
+            submit_bounded(executor, work, iter(range(20)), 3, lambda item, future: done.append((item, future.result())))
+        check.equal(sorted(done), [(item, item * 2) for item in range(20)], "Every item should be collected once")
+        check.less_equal(peak[0], 3, f"At most 3 items should run at once, saw {peak[0]}")
+        check.equal(deadlines, {deadline}, "Workers should run under the caller's deadline")
+
@@ -0,0 +1,102 @@
+"""
+Test Cases for longest-test-first xdist scheduling
+utils/duration_scheduler.py
+"""
+import pytest
+import pytest_check as check
+
+from utils.duration_scheduler import DurationStore, _longest_first_scheduling
+
+
+class FakeConfig:
+    """ Just enough of pytest's config for xdist's LoadScheduling with two workers """
+
+    def __init__(self, plugins=None):
+        self.plugins = plugins or {}
+        self.pluginmanager = self
+
+    def getvalue(self, name):
+        return ["2*popen"] if name == "tx" else None
+
+    def getoption(self, name):
+        return None
+
+    def get_plugin(self, name):
+        return self.plugins.get(name)
+
+
+class FakeNode:
+    """ Worker node that records the test indexes it is sent """
+
+    def __init__(self, name):
+        self.gateway = type("Gateway", (), {"id": name})()
+        self.received = []
+
+    def send_runtest_some(self, indexes):
+        self.received.extend(indexes)
+
+    def shutdown(self):
+        pass
+
+
+class FakeSelector:
+    """ Impact selector marking some tests as impacted """
+
+    def __init__(self, impacted):
+        self.impacted = set(impacted)
+
+    def priority(self, nodeid):
+        return 0 if nodeid in self.impacted else 1
+
+
+class TestLongestFirstScheduling:
+    """Test suite for the order in which tests are handed to workers"""
+
+    COLLECTION = ["test_a", "test_b", "test_c", "test_d", "test_e", "test_f"]
+    DURATIONS = {"test_a": [1.0], "test_b": [5.0], "test_c": [3.0], "test_d": [0.5], "test_e": [4.0]}
+
+    @pytest.fixture()
+    def store(self, tmp_path):
+        store = DurationStore(tmp_path / "durations.json")
+        store.history = {nodeid: list(durations) for nodeid, durations in self.DURATIONS.items()}
+        return store
+
+    def schedule(self, store, plugins=None):
+        pytest.importorskip("xdist")
+        scheduler = _longest_first_scheduling(FakeConfig(plugins), None, store)
+        nodes = [FakeNode("gw0"), FakeNode("gw1")]
+        for node in nodes:
+            scheduler.add_node(node)
+            scheduler.add_node_collection(node, self.COLLECTION)
+        scheduler.schedule()
+        return scheduler, nodes
+
+    def sent(self, scheduler, node):
+        return [scheduler.collection[index] for index in node.received]
+
+    @pytest.mark.unit
+    def test_longest_tests_start_first_on_different_workers(self, store):
+        """
+        Test Case: Schedule six tests with known durations on two workers
+
+        Expected Result: The two longest tests start first, one per worker, and each worker
+        then holds the next longest; the unrecorded test is estimated at the median
+        """
+        scheduler, (gw0, gw1) = self.schedule(store)
+        check.equal(self.sent(scheduler, gw0), ["test_b", "test_c"], "gw0 should get the 1st and 3rd longest")
+        check.equal(self.sent(scheduler, gw1), ["test_e", "test_f"], "gw1 should get the 2nd and 4th longest")
+        check.equal([scheduler.collection[index] for index in scheduler.pending], ["test_a", "test_d"],
+                    "Remaining tests should be queued longest first")
+
+    @pytest.mark.unit
+    def test_impacted_tests_go_first(self, store):
+        """
+        Test Case: Schedule with --impacted marking the two shortest tests as impacted
+
+        Expected Result: Impacted tests are handed out before longer, unimpacted ones
+        """
+        selector = FakeSelector({"test_a", "test_d"})
+        scheduler, (gw0, gw1) = self.schedule(store, {"impact-selector": selector})
+        check.equal(self.sent(scheduler, gw0)[0], "test_a", "gw0 should start with the longest impacted test")
+        check.equal(self.sent(scheduler, gw1)[0], "test_d", "gw1 should start with the other impacted test")
+        check.equal(self.sent(scheduler, gw0)[1], "test_b", "Unimpacted tests follow, longest first")
@@ -0,0 +1,126 @@
+"""
+Test Cases for payload fuzzing
+utils/fuzzing.py
+"""
+import json
+
+import pytest
+import pytest_check as check
+
+from config.api_config import config
+from utils.fuzzing import Fuzzer, FuzzCase, Mutation, build_seeds, main
+from utils.inmemory_transport import LicenseModel
+
+
+SEEDS = {
+    "assign": {
+        "contact": {"email": "user@jetbrains-test.com", "firstName": "Test", "lastName": "User"},
+        "licenseId": "L1",
+        "sendEmail": False,
+    },
+}
+
+FINDING = ("assign", 500, "-")
+REJECTED = ("assign", 400, "INVALID_CONTACT_EMAIL")
+
+
+class TestFuzzerMinimize:
+    """Test suite for shrinking findings to the fewest and shortest mutations"""
+
+    @pytest.fixture()
+    def fuzzer(self):
+        """ A fuzzer whose 'server' fails with 500 whenever licenseId is a string of at least 4 characters """
+        fuzzer = Fuzzer(client=None, seeds=SEEDS, seed=1)
+
+        def signature(case):
+            payload = json.loads(case.render(SEEDS[case.target]))
+            license_id = payload.get("licenseId")
+            return FINDING if isinstance(license_id, str) and len(license_id) >= 4 else REJECTED
+
+        fuzzer.signature = signature
+        return fuzzer
+
+    @pytest.mark.unit
+    def test_minimize_drops_irrelevant_mutations_and_shortens_values(self, fuzzer):
+        """
+        Test Case: Minimize a finding made of three mutations, only one of which matters
+
+        Expected Result: Only the licenseId mutation is left, its value halved down to the
+        shortest length that still reproduces the finding
+        """
+        case = FuzzCase("assign", [
+            Mutation(Mutation.DELETE, ("sendEmail",)),
+            Mutation(Mutation.SET, ("licenseId",), "x" * 64),
+            Mutation(Mutation.SET, ("contact", "firstName"), 1),
+        ])
+        minimized = fuzzer.minimize(case, FINDING)
+        check.equal(len(minimized.mutations), 1, f"Expected one mutation, got {minimized.mutations}")
+        mutation = minimized.mutations[0]
+        check.equal((mutation.kind, mutation.path), (Mutation.SET, ("licenseId",)), "The licenseId mutation should remain")
+        check.equal(mutation.value, "xxxx", "Value should be halved while the finding still reproduces")
+        check.equal(fuzzer.signature(minimized), FINDING, "Minimized case should reproduce the finding")
+
+    @pytest.mark.unit
+    def test_minimize_keeps_single_mutation(self, fuzzer):
+        """
+        Test Case: Minimize a finding that is already a single, short mutation
+
+        Expected Result: The case comes back unchanged
+        """
+        case = FuzzCase("assign", [Mutation(Mutation.SET, ("licenseId",), "abcd")])
+        minimized = fuzzer.minimize(case, FINDING)
+        check.equal([(m.kind, m.path, m.value) for m in minimized.mutations], [(Mutation.SET, ("licenseId",), "abcd")],
+                    "A 1-minimal case should not change")
+
+    @pytest.mark.unit
+    def test_render_applies_mutations_to_a_copy(self):
+        """
+        Test Case: Render a case with a delete and a nested set
+
+        Expected Result: The body has both changes and the seed is left untouched
+        """
+        case = FuzzCase("assign", [
+            Mutation(Mutation.DELETE, ("sendEmail",)),
+            Mutation(Mutation.SET, ("contact", "email"), ""),
+        ])
+        payload = json.loads(case.render(SEEDS["assign"]))
+        check.is_not_in("sendEmail", payload, "Deleted field should be gone")
+        check.equal(payload["contact"]["email"], "", "Nested field should be set")
+        check.equal(SEEDS["assign"]["contact"]["email"], "user@jetbrains-test.com", "Seed should not be modified")
+
+
+class TestFuzzingSafety:
+    """Test suite for keeping the fuzzer away from real users and the production API"""
+
+    @pytest.fixture()
+    def license_model(self):
+        """ An organization whose first team, outside TEAM_IDS, holds real users' licenses """
+        return LicenseModel(teams={"Real users": 1, **config.TEAM_IDS}, licenses_per_team=4, assigned_per_team=2)
+
+    @pytest.mark.unit
+    def test_seeds_only_use_team_ids_licenses(self, model_client, license_model):
+        """
+        Test Case: Build seeds for an organization with another team listed before the TEAM_IDS teams
+
+        Expected Result: Both seeds only reference licenses of the TEAM_IDS teams
+        """
+        seeds = build_seeds(model_client)
+        team_ids = set(config.TEAM_IDS.values())
+        license_ids = [seeds["assign"]["licenseId"], *seeds["change_team"]["licenseIds"]]
+        teams = {license_id: license_model.licenses[license_id]["team"]["id"] for license_id in license_ids}
+        check.is_true(set(teams.values()) <= team_ids, f"Seeds should only use TEAM_IDS licenses, got {teams}")
+        check.is_false(license_model.licenses[seeds["assign"]["licenseId"]]["isAvailableToAssign"],
+                       "The assign seed should target an already assigned license")
+
+    @pytest.mark.unit
+    def test_target_is_required(self, capsys):
+        """
+        Test Case: Run the fuzzer without --standin or --base-url
+
+        Expected Result: The command is rejected instead of fuzzing the default API
+        """
+        with pytest.raises(SystemExit) as exit_info:
+            main(["--cases", "1"])
+        check.equal(exit_info.value.code, 2, "argparse should reject the command line")
+        check.is_in("--standin", capsys.readouterr().err, "The error should name the target options")
+
@@ -0,0 +1,118 @@
+"""
+Test Cases for hedged reads
+utils/hedging.py
+"""
+import threading
+import time
+
+import pytest
+import pytest_check as check
+
+from utils.hedging import HedgeBudget, HedgedRequester
+
+
+class Reply:
+    """ Stands in for a requests.Response; losing replies get closed """
+
+    def __init__(self, source: str):
+        self.source = source
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class SlowThenFast:
+    """ send() callable whose first call is slow and every later call fast """
+
+    def __init__(self, slow: float):
+        self.slow = slow
+        self.calls = 0
+        self.finished = threading.Event()
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        if call == 1:
+            time.sleep(self.slow)
+            self.finished.set()
+            return Reply("primary")
+        return Reply("hedge")
+
+
+class TestHedging:
+    """Test suite for the hedge budget, hedged execution and the latency window"""
+
+    @pytest.fixture()
+    def requester(self):
+        requester = HedgedRequester(delay_percentile=95, max_extra_ratio=0.1, default_delay=0.01, min_samples=1)
+        yield requester
+        requester.close()
+
+    @pytest.mark.unit
+    def test_budget_limits_hedges_to_ratio(self):
+        """
+        Test Case: Spend hedge tokens of a budget allowing 25% extra requests
+
+        Expected Result: One hedge is allowed up front, the next only after four more requests,
+        and tokens never exceed the burst
+        """
+        budget = HedgeBudget(max_extra_ratio=0.25, burst=2)
+        check.is_true(budget.try_acquire(), "The first hedge should be allowed")
+        check.is_false(budget.try_acquire(), "A second hedge should need more requests")
+        for _ in range(4):
+            budget.on_request()
+        check.is_true(budget.try_acquire(), "Four requests should earn one hedge")
+        for _ in range(100):
+            budget.on_request()
+        check.equal(sum(budget.try_acquire() for _ in range(5)), 2, "Tokens should be capped at the burst")
+        check.equal(budget.hedges, 4, "Every allowed hedge should be counted")
+
+    @pytest.mark.unit
+    def test_slow_request_is_hedged_and_both_latencies_recorded(self, requester):
+        """
+        Test Case: The first attempt takes longer than the hedge delay, the hedge answers at once
+
+        Expected Result: The hedge's reply wins, and once the slow attempt finishes its latency is
+        in the window next to the hedge's, so the delay percentile is not biased towards winners
+        """
+        send = SlowThenFast(slow=0.3)
+        check.equal(requester.execute("GET /licenses", send).source, "hedge", "The faster hedge should win")
+        check.equal(send.calls, 2, "Exactly one hedge should be sent")
+        check.is_true(send.finished.wait(5), "The slow attempt should finish in the background")
+        deadline = time.monotonic() + 5
+        while requester.latencies.percentile("GET /licenses", 100, min_samples=2) is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        check.greater_equal(requester.latencies.percentile("GET /licenses", 100, min_samples=2), 0.3,
+                            "The losing attempt's latency should be recorded")
+
+    @pytest.mark.unit
+    def test_no_hedge_without_budget(self, requester):
+        """
+        Test Case: Two slow requests in a row, with budget for one hedge only
+
+        Expected Result: Only the first is hedged; the second waits for its single attempt
+        """
+        requester.execute("GET /licenses", SlowThenFast(slow=0.1))
+        send = SlowThenFast(slow=0.1)
+        check.equal(requester.execute("GET /licenses/other", send).source, "primary", "The single attempt should answer")
+        check.equal(send.calls, 1, "No hedge should be sent without budget")
+        check.equal(requester.budget.hedges, 1, "Only one hedge should be counted")
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("model_client", [{"hedge_reads": True}], indirect=True)
+    def test_hedge_threads_do_not_share_the_session(self, model_client):
+        """
+        Test Case: Get the session of a hedging client that is not thread-safe, from the calling
+        thread and from a hedge thread
+
+        Expected Result: Each thread has its own session, sharing the mounted adapters
+        """
+        own = model_client._thread_session()
+        hedge = model_client.hedger._executor.submit(model_client._thread_session).result()
+        check.is_not(own, hedge, "A hedge thread should not use the caller's session")
+        check.equal(dict(hedge.adapters), dict(model_client.session.adapters), "Sessions should share the adapters")
+        check.equal(model_client.get_license_inventory().__class__.__name__, "LicenseInventory",
+                    "Hedged reads should still be answered")
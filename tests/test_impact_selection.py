@@ -0,0 +1,161 @@
+"""
+Test Cases for change-aware test selection
+utils/impact_selection.py
+"""
+import subprocess
+import textwrap
+from types import SimpleNamespace
+
+import pytest
+import pytest_check as check
+
+from utils.impact_selection import CallRecorder, ImpactAnalysis, ImpactMap, changed_lines, changed_symbols
+
+
+MODULE = textwrap.dedent('''\
+    """ Module docstring """
+    import os
+
+    LIMIT = 10
+
+
+    class Client:
+        TIMEOUT = 30
+
+        def get(self):
+            return LIMIT
+
+        def post(self):
+            def encode():
+                return os.sep
+            return encode()
+
+
+    def helper():
+        return Client.TIMEOUT
+    ''')
+
+
+def git(root, *args):
+    subprocess.run(["git", *args], cwd=root, check=True, capture_output=True)
+
+
+class TestImpactSelection:
+    """Test suite for mapping working-tree changes to changed lines and symbols"""
+
+    @pytest.fixture()
+    def repo(self, tmp_path):
+        git(tmp_path, "init", "-q")
+        git(tmp_path, "config", "user.email", "tests@jetbrains-test.com")
+        git(tmp_path, "config", "user.name", "Tests")
+        (tmp_path / "utils").mkdir()
+        (tmp_path / "utils" / "client.py").write_text(MODULE, encoding="utf-8")
+        (tmp_path / "utils" / "removed.py").write_text("X = 1\n", encoding="utf-8")
+        git(tmp_path, "add", "-A")
+        git(tmp_path, "commit", "-q", "-m", "base")
+        return tmp_path
+
+    @pytest.mark.unit
+    def test_changed_lines(self, repo):
+        """
+        Test Case: Modify, delete and add files after the base commit
+
+        Expected Result: Modified files map to their changed line numbers; deleted and untracked
+        files map to None (the whole file)
+        """
+        path = repo / "utils" / "client.py"
+        lines = MODULE.splitlines()
+        lines[10] = "            return LIMIT + 1"
+        del lines[15]
+        path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        (repo / "utils" / "removed.py").unlink()
+        (repo / "utils" / "new.py").write_text("Y = 2\n", encoding="utf-8")
+
+        changes = changed_lines(repo, "HEAD")
+        check.equal(changes.get("utils/client.py"), {11, 15, 16}, "Modified line and both sides of the deletion expected")
+        check.is_true("utils/removed.py" in changes and changes["utils/removed.py"] is None, "Deleted file should be whole-file")
+        check.is_true("utils/new.py" in changes and changes["utils/new.py"] is None, "Untracked file should be whole-file")
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("lines, functions, outside", [
+        ({11}, {"Client.get"}, False),
+        ({15}, {"Client.post.<locals>.encode"}, False),
+        ({4}, set(), True),
+        ({8}, set(), True),
+        ({2}, set(), True),
+        ({1, 3, 5}, set(), False),
+    ], ids=["method", "nested function", "module constant", "class attribute", "import", "docstring and blank lines"])
+    def test_changed_symbols(self, tmp_path, lines, functions, outside):
+        """
+        Test Case: Classify changed lines of a Python file
+
+        Expected Result: Lines in functions select the innermost function, other code counts as
+        changed outside functions, and docstrings or blank lines change nothing
+        """
+        path = tmp_path / "client.py"
+        path.write_text(MODULE, encoding="utf-8")
+        result = changed_symbols(path, lines)
+        check.equal(result, (functions, outside), f"Unexpected symbols for lines {sorted(lines)}")
+
+    @pytest.mark.unit
+    def test_changed_symbols_unparsable_file(self, tmp_path):
+        """
+        Test Case: Changed lines in a file that no longer parses
+
+        Expected Result: The change counts as outside functions
+        """
+        path = tmp_path / "broken.py"
+        path.write_text("def broken(:\n", encoding="utf-8")
+        check.equal(changed_symbols(path, {1}), (set(), True), "Unparsable file should count as outside functions")
+
+    @pytest.mark.unit
+    def test_module_constant_change_impacts_every_test(self, repo):
+        """
+        Test Case: Change a module constant that no recorded test read from inside a function
+
+        Expected Result: Every recorded test is impacted
+        """
+        impact_map = ImpactMap({"tests/test_a.py::test_get": {"utils/client.py::Client.get"},
+                                "tests/test_b.py::test_other": {"utils/other.py::other"}}, commit="HEAD")
+        path = repo / "utils" / "client.py"
+        path.write_text(MODULE.replace("LIMIT = 10", "LIMIT = 20"), encoding="utf-8")
+
+        analysis = ImpactAnalysis(repo, impact_map)
+        check.is_true(analysis.run_all, "A module-level change should impact every test")
+        check.is_true(analysis.is_impacted("tests/test_b.py::test_other"), "Unrelated tests should be impacted as well")
+        check.is_in("utils/client.py", analysis.describe(), "The reason should name the changed file")
+
+    @pytest.mark.unit
+    def test_function_change_impacts_only_its_callers(self, repo):
+        """
+        Test Case: Change the body of one method
+
+        Expected Result: Only the test that called the method is impacted
+        """
+        impact_map = ImpactMap({"tests/test_a.py::test_get": {"utils/client.py::Client.get"},
+                                "tests/test_b.py::test_post": {"utils/client.py::Client.post"}}, commit="HEAD")
+        path = repo / "utils" / "client.py"
+        path.write_text(MODULE.replace("return LIMIT", "return LIMIT + 1"), encoding="utf-8")
+
+        analysis = ImpactAnalysis(repo, impact_map)
+        check.is_false(analysis.run_all, "A function change should not impact every test")
+        check.is_true(analysis.is_impacted("tests/test_a.py::test_get"), "The caller should be impacted")
+        check.is_false(analysis.is_impacted("tests/test_b.py::test_post"), "Other tests should not be impacted")
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("name, first_line, qualname", [
+        ("get", 10, "Client.get"),
+        ("encode", 14, "Client.post.<locals>.encode"),
+        ("helper", 19, "helper"),
+        ("<listcomp>", 11, "Client.get.<locals>.<listcomp>"),
+    ], ids=["method", "nested function", "function", "comprehension"])
+    def test_qualname_rebuilt_without_co_qualname(self, repo, name, first_line, qualname):
+        """
+        Test Case: Resolve a code object without co_qualname, as on Python before 3.11
+
+        Expected Result: The qualified name is rebuilt from the definitions in the file, matching
+        the names changed_symbols() reports
+        """
+        recorder = CallRecorder(repo)
+        code = SimpleNamespace(co_filename=str(repo / "utils" / "client.py"), co_name=name, co_firstlineno=first_line)
+        check.equal(recorder._symbol(code), f"utils/client.py::{qualname}", f"Unexpected symbol for {name}")
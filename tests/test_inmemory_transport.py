@@ -0,0 +1,152 @@
+"""
+Test Cases for the in-memory transport adapter
+utils/inmemory_transport.py
+"""
+import pytest
+import pytest_check as check
+import requests
+
+from config.api_config import config, endpoints, status_codes, error_codes
+from utils.inmemory_transport import InMemoryLicenseAdapter, LicenseModel
+
+
+ORG_KEY = "org-key"
+TEAM_KEY = "team-key"
+
+
+class TestInMemoryTransport:
+    """Test suite for the error responses the in-memory adapter maps model errors to"""
+
+    @pytest.fixture()
+    def model(self):
+        team_id = next(iter(config.TEAM_IDS.values()))
+        return LicenseModel(licenses_per_team=4, assigned_per_team=1, tokens={ORG_KEY: None, TEAM_KEY: team_id})
+
+    @pytest.fixture()
+    def session(self, model):
+        session = requests.Session()
+        session.mount(config.BASE_URL, InMemoryLicenseAdapter(config.BASE_URL, model))
+        session.headers.update({"X-Api-Key": ORG_KEY, "X-Customer-Code": "inmemory-customer"})
+        yield session
+        session.close()
+
+    @staticmethod
+    def post(session, endpoint, **kwargs):
+        return session.post(f"{config.BASE_URL}{endpoint}", **kwargs)
+
+    @staticmethod
+    def check_error(response, status_code, error):
+        check.equal(response.status_code, status_code, f"Expected {status_code}, got {response.status_code}")
+        check.equal(response.json().get("code"), error["code"], f"Expected {error['code']}, got {response.text}")
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("api_key, error", [
+        (None, error_codes.MISSING_TOKEN_HEADER),
+        ("wrong-key", error_codes.INVALID_TOKEN),
+    ], ids=["missing token", "invalid token"])
+    def test_unauthorized_requests(self, session, api_key, error):
+        """
+        Test Case: List licenses without an API key and with an unknown one
+
+        Expected Result: 401 with MISSING_TOKEN_HEADER / INVALID_TOKEN
+
+        Status Code: 401
+        """
+        session.headers["X-Api-Key"] = api_key
+        response = session.get(f"{config.BASE_URL}{endpoints.GET_LICENSES}")
+        self.check_error(response, status_codes.UNAUTHORIZED, error)
+
+    @pytest.mark.unit
+    def test_assign_unknown_license(self, session, model):
+        """
+        Test Case: Assign a license ID the model does not know
+
+        Expected Result: 404 LICENSE_NOT_FOUND with the ID as description
+
+        Status Code: 404
+        """
+        contact = {"email": "user@jetbrains-test.com", "firstName": "Test", "lastName": "User"}
+        response = self.post(session, endpoints.ASSIGN_LICENSE, json={"licenseId": "UNKNOWN", "contact": contact})
+        self.check_error(response, status_codes.NOT_FOUND, error_codes.LICENSE_NOT_FOUND)
+        check.equal(response.json().get("description"), "UNKNOWN", "Description should name the license")
+
+    @pytest.mark.unit
+    def test_assign_already_assigned_license(self, session, model):
+        """
+        Test Case: Assign a license that is already assigned
+
+        Expected Result: 400 LICENSE_IS_NOT_AVAILABLE_TO_ASSIGN
+
+        Status Code: 400
+        """
+        license_id = next(license_id for license_id, data in model.licenses.items() if not data["isAvailableToAssign"])
+        contact = {"email": "user@jetbrains-test.com", "firstName": "Test", "lastName": "User"}
+        response = self.post(session, endpoints.ASSIGN_LICENSE, json={"licenseId": license_id, "contact": contact})
+        self.check_error(response, status_codes.BAD_REQUEST, error_codes.LICENSE_IS_NOT_AVAILABLE_TO_ASSIGN)
+
+    @pytest.mark.unit
+    def test_assign_invalid_email(self, session, model):
+        """
+        Test Case: Assign a license to a malformed email address
+
+        Expected Result: 400 INVALID_CONTACT_EMAIL with the email as description
+
+        Status Code: 400
+        """
+        license_id = next(license_id for license_id, data in model.licenses.items() if data["isAvailableToAssign"])
+        contact = {"email": "user@@domain.com", "firstName": "Test", "lastName": "User"}
+        response = self.post(session, endpoints.ASSIGN_LICENSE, json={"licenseId": license_id, "contact": contact})
+        self.check_error(response, status_codes.BAD_REQUEST, error_codes.INVALID_CONTACT_EMAIL)
+        check.equal(response.json().get("description"), "user@@domain.com", "Description should echo the email")
+        check.is_true(model.licenses[license_id]["isAvailableToAssign"], "Rejected assignment should not change the model")
+
+    @pytest.mark.unit
+    def test_invalid_json_body(self, session):
+        """
+        Test Case: Send a body that is not JSON
+
+        Expected Result: 400 INVALID_JSON
+
+        Status Code: 400
+        """
+        response = self.post(session, endpoints.ASSIGN_LICENSE, data=b"{not json")
+        self.check_error(response, status_codes.BAD_REQUEST, {"code": "INVALID_JSON"})
+
+    @pytest.mark.unit
+    def test_change_team_with_team_token(self, session, model):
+        """
+        Test Case: Change license team with a team-restricted token
+
+        Expected Result: 403 TOKEN_TYPE_MISMATCH
+
+        Status Code: 403
+        """
+        session.headers["X-Api-Key"] = TEAM_KEY
+        payload = {"licenseIds": [next(iter(model.licenses))], "targetTeamId": next(iter(model.teams))}
+        response = self.post(session, endpoints.CHANGE_LICENSE_TEAM, json=payload)
+        self.check_error(response, status_codes.FORBIDDEN, error_codes.TOKEN_TYPE_MISMATCH)
+
+    @pytest.mark.unit
+    def test_change_team_unknown_team(self, session, model):
+        """
+        Test Case: Move a license to a team that does not exist
+
+        Expected Result: 404 TEAM_NOT_FOUND
+
+        Status Code: 404
+        """
+        payload = {"licenseIds": [next(iter(model.licenses))], "targetTeamId": 1}
+        response = self.post(session, endpoints.CHANGE_LICENSE_TEAM, json=payload)
+        self.check_error(response, status_codes.NOT_FOUND, error_codes.TEAM_NOT_FOUND)
+
+    @pytest.mark.unit
+    def test_unknown_route(self, session):
+        """
+        Test Case: Call a path the adapter does not serve
+
+        Expected Result: 404 NOT_FOUND naming the method and path
+
+        Status Code: 404
+        """
+        response = session.delete(f"{config.BASE_URL}/customer/unknown")
+        self.check_error(response, status_codes.NOT_FOUND, {"code": "NOT_FOUND"})
@@ -0,0 +1,114 @@
+"""
+Test Cases for the shared on-disk inventory snapshot
+utils/inventory_snapshot.py
+"""
+import multiprocessing
+
+import pytest
+import pytest_check as check
+
+from config.api_config import config
+from utils.inventory_snapshot import InventorySnapshot
+from utils.inventory_sync import InventorySync
+from utils.license_models import AVAILABLE, UNKNOWN
+
+
+TEAM_1 = next(iter(config.TEAM_IDS.values()))
+
+
+def claim_in_process(path, source, count, owner, start, results):
+    """ Claim licenses from a separate process, as an xdist worker would """
+    snapshot = InventorySnapshot(path, source=source)
+    start.wait()
+    results.put((owner, snapshot.claim_available(count, team_id=TEAM_1, owner=owner)))
+    snapshot.close()
+
+
+class TestInventorySnapshot:
+    """Test suite for claims, consumption and source tracking of the shared snapshot"""
+
+    @pytest.fixture()
+    def snapshot(self, tmp_path, model_client):
+        snapshot = InventorySnapshot(tmp_path / "inventory.db", source=model_client.inventory_source)
+        snapshot.write(model_client.get_license_inventory())
+        yield snapshot
+        snapshot.close()
+
+    @pytest.mark.unit
+    def test_concurrent_claims_from_two_processes_never_overlap(self, snapshot):
+        """
+        Test Case: Two processes each claim 4 of team 1's 6 available licenses at the same time
+
+        Expected Result: Together they get all 6 licenses and no license is handed to both
+        """
+        context = multiprocessing.get_context("spawn")
+        start = context.Event()
+        results = context.Queue()
+        workers = [
+            context.Process(target=claim_in_process, args=(snapshot.path, snapshot.source, 4, owner, start, results))
+            for owner in ("gw0", "gw1")
+        ]
+        for worker in workers:
+            worker.start()
+        start.set()
+        claims = dict(results.get(timeout=60) for _ in workers)
+        for worker in workers:
+            worker.join(timeout=60)
+
+        check.equal(set(claims["gw0"]) & set(claims["gw1"]), set(), "No license should be claimed twice")
+        check.equal(sorted(claims["gw0"] + claims["gw1"]), snapshot.available_ids(TEAM_1),
+                    "All available licenses should be claimed between the two processes")
+
+    @pytest.mark.unit
+    def test_release_frees_only_own_claims(self, snapshot):
+        """
+        Test Case: Two owners claim licenses, then one releases all of them, including the other's
+
+        Expected Result: Only the releasing owner's licenses can be claimed again
+        """
+        mine = snapshot.claim_available(2, team_id=TEAM_1, owner="gw0")
+        theirs = snapshot.claim_available(2, team_id=TEAM_1, owner="gw1")
+        snapshot.release(mine + theirs, "gw0")
+        again = snapshot.claim_available(6, team_id=TEAM_1, owner="gw2")
+        check.is_true(set(mine) <= set(again), "Released licenses should be claimable again")
+        check.equal(set(again) & set(theirs), set(), "Another owner's claims should survive the release")
+
+    @pytest.mark.unit
+    def test_consumed_license_is_restored_by_a_long_lived_sync(self, snapshot, model_client):
+        """
+        Test Case: A sync that already cached the snapshot's hashes runs after a license was marked
+        consumed but came back unassigned
+
+        Expected Result: The license is available again in the snapshot
+        """
+        sync = InventorySync(snapshot)
+        sync.refresh(model_client.get_license_inventory)
+        license_id = snapshot.claim_available(owner="gw0")[0]
+        snapshot.mark_consumed([license_id])
+        check.equal(snapshot.get_licenses([license_id])[license_id].is_available_to_assign, None,
+                    "A consumed license should have an unknown status")
+
+        sync.refresh(model_client.get_license_inventory)
+        status = snapshot.connection.execute("SELECT status FROM licenses WHERE license_id = ?", (license_id,)).fetchone()[0]
+        check.equal(status, AVAILABLE, f"Status should be back to available, got {'unknown' if status == UNKNOWN else status}")
+        check.equal(snapshot.consumed, 1, "One consumed license should be counted")
+
+    @pytest.mark.unit
+    def test_snapshot_of_another_source_is_replaced(self, snapshot, model_client):
+        """
+        Test Case: Open the snapshot for another organization and write its inventory
+
+        Expected Result: The snapshot counts as stale for the other source, and writing drops the
+        previous source's rows and claims
+        """
+        snapshot.claim_available(2, team_id=TEAM_1, owner="gw0")
+        other = InventorySnapshot(snapshot.path, source="inmemory:https://example.test#other-customer")
+        try:
+            check.is_true(snapshot.is_fresh(60), "Snapshot should be fresh for its own source")
+            check.is_false(other.is_fresh(60), "Snapshot should be stale for another source")
+            other.write(model_client.get_license_inventory())
+            check.equal(other.stored_source, other.source, "The new source should be stored")
+            claimed = other.connection.execute("SELECT COUNT(*) FROM licenses WHERE claimed_by IS NOT NULL").fetchone()[0]
+            check.equal(claimed, 0, "Claims of the previous source should be dropped")
+        finally:
+            other.close()
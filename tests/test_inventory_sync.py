@@ -0,0 +1,108 @@
+"""
+Test Cases for incremental inventory sync
+utils/inventory_sync.py
+"""
+import threading
+
+import pytest
+import pytest_check as check
+
+from config.api_config import config
+from utils.inventory_snapshot import InventorySnapshot, content_hash, inventory_rows
+from utils.inventory_sync import ChangeEvent, InventorySync, _classify
+from utils.license_models import License
+
+
+def make_license(team_id=1, available=True, email=None, product_code="II"):
+    return License(
+        license_id="LIC1",
+        team_id=team_id,
+        team_name=None,
+        product_code=product_code,
+        is_available_to_assign=available,
+        assignee_email=email
+    )
+
+
+class TestInventorySyncClassify:
+    """Test suite for turning one changed license into change events"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("before, after, expected", [
+        (None, make_license(), [ChangeEvent.ADDED]),
+        (make_license(), make_license(available=False, email="a@jetbrains-test.com"), [ChangeEvent.ASSIGNED]),
+        (make_license(available=False, email="a@jetbrains-test.com"), make_license(), [ChangeEvent.REVOKED]),
+        (make_license(team_id=1), make_license(team_id=2), [ChangeEvent.TEAM_CHANGED]),
+        (make_license(team_id=1), make_license(team_id=2, available=False, email="a@jetbrains-test.com"),
+         [ChangeEvent.TEAM_CHANGED, ChangeEvent.ASSIGNED]),
+        (make_license(available=False, email="a@jetbrains-test.com"),
+         make_license(available=False, email="b@jetbrains-test.com"), [ChangeEvent.UPDATED]),
+        (make_license(product_code="II"), make_license(product_code="PC"), [ChangeEvent.UPDATED]),
+        (make_license(), make_license(available=None), [ChangeEvent.UPDATED]),
+    ], ids=["added", "assigned", "revoked", "team changed", "moved and assigned", "reassigned",
+            "product changed", "availability unknown"])
+    def test_classify(self, before, after, expected):
+        """
+        Test Case: Classify a license change
+
+        Expected Result: One event per kind of change, UPDATED when no specific kind applies
+        """
+        events = _classify("LIC1", before, after)
+        check.equal([event.kind for event in events], expected, f"Unexpected events {events}")
+        for event in events:
+            check.is_true(event.before is before and event.after is after, "Events should carry both versions")
+
+
+class TestInventorySyncConcurrency:
+    """Test suite for syncs of several workers writing the same snapshot"""
+
+    @staticmethod
+    def hashes(inventory):
+        return {row[0]: content_hash(*row[1:]) for row in inventory_rows(inventory)}
+
+    @pytest.mark.unit
+    def test_concurrent_sync_never_mixes_two_inventories(self, tmp_path, model_client):
+        """
+        Test Case: While worker A is between reading the snapshot and writing its delta, worker B
+        syncs an inventory that differs from A's in other licenses
+
+        Expected Result: B waits for A's delta, so the snapshot ends up exactly equal to B's
+        inventory instead of a mix of both deltas
+        """
+        path = tmp_path / "inventory.db"
+        snapshot_a = InventorySnapshot(path, source=model_client.inventory_source)
+        snapshot_b = InventorySnapshot(path, source=model_client.inventory_source)
+        try:
+            sync_a, sync_b = InventorySync(snapshot_a), InventorySync(snapshot_b)
+            sync_a.refresh(model_client.get_license_inventory)
+            license_x, license_y = snapshot_a.available_ids(next(iter(config.TEAM_IDS.values())))[:2]
+
+            def assign(license_id):
+                model_client.assign_license(email=f"sync_{license_id}{config.TEST_EMAIL_DOMAIN}", first_name="Sync",
+                                            last_name="Test", license_id=license_id)
+
+            assign(license_y)
+            inventory_a = model_client.get_license_inventory()
+            model_client.revoke_license(license_y)
+            assign(license_x)
+            inventory_b = model_client.get_license_inventory()
+
+            worker_b = threading.Thread(target=sync_b.sync, args=(inventory_b,))
+            get_licenses = snapshot_a.get_licenses
+
+            def get_licenses_while_b_syncs(license_ids):
+                # Called by A after diffing and before writing its delta
+                worker_b.start()
+                worker_b.join(timeout=0.5)
+                return get_licenses(license_ids)
+
+            snapshot_a.get_licenses = get_licenses_while_b_syncs
+            sync_a.sync(inventory_a)
+            worker_b.join()
+
+            check.equal(snapshot_a.content_hashes(), self.hashes(inventory_b),
+                        "The snapshot should equal the inventory of the last sync")
+        finally:
+            snapshot_a.close()
+            snapshot_b.close()
+
@@ -0,0 +1,93 @@
+"""
+Test Cases for compact license records and the columnar inventory
+utils/license_models.py
+"""
+import json
+
+import pytest
+import pytest_check as check
+
+from utils.license_models import License, LicenseInventory
+
+
+LICENSES = [
+    {"licenseId": "L1", "team": {"id": 11, "name": "Team 1"}, "product": {"code": "II", "name": "IntelliJ IDEA"},
+     "isAvailableToAssign": True, "assignee": None},
+    {"licenseId": "L2", "team": {"id": 11, "name": "Team 1"}, "product": {"code": "PC", "name": "PyCharm"},
+     "isAvailableToAssign": False, "assignee": {"email": "user@example.com"}},
+    {"licenseId": "L3", "team": {"id": 22, "name": "Team 2"}, "product": {"code": "II", "name": "IntelliJ IDEA"},
+     "isAvailableToAssign": True},
+    {"licenseId": "L4"},
+]
+
+
+class TestLicenseInventory:
+    """Test suite for decoding license lists into columns and reading them back"""
+
+    @pytest.fixture()
+    def inventory(self):
+        return LicenseInventory.from_json(json.dumps(LICENSES).encode())
+
+    @pytest.mark.unit
+    def test_rows_round_trip(self, inventory):
+        """
+        Test Case: Decode a license list and read every row back
+
+        Expected Result: Each row matches its license, with missing fields (L4) read as None
+        """
+        rows = [(row.license_id, row.team_id, row.team_name, row.product_code, row.is_available_to_assign,
+                 row.assignee_email) for row in inventory]
+        check.equal(rows, [
+            ("L1", 11, "Team 1", "II", True, None),
+            ("L2", 11, "Team 1", "PC", False, "user@example.com"),
+            ("L3", 22, "Team 2", "II", True, None),
+            ("L4", None, None, None, None, None),
+        ], "Rows should match the decoded licenses")
+
+    @pytest.mark.unit
+    def test_team_and_product_values_are_interned(self, inventory):
+        """
+        Test Case: Decode licenses sharing teams and products
+
+        Expected Result: Each distinct team and product is stored once, next to the missing-value entry
+        """
+        check.equal(inventory.teams, [(None, None), (11, "Team 1"), (22, "Team 2")], "Teams should be stored once")
+        check.equal(inventory.products, [None, "II", "PC"], "Products should be stored once")
+        check.equal(inventory.team_ids(), [11, 22], "Team IDs should exclude the missing value")
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("team_id, available, assigned", [
+        (None, ["L1", "L3"], ["L2"]),
+        (11, ["L1"], ["L2"]),
+        ("22", ["L3"], []),
+        (99, [], []),
+    ], ids=["organization", "team", "team ID as string", "unknown team"])
+    def test_ids_by_status_and_team(self, inventory, team_id, available, assigned):
+        """
+        Test Case: List available and assigned license IDs, optionally for one team
+
+        Expected Result: Licenses of unknown status are in neither list
+        """
+        check.equal(inventory.available_ids(team_id), available, "Unexpected available licenses")
+        check.equal(inventory.assigned_ids(team_id), assigned, "Unexpected assigned licenses")
+
+    @pytest.mark.unit
+    def test_non_list_body_is_rejected(self):
+        """
+        Test Case: Decode an error body instead of a license list
+
+        Expected Result: ValueError naming the type that was received
+        """
+        with pytest.raises(ValueError, match="got dict"):
+            LicenseInventory.from_json(b'{"code": "INVALID_TOKEN"}')
+
+    @pytest.mark.unit
+    def test_license_has_no_instance_dict(self, inventory):
+        """
+        Test Case: Set an attribute that License does not declare
+
+        Expected Result: AttributeError, as records are slotted
+        """
+        with pytest.raises(AttributeError):
+            inventory[0].extra = True
+        check.is_false(hasattr(License("L1", None, None, None, None, None), "__dict__"), "License should have no __dict__")
@@ -0,0 +1,119 @@
+"""
+Test Cases for the warm license pool replenisher
+utils/license_pool.py
+"""
+import time
+
+import pytest
+import pytest_check as check
+
+from config.api_config import config
+from utils.inventory_snapshot import InventorySnapshot
+from utils.inventory_sync import InventorySync
+from utils.license_pool import LicensePoolReplenisher
+
+
+TEAM_1, TEAM_2 = list(config.TEAM_IDS.values())[:2]
+
+
+class TestLicensePoolReplenisher:
+    """Test suite for revoking stale test assignments and moving spare licenses between teams"""
+
+    @pytest.fixture()
+    def sync(self, tmp_path, model_client):
+        snapshot = InventorySnapshot(tmp_path / "inventory.db", source=model_client.inventory_source)
+        yield InventorySync(snapshot)
+        snapshot.close()
+
+    @staticmethod
+    def assign(client, license_ids):
+        for license_id in license_ids:
+            response = client.assign_license(email=f"pool_{license_id}{config.TEST_EMAIL_DOMAIN}", first_name="Pool",
+                                             last_name="Test", license_id=license_id, team_id=TEAM_1)
+            assert response.status_code == 200, response.text
+
+    @staticmethod
+    def team_of(license_model, license_id):
+        return license_model.licenses[license_id]["team"]["id"]
+
+    @pytest.mark.unit
+    def test_revokes_only_stale_test_assignments(self, model_client, license_model, sync):
+        """
+        Test Case: Team 1 is short of licenses; four test assignments were recorded by an earlier run
+        and one was made just now
+
+        Expected Result: Only the four earlier test assignments are revoked; the fresh one and the
+        assignments of non-test users are kept
+        """
+        available = model_client.get_license_inventory().available_ids(TEAM_1)
+        stale, fresh = available[:4], available[4]
+        self.assign(model_client, stale)
+        sync.snapshot.write(model_client.get_license_inventory(), taken_at=time.time() - 1000)
+        self.assign(model_client, [fresh])
+
+        pool = LicensePoolReplenisher(model_client, {TEAM_1: (3, 8)}, sync=sync, stale_after=300)
+        counts = pool.replenish()
+
+        check.equal(pool.revoked, 4, "Only the stale test assignments should be revoked")
+        check.equal(counts[TEAM_1], 5, "One left over plus four revoked licenses should be available")
+        check.is_false(license_model.licenses[fresh]["isAvailableToAssign"], "The fresh assignment should be kept")
+        seeded = [license_id for license_id, data in license_model.licenses.items()
+                  if data["assignee"] and not data["assignee"]["email"].endswith(config.TEST_EMAIL_DOMAIN)]
+        check.is_true(seeded and all(not license_model.licenses[license_id]["isAvailableToAssign"] for license_id in seeded),
+                      "Assignments of non-test users should be kept")
+
+    @pytest.mark.unit
+    def test_nothing_revoked_without_snapshot(self, model_client):
+        """
+        Test Case: Replenish without a snapshot, so assignment ages are unknown
+
+        Expected Result: No assignment is revoked
+        """
+        self.assign(model_client, model_client.get_license_inventory().available_ids(TEAM_1)[:6])
+        pool = LicensePoolReplenisher(model_client, {TEAM_1: (3, 8)}, stale_after=0)
+        pool.replenish()
+        check.equal(pool.revoked, 0, "Assignments of unknown age should not be revoked")
+
+    @pytest.mark.unit
+    def test_rebalance_moves_only_unclaimed_licenses(self, model_client, license_model, sync):
+        """
+        Test Case: Team 1 needs two more licenses while another worker holds claims on three of
+        team 2's available licenses
+
+        Expected Result: Two unclaimed team 2 licenses are moved; the claimed ones stay in team 2
+        with their claims, and the replenisher's own claims are released
+        """
+        sync.refresh(model_client.get_license_inventory)
+        claimed = sync.snapshot.claim_available(3, team_id=TEAM_2, owner="gw1:1234")
+
+        pool = LicensePoolReplenisher(model_client, {TEAM_1: (7, 8), TEAM_2: (0, 2)}, sync=sync, stale_after=300)
+        counts = pool.replenish()
+
+        check.equal(pool.moved, 2, "Two licenses should be moved to team 1")
+        check.equal(counts, {TEAM_1: 8, TEAM_2: 4}, "Available counts should reflect the move")
+        check.is_true(all(self.team_of(license_model, license_id) == TEAM_2 for license_id in claimed),
+                      "Claimed licenses should stay in team 2")
+        claims = dict(sync.snapshot.connection.execute("SELECT license_id, claimed_by FROM licenses WHERE claimed_by IS NOT NULL"))
+        check.equal(claims, {license_id: "gw1:1234" for license_id in claimed},
+                    "Only the other worker's claims should remain")
+
+    @pytest.mark.unit
+    def test_background_failures_are_raised(self, model_client):
+        """
+        Test Case: The background check fails
+
+        Expected Result: The failure is kept and raise_failures() raises it
+        """
+        pool = LicensePoolReplenisher(model_client, {TEAM_1: (3, 8)}, interval=0.01)
+
+        def fail(required=None):
+            raise Exception("inventory unavailable")
+
+        pool.replenish = fail
+        pool.start()
+        deadline = time.monotonic() + 5
+        while not pool.failures and time.monotonic() < deadline:
+            time.sleep(0.01)
+        pool.stop()
+        with pytest.raises(Exception, match="inventory unavailable"):
+            pool.raise_failures()
@@ -0,0 +1,73 @@
+"""
+Test Cases for the load generator's latency histogram
+utils/load_generator.py
+"""
+import pytest
+import pytest_check as check
+
+from utils.load_generator import LatencyHistogram
+
+
+class TestLatencyHistogram:
+    """Test suite for HdrHistogram-style bucketing and percentiles"""
+
+    @pytest.mark.unit
+    def test_small_values_are_exact(self):
+        """
+        Test Case: Bucket every value below the sub-bucket count
+
+        Expected Result: Each value has its own bucket and is reported exactly
+        """
+        histogram = LatencyHistogram(significant_bits=8)
+        for value in range(histogram.sub_bucket_count):
+            check.equal(histogram._highest_equivalent(histogram._index(value)), value, f"{value} us should be exact")
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("significant_bits", [4, 8])
+    def test_bucket_relative_error_is_bounded(self, significant_bits):
+        """
+        Test Case: Bucket values from 1 us to about 2 minutes
+
+        Expected Result: Indexes never decrease with the value, and every value is reported within
+        2**-(significant_bits - 1) relative error, never below itself
+        """
+        histogram = LatencyHistogram(significant_bits=significant_bits)
+        max_error = 2 ** -(significant_bits - 1)
+        previous_index = -1
+        value = 1
+        while value < 120_000_000:
+            index = histogram._index(value)
+            highest = histogram._highest_equivalent(index)
+            check.greater_equal(index, previous_index, f"Index of {value} us should not decrease")
+            check.greater_equal(highest, value, f"Bucket of {value} us should not report less than the value")
+            check.less_equal((highest - value) / value, max_error, f"Bucket of {value} us is too wide")
+            previous_index = index
+            value = value * 17 // 16 + 1
+
+    @pytest.mark.unit
+    def test_bucket_boundaries(self):
+        """
+        Test Case: Bucket values on both sides of a power of two
+
+        Expected Result: 2**k - 1 and 2**k fall into adjacent buckets
+        """
+        histogram = LatencyHistogram(significant_bits=8)
+        for power in (8, 9, 16, 20):
+            below, at = histogram._index(2 ** power - 1), histogram._index(2 ** power)
+            check.equal(at, below + 1, f"2**{power} should start the bucket after 2**{power} - 1")
+
+    @pytest.mark.unit
+    def test_percentiles(self):
+        """
+        Test Case: Record 1 ms to 1000 ms in 1 ms steps
+
+        Expected Result: p50/p99 within the histogram's relative error, p100 equal to the maximum
+        """
+        histogram = LatencyHistogram(significant_bits=8)
+        for milliseconds in range(1, 1001):
+            histogram.record(milliseconds / 1000)
+        check.equal(histogram.total, 1000, "Every value should be counted")
+        check.almost_equal(histogram.value_at_percentile(50), 0.5, rel=2 ** -7, msg="p50 should be about 500 ms")
+        check.almost_equal(histogram.value_at_percentile(99), 0.99, rel=2 ** -7, msg="p99 should be about 990 ms")
+        check.equal(histogram.value_at_percentile(100), 1.0, "p100 should be the maximum")
+        check.equal(LatencyHistogram().value_at_percentile(99), 0.0, "An empty histogram should report 0")
@@ -0,0 +1,51 @@
+"""
+Test Cases for the multi-tenant executor
+utils/multi_tenant.py
+"""
+import pytest
+import pytest_check as check
+
+from utils.inmemory_transport import register_tenant, standin_server
+from utils.multi_tenant import MultiTenantExecutor, TenantCredentials, format_inventory_summary
+
+
+class TestMultiTenantExecutor:
+    """Test suite for per-tenant fan-out, its limits and the inventory summary"""
+
+    @pytest.fixture()
+    def tenants(self):
+        tenants = [TenantCredentials("unit-full", "unit-key-full", "Full"),
+                   TenantCredentials("unit-empty", "unit-key-empty", "Empty")]
+        register_tenant("unit-full", "unit-key-full", licenses_per_team=3, assigned_per_team=1)
+        register_tenant("unit-empty", "unit-key-empty", licenses_per_team=0)
+        return tenants
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("options", [{"tenant_concurrency": 0}, {"max_workers": 0}],
+                             ids=["tenant concurrency", "max workers"])
+    def test_concurrency_below_one_is_rejected(self, tenants, options):
+        """
+        Test Case: Create an executor that could never have an operation in flight
+
+        Expected Result: ValueError instead of a scheduling loop that never ends
+        """
+        with pytest.raises(ValueError, match="Invalid concurrency"):
+            MultiTenantExecutor(tenants, **options)
+
+    @pytest.mark.unit
+    def test_summary_counts_empty_inventory(self, tenants):
+        """
+        Test Case: Fetch the inventories of a tenant with licenses and of one without any
+
+        Expected Result: Both succeed, results keep the tenant order, and the empty inventory is
+        summarized with zero counts rather than as missing
+        """
+        with standin_server() as base_url, MultiTenantExecutor(tenants, base_url=base_url) as executor:
+            results = executor.inventories()
+            summary = format_inventory_summary(results, executor).splitlines()
+
+        check.equal([result.tenant.name for result in results], ["Full", "Empty"], "Results should follow tenant order")
+        check.is_true(all(result.ok for result in results), f"Both inventories should be fetched: {results}")
+        full, empty = [line.split()[2:5] for line in summary[1:]]
+        check.equal(full, ["6", "4", "2"], "Full tenant should have 3 licenses per team, 1 assigned")
+        check.equal(empty, ["0", "0", "0"], "Empty tenant should be counted as zero")
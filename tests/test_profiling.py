@@ -0,0 +1,86 @@
+"""
+Test Cases for per-test profiling
+utils/profiling.py
+"""
+import cProfile
+import pstats
+import re
+import threading
+import time
+
+import pytest
+import pytest_check as check
+
+from config.api_config import config
+from utils.profiling import ProfileRecorder, StackSampler, summarize
+
+
+def busy_wait(seconds):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+class TestProfiling:
+    """Test suite for stack sampling, time attribution and profile files"""
+
+    @pytest.mark.unit
+    def test_sampler_collapses_stacks_of_its_thread(self, tmp_path):
+        """
+        Test Case: Sample the current thread while it spins in busy_wait, then write the stacks
+
+        Expected Result: The collapsed file lists root-first stacks ending in busy_wait, each with
+        its sample count
+        """
+        sampler = StackSampler(threading.get_ident(), interval=0.001)
+        sampler.start()
+        busy_wait(0.2)
+        sampler.stop()
+        path = tmp_path / "test.collapsed"
+        sampler.write_collapsed(path)
+
+        lines = path.read_text(encoding="utf-8").splitlines()
+        check.is_true(lines and all(re.fullmatch(r".+ \d+", line) for line in lines), f"Unexpected format: {lines[:3]}")
+        busy = [line for line in lines if line.rsplit(" ", 1)[0].split(";")[-1].startswith("busy_wait ")]
+        check.is_true(busy, "Samples should end in busy_wait")
+        check.is_true(all("test_sampler_collapses_stacks_of_its_thread" in line.split(";")[-2] for line in busy),
+                      "The caller should come right before busy_wait")
+
+    @pytest.mark.unit
+    def test_summary_attributes_client_and_backoff_time(self, model_client):
+        """
+        Test Case: Profile an API call followed by a 50 ms sleep
+
+        Expected Result: The sleep counts as retry backoff and the client's functions are listed
+        """
+        profiler = cProfile.Profile()
+        profiler.enable()
+        model_client.get_team_licenses(team_id=str(next(iter(config.TEAM_IDS.values()))))
+        time.sleep(0.05)
+        profiler.disable()
+        summary = summarize(pstats.Stats(profiler))
+
+        backoff = float(re.search(r"retry backoff\s+([\d.]+)s", summary).group(1))
+        check.greater_equal(backoff, 0.045, "The sleep should be attributed to retry backoff")
+        client_section = summary.split("utils/api_client.py", 1)[1]
+        check.is_in("_make_request", client_section, "Client functions should be listed")
+
+    @pytest.mark.unit
+    def test_recorder_writes_three_files(self, tmp_path):
+        """
+        Test Case: Write the profile of a parametrized test
+
+        Expected Result: .prof, .collapsed and .txt files named after the sanitized node ID
+        """
+        profiler = cProfile.Profile()
+        profiler.enable()
+        busy_wait(0.01)
+        profiler.disable()
+        sampler = StackSampler(threading.get_ident())
+        ProfileRecorder(tmp_path, profile_all=False)._write("tests/test_a.py::test_b[x-1]", profiler, sampler)
+
+        base_name = "tests_test_a.py_test_b_x-1"
+        check.equal(sorted(path.name for path in tmp_path.iterdir()),
+                    [f"{base_name}.collapsed", f"{base_name}.prof", f"{base_name}.txt"], "Three files should be written")
+        check.is_true((tmp_path / f"{base_name}.txt").read_text(encoding="utf-8").startswith("tests/test_a.py::test_b[x-1]\n"),
+                      "The summary should start with the node ID")
@@ -0,0 +1,98 @@
+"""
+Test Cases for the NDJSON results stream
+utils/results_stream.py
+"""
+from types import SimpleNamespace
+
+import pytest
+import pytest_check as check
+
+from utils.results_stream import ResultsStreamWriter, overall_outcome, read_records, write_html_report
+
+
+def phase(outcome, wasxfail=None):
+    result = {"outcome": outcome, "duration": 0.01}
+    if wasxfail is not None:
+        result["wasxfail"] = wasxfail
+    return result
+
+
+class TestOverallOutcome:
+    """Test suite for deriving a test's outcome from its setup/call/teardown phases"""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("record, expected", [
+        ({"setup": phase("passed"), "call": phase("passed"), "teardown": phase("passed")}, "passed"),
+        ({"setup": phase("passed"), "call": phase("failed"), "teardown": phase("passed")}, "failed"),
+        ({"setup": phase("failed"), "teardown": phase("passed")}, "error"),
+        ({"setup": phase("skipped"), "teardown": phase("passed")}, "skipped"),
+        ({"setup": phase("passed"), "call": phase("skipped"), "teardown": phase("passed")}, "skipped"),
+        ({"setup": phase("passed"), "call": phase("passed"), "teardown": phase("failed")}, "error"),
+        ({"setup": phase("passed"), "call": phase("failed"), "teardown": phase("failed")}, "failed"),
+        ({"setup": phase("passed"), "call": phase("skipped", "bug"), "teardown": phase("passed")}, "xfailed"),
+        ({"setup": phase("passed"), "call": phase("passed", ""), "teardown": phase("passed")}, "xpassed"),
+        ({"setup": phase("passed")}, "error"),
+    ], ids=["passed", "failed", "setup error", "skipped in setup", "skipped in call", "teardown error",
+            "failed with teardown error", "xfailed", "xpassed", "no call report"])
+    def test_overall_outcome(self, record, expected):
+        """
+        Test Case: Combine phase outcomes into one outcome
+
+        Expected Result: Same outcome pytest's terminal summary reports for the test
+        """
+        check.equal(overall_outcome(record), expected, f"Unexpected outcome for {record}")
+
+
+def report(when, outcome, longrepr="", sections=()):
+    """ Just enough of pytest's TestReport for the stream writer """
+    return SimpleNamespace(
+        nodeid="tests/test_x.py::test_x", location=("tests/test_x.py", 3, "test_x"), keywords={"unit": 1},
+        when=when, outcome=outcome, duration=0.01, failed=outcome == "failed", skipped=outcome == "skipped",
+        longrepr=longrepr or None, longreprtext=longrepr, sections=list(sections),
+    )
+
+
+class TestResultsStreamWriter:
+    """Test suite for the records written to the results stream"""
+
+    @pytest.fixture()
+    def stream(self, tmp_path):
+        path = tmp_path / "results.ndjson"
+        writer = ResultsStreamWriter(path, ["unit"])
+        writer._file = open(path, "w", encoding="utf-8")
+        yield writer, path
+        writer._file.close()
+
+    @pytest.mark.unit
+    def test_failed_phase_keeps_captured_output(self, stream, tmp_path):
+        """
+        Test Case: Stream a test whose call fails after printing to stdout and logging, with a
+        passing setup that also printed
+
+        Expected Result: The failed call phase stores its captured sections next to the failure
+        text, passing phases store none, and the HTML report shows the captured output
+        """
+        writer, path = stream
+        writer.pytest_runtest_logreport(report("setup", "passed", sections=[("Captured stdout setup", "ready")]))
+        writer.pytest_runtest_logreport(report("call", "failed", "AssertionError: 500 != 200", [
+            ("Captured stdout call", "response body: {}"),
+            ("Captured log call", "WARNING retrying GET /licenses"),
+        ]))
+        writer.pytest_runtest_logreport(report("teardown", "passed"))
+        writer._file.flush()
+
+        record = next(read_records(path))
+        check.equal(record["outcome"], "failed", "Test should be failed")
+        check.equal(record["call"]["longrepr"], "AssertionError: 500 != 200", "Failure text should be kept")
+        check.equal(record["call"]["sections"], [["Captured stdout call", "response body: {}"],
+                                                 ["Captured log call", "WARNING retrying GET /licenses"]],
+                    "Captured output of the failed phase should be kept")
+        check.is_not_in("sections", record["setup"], "Passing phases should not store captured output")
+        check.equal(record["markers"], ["unit"], "Known markers should be recorded")
+
+        html_path = tmp_path / "report.html"
+        write_html_report(path, html_path)
+        page = html_path.read_text(encoding="utf-8")
+        check.is_in("<summary>Captured log call</summary><pre>WARNING retrying GET /licenses</pre>", page,
+                    "HTML report should show captured output")
+
@@ -0,0 +1,57 @@
+"""
+Test Cases for the concurrent scenario engine
+utils/scenarios.py
+"""
+import pytest
+import pytest_check as check
+
+from config.api_config import config
+from utils.scenarios import FAILED, PASSED, SKIPPED, ScenarioRunner, license_lifecycle_scenario
+
+
+TEAM_1, TEAM_2 = list(config.TEAM_IDS.values())[:2]
+
+
+@pytest.mark.parametrize("model_client", [{"thread_safe": True}], indirect=True)
+class TestLicenseLifecycleScenario:
+    """Test suite for the built-in lifecycle scenario and its cleanup steps"""
+
+    @staticmethod
+    def license_states(license_model, license_ids):
+        return {license_id: (license_model.licenses[license_id]["team"]["id"],
+                             license_model.licenses[license_id]["isAvailableToAssign"])
+                for license_id in license_ids}
+
+    @pytest.mark.unit
+    def test_licenses_end_unassigned_in_their_team(self, model_client, license_model):
+        """
+        Test Case: Run four lifecycle instances, each assigning, moving and revoking its own license
+
+        Expected Result: Every instance passes, and every license is back in team 1 and available
+        """
+        license_ids = model_client.get_team_available_licenses(team_id=str(TEAM_1))[:4]
+        scenario = license_lifecycle_scenario(model_client, license_ids, TEAM_1, TEAM_2)
+        report = ScenarioRunner(max_workers=4).run(scenario, len(license_ids))
+
+        check.equal(report.completed, 4, f"All instances should pass:\n{report.format()}")
+        check.equal(report.steps["restore"].outcomes[PASSED], 4, "Every license should be moved back")
+        check.equal(self.license_states(license_model, license_ids), {license_id: (TEAM_1, True) for license_id in license_ids},
+                    "Licenses should be available in team 1 again")
+
+    @pytest.mark.unit
+    def test_failed_move_skips_the_move_back(self, model_client, license_model):
+        """
+        Test Case: Run lifecycle instances whose move to the target team is rejected (unknown team)
+
+        Expected Result: Assignments are still revoked, the move back is skipped, and every license
+        is available in team 1
+        """
+        license_ids = model_client.get_team_available_licenses(team_id=str(TEAM_1))[:2]
+        scenario = license_lifecycle_scenario(model_client, license_ids, TEAM_1, target_team_id=1)
+        report = ScenarioRunner(max_workers=2).run(scenario, len(license_ids))
+
+        check.equal(report.steps["move"].outcomes[FAILED], 2, "Moves to an unknown team should fail")
+        check.equal(report.steps["revoke"].outcomes[PASSED], 2, "Assignments should be revoked anyway")
+        check.equal(report.steps["restore"].outcomes[SKIPPED], 2, "Nothing should be moved back")
+        check.equal(self.license_states(license_model, license_ids), {license_id: (TEAM_1, True) for license_id in license_ids},
+                    "Licenses should be available in team 1")
@@ -0,0 +1,113 @@
+"""
+Test Cases for the soak test's workload, pool accounting and growth checks
+utils/soak.py
+"""
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import pytest_check as check
+
+from utils.api_client import LicenseAPIClient
+from utils.connection_warmup import warm_up_pool
+from utils.soak import Sample, SoakRunner, evaluate, pool_stats
+
+
+MiB = 2 ** 20
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+
+def sample(rss=100 * MiB, traced=10 * MiB, fds=20, pools=1, connections=4, idle=4, sessions=8):
+    """ A Sample with the given measurements, taken without a client """
+    result = Sample.__new__(Sample)
+    for field, value in dict(elapsed=0.0, calls=0, rss=rss, fds=fds, pools=pools, connections=connections,
+                             idle=idle, sessions=sessions, traced=traced).items():
+        setattr(result, field, value)
+    return result
+
+
+class TestSoak:
+    """Test suite for pool statistics, growth evaluation and the soak workload"""
+
+    @pytest.mark.unit
+    def test_pool_stats_count_checked_out_connections(self):
+        """
+        Test Case: Open two connections to a local server and check one of them out
+
+        Expected Result: One pool with two opened connections, of which one is idle
+        """
+        server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f"http://127.0.0.1:{server.server_port}"
+        try:
+            with LicenseAPIClient(thread_safe=True, base_url=base_url, hedge_reads=False) as client:
+                warm_up_pool(client.session, base_url, 2, timeout=5)
+                pool = client.session.get_adapter(base_url).poolmanager.connection_from_url(base_url)
+                checked_out = pool._get_conn()
+                try:
+                    check.equal(pool_stats(client), (1, 2, 1), "Checked-out connections should count as opened, not idle")
+                finally:
+                    pool._put_conn(checked_out)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("final, failure", [
+        (sample(), None),
+        (sample(rss=140 * MiB), "RSS grew by 40.0 MiB (limit 32 MiB)"),
+        (sample(traced=30 * MiB), "traced memory grew by 20.0 MiB (limit 16 MiB)"),
+        (sample(fds=30), "open file descriptors grew by 10.0 (limit 4)"),
+        (sample(pools=2), "connection pools grew from 1 to 2"),
+        (sample(connections=40), "40 connections opened by the pools exceed the limit of 32"),
+        (sample(sessions=9), "per-thread sessions grew from 8 to 9"),
+    ], ids=["steady", "rss", "traced", "fds", "pools", "connections", "sessions"])
+    def test_evaluate_reports_each_growth(self, final, failure):
+        """
+        Test Case: Compare final samples against a steady baseline, one measurement grown at a time
+
+        Expected Result: Only the grown measurement is reported
+        """
+        failures = evaluate([sample()] * 3, [final] * 3, max_rss_growth=32, max_traced_growth=16, max_fd_growth=4,
+                            max_connections=32)
+        check.equal(failures, [failure] if failure else [], "Unexpected threshold violations")
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("model_client", [{"thread_safe": True}], indirect=True)
+    def test_workload_leaves_inventory_unchanged(self, model_client):
+        """
+        Test Case: Run every operation of the mix from two workers for a short while
+
+        Expected Result: Calls succeed without errors and the available licenses are the same afterwards
+        """
+        before = model_client.get_license_inventory().available_ids()
+        runner = SoakRunner(model_client, {"get_licenses": 1, "get_team_licenses": 1, "assign_revoke": 1,
+                                           "change_team": 1, "rejected": 1}, workers=2, seed=1)
+        runner.start()
+        deadline = time.monotonic() + 10
+        while runner.calls < 200 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        runner.stop()
+
+        check.greater_equal(runner.calls, 200, "The workers should make calls")
+        check.equal(runner.errors, 0, f"No operation should fail: {runner.last_error}")
+        check.equal(sorted(model_client.get_license_inventory().available_ids()), sorted(before),
+                    "The inventory should be unchanged")
+
+    @pytest.mark.unit
+    def test_unknown_operation_is_rejected(self, model_client):
+        """
+        Test Case: Create a runner with an operation the soak test does not know
+
+        Expected Result: ValueError listing the known operations
+        """
+        with pytest.raises(ValueError, match="Unknown operations"):
+            SoakRunner(model_client, {"delete_everything": 1})
@@ -0,0 +1,55 @@
+"""
+Test Cases for the timing database regression report
+utils/timing_db.py
+"""
+import pytest
+import pytest_check as check
+
+from utils.timing_db import TimingDatabase, find_regressions, main
+
+
+class TestTimingReport:
+    """Test suite for detecting p50/p95 regressions between runs"""
+
+    @pytest.fixture()
+    def database_path(self, tmp_path):
+        """ A baseline run and a current run; the quick test was free in the baseline """
+        path = tmp_path / "timings.db"
+        database = TimingDatabase(path)
+        with database.connection:
+            database.connection.executemany("INSERT INTO runs (run_id, started_at) VALUES (?, ?)",
+                                            [("baseline", 1000.0), ("current", 2000.0)])
+        database.add_test_timings("baseline", [("tests/test_a.py::test_quick", 0.0, 0.0, 0.0, "skipped"),
+                                               ("tests/test_a.py::test_steady", 0.1, 1.0, 0.1, "passed")])
+        database.add_test_timings("current", [("tests/test_a.py::test_quick", 0.1, 0.5, 0.1, "passed"),
+                                              ("tests/test_a.py::test_steady", 0.1, 1.05, 0.1, "passed")])
+        database.close()
+        return path
+
+    @pytest.mark.unit
+    def test_regressions_beyond_threshold_and_noise(self):
+        """
+        Test Case: Compare samples that grew a lot, grew within the threshold, and grew by less
+        than the noise floor
+
+        Expected Result: Only the large growth is reported, for both p50 and p95
+        """
+        baseline = {"slow": [1.0, 1.0], "steady": [1.0, 1.0], "tiny": [0.01, 0.01]}
+        current = {"slow": [2.0, 2.0], "steady": [1.1, 1.1], "tiny": [0.04, 0.04], "new": [5.0]}
+        check.equal(find_regressions(baseline, current, threshold=0.25, min_delta=0.05),
+                    [("slow", "p50", 1.0, 2.0), ("slow", "p95", 1.0, 2.0)], "Only the slow test should regress")
+
+    @pytest.mark.unit
+    def test_report_with_zero_baseline(self, database_path, capsys):
+        """
+        Test Case: Report on a test whose baseline duration was zero and is now 0.7s
+
+        Expected Result: The regression is reported without a relative growth, and the report
+        exits with 1 instead of failing on a division by zero
+        """
+        exit_code = main(["report", "--db", str(database_path), "--baseline-runs", "1"])
+        output = capsys.readouterr().out
+        check.equal(exit_code, 1, "A regression should fail the report")
+        check.is_in("0.000s -> 0.700s (from zero)  tests/test_a.py::test_quick", output,
+                    "The zero-baseline regression should be listed")
+        check.is_not_in("test_steady", output, "Growth within the threshold should not be listed")
@@ -0,0 +1,123 @@
+"""
+Test Cases for span tracing of API calls and HTTP attempts
+utils/tracing.py
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import pytest_check as check
+
+from utils.api_client import LicenseAPIClient
+from utils.tracing import NON_RECORDING_SPAN, STATUS_ERROR, SpanExporter, Tracer, _current_span, tracer
+
+
+class FlakyHandler(BaseHTTPRequestHandler):
+    """ Answers 503 to the first request and 200 to the rest, remembering the traceparent headers """
+
+    def do_GET(self):
+        self.server.traceparents.append(self.headers.get("traceparent"))
+        status = 503 if len(self.server.traceparents) == 1 else 200
+        body = b"[]"
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def read_spans(path):
+    spans = []
+    with open(path, encoding="utf-8") as trace_file:
+        for line in trace_file:
+            for resource_spans in json.loads(line)["resourceSpans"]:
+                for scope_spans in resource_spans["scopeSpans"]:
+                    spans.extend(scope_spans["spans"])
+    return {span["name"]: span for span in spans}
+
+
+class TestTracing:
+    """Test suite for span nesting, OTLP export and per-attempt client spans"""
+
+    @pytest.fixture()
+    def trace_path(self, tmp_path):
+        """ Export spans of this test to its own file, outside any test span of a --tracing run """
+        path = tmp_path / "traces.jsonl"
+        previous = tracer.exporter
+        tracer.configure(SpanExporter(path))
+        token = _current_span.set(None)
+        yield path
+        _current_span.reset(token)
+        tracer.exporter.close()
+        tracer.exporter = previous
+
+    @pytest.mark.unit
+    def test_nested_spans_share_the_trace(self, trace_path):
+        """
+        Test Case: Open a span inside another, with the inner one raising
+
+        Expected Result: Both are exported in one trace, the inner one as a failed child of the outer
+        """
+        with tracer.span("outer", attributes={"count": 2, "ratio": 0.5, "flag": True, "skipped": None}):
+            with pytest.raises(KeyError):
+                with tracer.span("inner"):
+                    raise KeyError("missing")
+
+        spans = read_spans(trace_path)
+        outer, inner = spans["outer"], spans["inner"]
+        check.equal(inner["traceId"], outer["traceId"], "Spans should share the trace")
+        check.equal(inner.get("parentSpanId"), outer["spanId"], "Inner should be a child of outer")
+        check.is_not_in("parentSpanId", outer, "Outer should be a root span")
+        check.equal(inner["status"], {"code": STATUS_ERROR, "message": "KeyError: 'missing'"}, "Inner should be failed")
+        check.equal(outer["attributes"], [
+            {"key": "count", "value": {"intValue": "2"}},
+            {"key": "ratio", "value": {"doubleValue": 0.5}},
+            {"key": "flag", "value": {"boolValue": True}},
+        ], "Attributes should be typed and None values left out")
+
+    @pytest.mark.unit
+    def test_retried_call_has_a_span_per_attempt(self, trace_path):
+        """
+        Test Case: Make a GET that the server answers with 503 once before succeeding
+
+        Expected Result: The call's span has two attempt spans, a failed 503 and a 200, and the
+        server received the call span's traceparent
+        """
+        server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+        server.daemon_threads = True
+        server.traceparents = []
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            with LicenseAPIClient(base_url=f"http://127.0.0.1:{server.server_port}", hedge_reads=False, max_retries=2) as client:
+                response = client.get("/customer/licenses")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+        check.equal(response.status_code, 200, "The retry should succeed")
+        spans = read_spans(trace_path)
+        call = spans["GET /customer/licenses"]
+        first, second = spans["GET attempt 1"], spans["GET attempt 2"]
+        check.equal([first.get("parentSpanId"), second.get("parentSpanId")], [call["spanId"]] * 2,
+                    "Attempts should be children of the call")
+        check.equal(first["status"]["code"], STATUS_ERROR, "The 503 attempt should be failed")
+        check.equal(second["status"]["code"], 0, "The 200 attempt should not be failed")
+        check.equal(server.traceparents, [f"00-{call['traceId']}-{call['spanId']}-01"] * 2,
+                    "Both attempts should carry the call's traceparent")
+
+    @pytest.mark.unit
+    def test_disabled_tracer_records_nothing(self):
+        """
+        Test Case: Open a span on a tracer without an exporter
+
+        Expected Result: The non-recording stand-in is yielded and attempts are ignored
+        """
+        disabled = Tracer()
+        with disabled.span("ignored") as span:
+            disabled.begin_attempt()
+            disabled.end_attempt(status_code=500)
+        check.is_true(span is NON_RECORDING_SPAN, "A disabled tracer should not record spans")
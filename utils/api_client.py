@@ -1,27 +1,101 @@
 """
 JetBrains Account API Client
 """
-from typing import Dict, Optional, Any
+import re
+import threading
+import time
+import uuid
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, List, Optional, Any, Tuple, TypeVar
 import requests
 from requests.adapters import HTTPAdapter
-from urllib3.util.retry import Retry
 
 from config.api_config import config, endpoints, status_codes
+from utils.api_response import APIResult
+from utils.connection_warmup import warm_up_pool
+from utils.deadline import DeadlineExceeded, DeadlineRetry, DeadlineTimeout, deadline_scope, submit_in_context
+from utils.hedging import HedgedRequester
+from utils.inventory_snapshot import InventorySnapshot
+from utils.latency import normalize_endpoint
+from utils.license_models import LicenseInventory
+from utils.tracing import tracer
+
+
+# Endpoint templates such as /customer/teams/{team_id}/licenses matched against formatted paths
+_ENDPOINT_TIMEOUTS = [
+    (re.compile(re.sub(r"\\\{\w+\\\}", "[^/]+", re.escape(template)) + "$"), timeout)
+    for template, timeout in endpoints.TIMEOUTS.items()
+]
+
+
+def endpoint_timeout(endpoint: str) -> Tuple[float, float]:
+    """ (connect, read) timeout configured for an endpoint path """
+    for pattern, timeout in _ENDPOINT_TIMEOUTS:
+        if pattern.match(endpoint):
+            return timeout
+    return config.CONNECT_TIMEOUT, config.TIMEOUT
+
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 class APIClient:
     """ JetBrains Account API Client """
     
-    def __init__(self):
-        """ Initialize the API client """
-        self.base_url = config.BASE_URL
+    # Callables notified after every HTTP call as listener(method, endpoint, status_code, elapsed);
+    # status_code is None when the request raised
+    request_listeners: List[Callable[[str, str, Optional[int], float], None]] = []
+    
+    def __init__(
+        self,
+        hedge_reads: Optional[bool] = None,
+        api_key: Optional[str] = None,
+        thread_safe: bool = False,
+        base_url: Optional[str] = None,
+        typed_results: Optional[bool] = None,
+        max_retries: Optional[int] = None,
+        customer_code: Optional[str] = None
+    ):
+        """
+        Initialize the API client
+        
+        api_key overrides config.API_KEY; an empty string sends no X-Api-Key header.
+        customer_code overrides config.CUSTOMER_CODE, so one process can speak for several organizations.
+        base_url overrides config.BASE_URL, e.g. to target a local stand-in server.
+        With typed_results=True (default config.TYPED_RESULTS) responses come back as APIResult
+        wrappers that decode the body once and expose typed error codes.
+        max_retries overrides config.MAX_RETRIES; with 0 every response, 5xx included, is returned as is.
+        With thread_safe=True auth headers are fixed at construction and every thread
+        gets its own requests.Session sharing one connection pool, so the client can
+        be used from ThreadPoolExecutor workers (see map_concurrent).
+        """
+        self.base_url = config.BASE_URL if base_url is None else base_url.rstrip("/")
+        self.api_key = config.API_KEY if api_key is None else api_key
+        self.customer_code = config.CUSTOMER_CODE if customer_code is None else customer_code
+        self.thread_safe = thread_safe
+        self.typed_results = config.TYPED_RESULTS if typed_results is None else typed_results
+        self.max_retries = config.MAX_RETRIES if max_retries is None else max_retries
         self.session = requests.Session()
+        self._local = threading.local()
+        # Sessions drop out when their thread ends, so the set tracks the live ones
+        self._thread_sessions: "weakref.WeakSet[requests.Session]" = weakref.WeakSet()
         self._setup_session()
+        
+        self.hedger = None
+        if config.HEDGE_READS if hedge_reads is None else hedge_reads:
+            self.hedger = HedgedRequester(
+                delay_percentile=config.HEDGE_PERCENTILE,
+                max_extra_ratio=config.HEDGE_MAX_EXTRA_RATIO,
+                default_delay=config.HEDGE_DEFAULT_DELAY
+            )
     
     def _setup_session(self):
         """ Setup HTTP session with retry strategy """
-        retry_strategy = Retry(
-            total=config.MAX_RETRIES,
+        retry_strategy = DeadlineRetry(
+            total=self.max_retries,
             backoff_factor=config.RETRY_DELAY,
             status_forcelist=[
                 status_codes.TOO_MANY_REQUESTS,
@@ -29,25 +103,89 @@ class APIClient:
                 status_codes.BAD_GATEWAY,
                 status_codes.SERVICE_UNAVAILABLE,
                 status_codes.GATEWAY_TIMEOUT
-            ],
+            ] if self.max_retries else [],
             allowed_methods=["HEAD", "GET", "OPTIONS", "POST", "PUT", "DELETE"]
         )
         
         # Create HTTP adapter with retry strategy and mount to session
         # This applies automatic retry logic to all HTTP/HTTPS requests
-        adapter = HTTPAdapter(max_retries=retry_strategy)
+        adapter = HTTPAdapter(max_retries=retry_strategy, pool_maxsize=config.POOL_MAXSIZE)
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
         
+        self.transport = "http"
+        if config.TRANSPORT == "inmemory" and self.base_url == config.BASE_URL:
+            # Longest-prefix match sends API calls to the in-memory model instead of the network;
+            # an explicit base_url (e.g. a local stand-in server) is still reached over HTTP
+            from utils.inmemory_transport import InMemoryLicenseAdapter
+            self.session.mount(self.base_url, InMemoryLicenseAdapter(self.base_url))
+            self.transport = "inmemory"
+        
         # Set default headers
-        self.session.headers.update({
+        default_headers = {
             "Content-Type": "application/json",
             "accept": "*/*",
-            "X-Api-Key": config.API_KEY,
-            "X-Customer-Code": config.CUSTOMER_CODE,
+            "X-Api-Key": self.api_key,
+            "X-Customer-Code": self.customer_code,
             "User-Agent": "JetBrains-API-Automation-Tests/1.0"
-        })
+        }
+        if not self.api_key:
+            del default_headers["X-Api-Key"]
+        self.default_headers = MappingProxyType(default_headers)
+        self.session.headers.update(default_headers)
     
+    def _thread_session(self) -> requests.Session:
+        """
+        Session used by the calling thread; all sessions share the adapters (and pools) of self.session.
+        Hedged clients also need one per thread, as hedge attempts run on the hedging executor's threads.
+        """
+        if not self.thread_safe and self.hedger is None:
+            return self.session
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            for prefix, adapter in self.session.adapters.items():
+                session.mount(prefix, adapter)
+            self._local.session = session
+            self._thread_sessions.add(session)
+        return session
+
+    @property
+    def live_thread_sessions(self) -> int:
+        """ Per-thread sessions whose threads are still alive (0 unless thread_safe or hedging) """
+        return len(self._thread_sessions)
+    
+    def map_concurrent(self, func: Callable[[T], R], items: Iterable[T], max_workers: int = 8) -> List[R]:
+        """
+        Apply func to every item on a thread pool and return the results in input order.
+        
+        Requires a thread-safe client. The caller's deadline_scope applies inside the workers;
+        the first exception raised by func is re-raised once all items have been processed.
+        """
+        if not self.thread_safe:
+            raise ValueError("map_concurrent requires a client created with thread_safe=True")
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="api-client") as executor:
+            futures = [submit_in_context(executor, func, item) for item in items]
+        return [future.result() for future in futures]
+    
+    def close(self):
+        """ Close pooled connections (shared by all per-thread sessions) and stop the hedging executor """
+        if self.hedger is not None:
+            self.hedger.close()
+        self.session.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        self.close()
+    
+    def warm_up(self, connections: Optional[int] = None) -> int:
+        """ Pre-open keep-alive connections to the API host so the first request hits a warm socket """
+        if connections is None:
+            connections = config.WARM_CONNECTIONS
+        return warm_up_pool(self.session, self.base_url, connections, timeout=config.CONNECT_TIMEOUT)
 
     
     def _make_request(
@@ -57,18 +195,28 @@ class APIClient:
         json_data: Optional[Dict] = None,
         params: Optional[Dict] = None,
         headers: Optional[Dict] = None,
+        deadline: Optional[float] = None,
         **kwargs
     ) -> requests.Response:
-        """ Make HTTP request to the API """
+        """
+        Make HTTP request to the API
+        
+        The call, including urllib3 retries and backoff, is bounded by `deadline` seconds
+        (default config.OPERATION_DEADLINE) and by any enclosing deadline_scope.
+        """
         url = f"{self.base_url}{endpoint}"
         
-        # Merge additional headers with default headers
-        request_headers = dict(self.session.headers)
+        # Merge additional headers with default headers; thread-safe clients never read
+        # shared mutable session state
+        session = self._thread_session()
+        request_headers = dict(self.default_headers if self.thread_safe else self.session.headers)
         if headers:
             request_headers.update(headers)
         
+        timeout = kwargs.pop('timeout', None) or endpoint_timeout(endpoint)
+        connect_timeout, read_timeout = timeout if isinstance(timeout, tuple) else (timeout, timeout)
+        
         request_kwargs = {
-            'timeout': config.TIMEOUT,
             'headers': request_headers,
             **kwargs
         }
@@ -78,14 +226,48 @@ class APIClient:
         if params:
             request_kwargs['params'] = params
         
+        # One correlation ID per logical call, shared by all of its retries
+        correlation_id = uuid.uuid4().hex
+        request_headers["X-Correlation-ID"] = correlation_id
+        
+        status_code = None
+        start = time.perf_counter()
         try:
-            response = self.session.request(method, url, **request_kwargs)
-            return response
-        except requests.exceptions.RequestException as e:
-            raise
+            with tracer.span(f"{method} {normalize_endpoint(endpoint)}", attributes={
+                "http.request.method": method,
+                "url.full": url,
+                "correlation_id": correlation_id,
+            }) as operation:
+                if operation.recording:
+                    request_headers["traceparent"] = operation.traceparent
+                with deadline_scope(config.OPERATION_DEADLINE if deadline is None else deadline) as operation_deadline:
+                    if operation_deadline.expired:
+                        raise DeadlineExceeded(f"Deadline exceeded before {method} {endpoint} was sent")
+                    request_kwargs['timeout'] = DeadlineTimeout(connect_timeout, read_timeout, operation_deadline)
+                    tracer.begin_attempt()
+                    try:
+                        response = session.request(method, url, **request_kwargs)
+                    except requests.exceptions.RequestException as e:
+                        tracer.end_attempt(error=e)
+                        raise
+                    tracer.end_attempt(status_code=response.status_code)
+                status_code = response.status_code
+                operation.set_attribute("http.response.status_code", status_code)
+                if status_code >= 400:
+                    operation.set_error(str(status_code))
+            return APIResult(response) if self.typed_results else response
+        finally:
+            elapsed = time.perf_counter() - start
+            for listener in self.request_listeners:
+                listener(method, endpoint, status_code, elapsed)
     
     def get(self, endpoint: str, params: Optional[Dict] = None, **kwargs) -> requests.Response:
-        """ Make GET request """
+        """ Make GET request, hedged when hedging of reads is enabled """
+        if self.hedger is not None:
+            return self.hedger.execute(
+                normalize_endpoint(endpoint),
+                lambda: self._make_request("GET", endpoint, params=params, **kwargs)
+            )
         return self._make_request("GET", endpoint, params=params, **kwargs)
     
     def post(self, endpoint: str, json_data: Optional[Dict] = None, **kwargs) -> requests.Response:
@@ -184,55 +366,65 @@ class LicenseAPIClient(APIClient):
         
         return self.get(endpoint, params=params)
     
-    def get_available_licenses(self) -> list:
-        """ Get list of unassigned license IDs from organization """
-        response = self.get_licenses(assigned=False)
-        
+    def get_license_inventory(
+        self,
+        team_id: Optional[str] = None,
+        assigned: Optional[bool] = None
+    ) -> LicenseInventory:
+        """ Get licenses (organization-wide or for one team) as a compact columnar inventory """
+        if team_id is None:
+            return self._license_inventory(self.get_licenses(assigned=assigned), "licenses")
+        return self._license_inventory(self.get_team_licenses(team_id=team_id, assigned=assigned), "team licenses")
+    
+    def _license_inventory(self, response: requests.Response, description: str) -> LicenseInventory:
+        """ Decode a license list response, raising on error statuses and malformed bodies """
         if response.status_code != 200:
-            raise Exception(f"Failed to get licenses: {response.status_code} - {response.text}")
+            raise Exception(f"Failed to get {description}: {response.status_code} - {response.text}")
         
         try:
-            licenses_data = response.json()
-            
-            # response.json() returns list of dicts
-            unassigned_licenses = [
-                license.get('licenseId') 
-                for license in licenses_data 
-                if license.get('licenseId') and license.get('isAvailableToAssign', False)
-            ]
-            
-            if not unassigned_licenses:
-                raise Exception("unassigned license list is empty")
-            
-            return unassigned_licenses
-            
+            if isinstance(response, APIResult):
+                return response.inventory
+            return LicenseInventory.from_json(response.content)
         except ValueError as e:
-            raise Exception(f"Failed to parse licenses response: {e}")
+            raise Exception(f"Failed to parse {description} response: {e}")
+    
+    @property
+    def inventory_source(self) -> str:
+        """ Transport, API host and organization whose inventory this client fetches """
+        return f"{self.transport}:{self.base_url}#{self.customer_code}"
+    
+    def write_inventory_snapshot(self, path: str) -> InventorySnapshot:
+        """ Fetch the organization inventory and write it to a shared on-disk snapshot """
+        snapshot = InventorySnapshot(path, source=self.inventory_source)
+        snapshot.write(self.get_license_inventory())
+        return snapshot
+    
+    def open_inventory_snapshot(self, path: str, max_age: float) -> InventorySnapshot:
+        """
+        Open a shared snapshot, fetching the inventory only if it is missing, older than max_age
+        seconds or was taken from another transport, API host or organization
+        """
+        snapshot = InventorySnapshot(path, source=self.inventory_source)
+        snapshot.refresh_if_stale(self.get_license_inventory, max_age)
+        return snapshot
+    
+    def get_available_licenses(self) -> list:
+        """ Get list of unassigned license IDs from organization """
+        unassigned_licenses = self.get_license_inventory(assigned=False).available_ids()
+        
+        if not unassigned_licenses:
+            raise Exception("unassigned license list is empty")
+        
+        return unassigned_licenses
     
     def get_assigned_licenses(self) -> list:
         """ Get list of assigned license IDs from organization """
-        response = self.get_licenses(assigned=True)
+        assigned_licenses = self.get_license_inventory(assigned=True).assigned_ids()
         
-        if response.status_code != 200:
-            raise Exception(f"Failed to get licenses: {response.status_code} - {response.text}")
+        if not assigned_licenses:
+            raise Exception("assigned license list is empty")
         
-        try:
-            licenses_data = response.json()
-            
-            # response.json() returns list of dicts
-            assigned_licenses = [
-                license.get('licenseId') 
-                for license in licenses_data 
-                if license.get('licenseId') and not license.get('isAvailableToAssign', True)
-            ]
-            
-            if not assigned_licenses:
-                raise Exception("assigned license list is empty")
-            
-            return assigned_licenses
-            
-        except ValueError as e:
-            raise Exception(f"Failed to parse licenses response: {e}")
+        return assigned_licenses
 
     def get_available_license(self) -> str:
         """ Get a single available license ID from organization """
@@ -248,51 +440,21 @@ class LicenseAPIClient(APIClient):
     
     def get_team_available_licenses(self, team_id: str) -> list:
         """ Get list of unassigned license IDs from specific team """
-        response = self.get_team_licenses(team_id=team_id, assigned=False)
+        unassigned_licenses = self.get_license_inventory(team_id=team_id, assigned=False).available_ids()
         
-        if response.status_code != 200:
-            raise Exception(f"Failed to get team licenses: {response.status_code} - {response.text}")
+        if not unassigned_licenses:
+            raise Exception(f"unassigned license list is empty for team {team_id}")
         
-        try:
-            licenses_data = response.json()
-            
-            unassigned_licenses = [
-                license.get('licenseId') 
-                for license in licenses_data 
-                if license.get('licenseId') and license.get('isAvailableToAssign', False)
-            ]
-            
-            if not unassigned_licenses:
-                raise Exception(f"unassigned license list is empty for team {team_id}")
-            
-            return unassigned_licenses
-            
-        except ValueError as e:
-            raise Exception(f"Failed to parse team licenses response: {e}")
+        return unassigned_licenses
     
     def get_team_assigned_licenses(self, team_id: str) -> list:
         """ Get list of assigned license IDs from specific team """
-        response = self.get_team_licenses(team_id=team_id, assigned=True)
+        assigned_licenses = self.get_license_inventory(team_id=team_id, assigned=True).assigned_ids()
         
-        if response.status_code != 200:
-            raise Exception(f"Failed to get team licenses: {response.status_code} - {response.text}")
+        if not assigned_licenses:
+            raise Exception(f"assigned license list is empty for team {team_id}")
         
-        try:
-            licenses_data = response.json()
-            
-            assigned_licenses = [
-                license.get('licenseId') 
-                for license in licenses_data 
-                if license.get('licenseId') and not license.get('isAvailableToAssign', True)
-            ]
-            
-            if not assigned_licenses:
-                raise Exception(f"assigned license list is empty for team {team_id}")
-            
-            return assigned_licenses
-            
-        except ValueError as e:
-            raise Exception(f"Failed to parse team licenses response: {e}")
+        return assigned_licenses
     
     def get_team_available_license(self, team_id: str) -> str:
         """ Get a single available license ID from specific team """
@@ -0,0 +1,120 @@
+"""
+Typed, lazily-decoded API response wrapper
+"""
+from enum import Enum
+from typing import Any, Dict, Optional
+
+import requests
+
+from config.api_config import ErrorCodes
+from utils.license_models import LicenseInventory
+
+
+# Error codes of config.ErrorCodes as a str enum, so ErrorCode.INVALID_TOKEN == "INVALID_TOKEN"
+ErrorCode = Enum(
+    "ErrorCode",
+    [(name, spec["code"]) for name, spec in vars(ErrorCodes).items() if name.isupper() and isinstance(spec, dict)],
+    type=str,
+    module=__name__
+)
+
+
+class APIResult:
+    """
+    Wraps a requests.Response, decoding the body at most once and only when it is first needed.
+    Everything not defined here (status_code, text, headers, ...) is delegated to the response,
+    so an APIResult can be used wherever a response is.
+    """
+
+    __slots__ = ("response", "_json", "_json_error", "_inventory")
+
+    _UNSET = object()
+
+    def __init__(self, response: requests.Response):
+        self.response = response
+        self._json: Any = self._UNSET
+        self._json_error: Optional[ValueError] = None
+        self._inventory: Optional[LicenseInventory] = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.response, name)
+
+    def __bool__(self) -> bool:
+        return bool(self.response)
+
+    def __iter__(self):
+        return iter(self.response)
+
+    def __enter__(self) -> "APIResult":
+        return self
+
+    def __exit__(self, *args):
+        self.response.close()
+
+    def __repr__(self) -> str:
+        return f"<APIResult [{self.response.status_code}]>"
+
+    def json(self, **kwargs) -> Any:
+        """ Decoded body, parsed on the first call and cached (including a decoding failure) """
+        if kwargs:
+            return self.response.json(**kwargs)
+        if self._json is self._UNSET and self._json_error is None:
+            try:
+                self._json = self.response.json()
+            except ValueError as e:
+                self._json_error = e
+        if self._json_error is not None:
+            raise self._json_error
+        return self._json
+
+    def _error_body(self) -> Dict[str, Any]:
+        if self.response.status_code < 400:
+            return {}
+        try:
+            body = self.json()
+        except ValueError:
+            return {}
+        return body if isinstance(body, dict) else {}
+
+    @property
+    def raw_error_code(self) -> Optional[str]:
+        """ The `code` of an error body as sent, including codes ErrorCodes does not know """
+        code = self._error_body().get("code")
+        return code if isinstance(code, str) else None
+
+    @property
+    def error_code(self) -> Optional[ErrorCode]:
+        """ The error code mapped to ErrorCode; None for successful or unrecognized responses """
+        try:
+            return ErrorCode(self.raw_error_code)
+        except ValueError:
+            return None
+
+    @property
+    def error_description(self) -> Any:
+        return self._error_body().get("description")
+
+    def matches(self, expected: Dict[str, Any]) -> bool:
+        """ True if the error body matches an ErrorCodes entry (a None description matches any) """
+        if self.raw_error_code != expected["code"]:
+            return False
+        return expected["description"] is None or self.error_description == expected["description"]
+
+    @property
+    def inventory(self) -> LicenseInventory:
+        """
+        License list body as a columnar LicenseInventory; License objects are only built for the
+        rows that are accessed. Reuses an already-decoded json() body instead of parsing again.
+        """
+        if self._inventory is None:
+            if self._json is not self._UNSET:
+                if not isinstance(self._json, list):
+                    raise ValueError(f"Expected a JSON array of licenses, got {type(self._json).__name__}")
+                inventory = LicenseInventory()
+                for license_data in self._json:
+                    if isinstance(license_data, dict) and "licenseId" in license_data:
+                        inventory.append(license_data)
+                self._inventory = inventory
+            else:
+                self._inventory = LicenseInventory.from_json(self.response.content)
+        return self._inventory
@@ -0,0 +1,222 @@
+"""
+Bulk license onboarding from CSV or NDJSON exports
+
+Records are streamed from the input file and assigned concurrently; available license IDs
+come from a single inventory fetch. Every outcome is appended to a journal by the worker that
+produced it, before that worker takes the next record, so a restarted run skips every user that
+was already assigned.
+
+Usage:
+    python -m utils.bulk_onboard users.csv [--workers 8] [--team-id 2573297] [--journal users.csv.journal]
+
+CSV files need a header with email, firstName and lastName columns (first_name / last_name
+are accepted too); NDJSON files hold one object with the same keys per line.
+"""
+import argparse
+import csv
+import json
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterator, List, Optional, Set
+
+from config.api_config import status_codes, error_codes
+from utils.api_client import LicenseAPIClient
+from utils.deadline import current_deadline, deadline_scope, submit_bounded
+
+
+FIELD_ALIASES = {
+    "email": ("email", "Email", "e-mail"),
+    "firstName": ("firstName", "first_name", "First Name"),
+    "lastName": ("lastName", "last_name", "Last Name"),
+}
+
+# Attempts per record when the picked license was taken by someone else in the meantime
+MAX_LICENSE_ATTEMPTS = 3
+
+
+def read_records(path: Path) -> Iterator[Dict[str, str]]:
+    """ Stream user records from a CSV or NDJSON file without loading it into memory """
+    with open(path, newline="", encoding="utf-8") as input_file:
+        if path.suffix.lower() in (".ndjson", ".jsonl"):
+            rows = (json.loads(line) for line in input_file if line.strip())
+        else:
+            rows = csv.DictReader(input_file)
+        for row in rows:
+            yield {
+                field: next((str(row[alias]).strip() for alias in aliases if row.get(alias)), "")
+                for field, aliases in FIELD_ALIASES.items()
+            }
+
+
+class Journal:
+    """ Append-only NDJSON log of onboarding outcomes, keyed by lower-cased email; safe to share between threads """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.completed: Set[str] = set()
+        self._lock = threading.Lock()
+        if path.exists():
+            with open(path, encoding="utf-8") as journal_file:
+                for line in journal_file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # A crash can leave a torn last line; the record is simply retried
+                        continue
+                    if entry.get("status") == "assigned":
+                        self.completed.add(entry["email"].lower())
+        self._file = open(path, "a", encoding="utf-8")
+
+    def is_completed(self, email: str) -> bool:
+        return email.lower() in self.completed
+
+    def record(self, email: str, status: str, **details: Any):
+        entry = {"email": email, "status": status, "timestamp": time.time(), **details}
+        with self._lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            if status == "assigned":
+                self.completed.add(email.lower())
+
+    def close(self):
+        self._file.close()
+
+
+class BulkOnboarder:
+    """ Assigns licenses to streamed user records with bounded concurrency """
+
+    def __init__(
+        self,
+        client: LicenseAPIClient,
+        journal: Journal,
+        workers: int = 8,
+        team_id: Optional[int] = None,
+        send_email: bool = False
+    ):
+        self.client = client
+        self.journal = journal
+        self.workers = workers
+        self.team_id = team_id
+        self.send_email = send_email
+        self.available: Deque[str] = deque()
+        self.counts = {"assigned": 0, "skipped": 0, "failed": 0}
+        self._counts_lock = threading.Lock()
+
+    def load_inventory(self):
+        """ Fetch the available license IDs once for the whole run """
+        if self.team_id is not None:
+            license_ids = self.client.get_team_available_licenses(team_id=str(self.team_id))
+        else:
+            license_ids = self.client.get_available_licenses()
+        self.available.extend(license_ids)
+
+    def run(self, records: Iterator[Dict[str, str]]) -> Dict[str, int]:
+        self.load_inventory()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="onboard") as executor:
+            submit_bounded(executor, self._onboard, self._pending(records), self.workers * 2, _raise_error)
+        return self.counts
+
+    def _count(self, status: str):
+        with self._counts_lock:
+            self.counts[status] += 1
+
+    def _pending(self, records: Iterator[Dict[str, str]]) -> Iterator[Dict[str, str]]:
+        """ Records still to onboard, until the enclosing deadline (if any) runs out """
+        seen: Set[str] = set()
+        deadline = current_deadline()
+        for record in records:
+            if deadline is not None and deadline.expired:
+                return
+            email = record["email"].lower()
+            if not email or email in seen or self.journal.is_completed(email):
+                self._count("skipped")
+                continue
+            seen.add(email)
+            yield record
+
+    def _onboard(self, record: Dict[str, str]):
+        """ Assign a license and journal the outcome on the worker thread, before it takes another record """
+        try:
+            status, details = self._assign(record)
+        except Exception as e:
+            status, details = "failed", {"error": str(e)}
+        self.journal.record(record["email"], status, **details)
+        self._count(status)
+
+    def _next_license(self) -> Optional[str]:
+        try:
+            return self.available.popleft()
+        except IndexError:
+            return None
+
+    def _assign(self, record: Dict[str, str]):
+        for _ in range(MAX_LICENSE_ATTEMPTS):
+            license_id = self._next_license()
+            if license_id is None:
+                return "failed", {"error": "no available licenses left"}
+
+            response = self.client.assign_license(
+                email=record["email"],
+                first_name=record["firstName"],
+                last_name=record["lastName"],
+                license_id=license_id,
+                send_email=self.send_email
+            )
+            if response.status_code == status_codes.OK:
+                return "assigned", {"licenseId": license_id}
+
+            error = _error_body(response)
+            if error.get("code") != error_codes.LICENSE_IS_NOT_AVAILABLE_TO_ASSIGN["code"]:
+                # Validation errors belong to the record; put the untouched license back
+                self.available.appendleft(license_id)
+                return "failed", {"licenseId": license_id, "status_code": response.status_code, **error}
+        return "failed", {"error": f"licenses kept being taken after {MAX_LICENSE_ATTEMPTS} attempts"}
+
+
+def _raise_error(record: Dict[str, str], future: Future):
+    # Outcomes are journaled by the workers; only a failure to journal one is left to surface here
+    future.result()
+
+
+def _error_body(response) -> Dict[str, Any]:
+    try:
+        body = response.json()
+    except ValueError:
+        return {"error": response.text}
+    return body if isinstance(body, dict) else {"error": body}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m utils.bulk_onboard", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", type=Path, help="CSV or NDJSON (.ndjson/.jsonl) file with user records")
+    parser.add_argument("--journal", type=Path, help="Progress journal (default: <input>.journal)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent assign requests")
+    parser.add_argument("--team-id", type=int, help="Assign licenses from this team only")
+    parser.add_argument("--send-email", action="store_true", help="Let JetBrains email the assignees")
+    parser.add_argument("--time-budget", type=float, help="Stop issuing requests after this many seconds")
+    args = parser.parse_args(argv)
+
+    journal = Journal(args.journal or args.input.with_name(args.input.name + ".journal"))
+    client = LicenseAPIClient(thread_safe=True)
+    onboarder = BulkOnboarder(client, journal, args.workers, args.team_id, args.send_email)
+    try:
+        if args.time_budget:
+            with deadline_scope(args.time_budget):
+                counts = onboarder.run(read_records(args.input))
+        else:
+            counts = onboarder.run(read_records(args.input))
+    finally:
+        client.close()
+        journal.close()
+
+    print(f"Assigned: {counts['assigned']}, skipped: {counts['skipped']}, failed: {counts['failed']} "
+          f"(journal: {journal.path})")
+    return 1 if counts["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
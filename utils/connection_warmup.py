@@ -0,0 +1,105 @@
+"""
+Connection and DNS pre-warming for API clients
+"""
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError
+
+
+class DNSCache:
+    """ In-process cache for socket.getaddrinfo results with a fixed TTL """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Tuple, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        self._original_getaddrinfo = None
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            return entry[1]
+
+        result = self._original_getaddrinfo(host, port, family, type, proto, flags)
+        with self._lock:
+            self._entries[key] = (now + self.ttl, result)
+        return result
+
+    def install(self):
+        """ Route socket.getaddrinfo through the cache for the whole process """
+        if self._original_getaddrinfo is None:
+            self._original_getaddrinfo = socket.getaddrinfo
+            socket.getaddrinfo = self.getaddrinfo
+        return self
+
+    def uninstall(self):
+        if self._original_getaddrinfo is not None:
+            socket.getaddrinfo = self._original_getaddrinfo
+            self._original_getaddrinfo = None
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _connection_pool(session: requests.Session, url: str):
+    """ The urllib3 pool the session's adapter will use for requests to url """
+    adapter = session.get_adapter(url)
+    if hasattr(adapter, "get_connection_with_tls_context"):
+        # requests >= 2.32 keys pools by TLS context, resolved from a prepared request
+        request = requests.Request("GET", url).prepare()
+        return adapter.get_connection_with_tls_context(request, session.verify, session.proxies, session.cert)
+
+    pool = adapter.get_connection(url, session.proxies)
+    # Apply the CA bundle requests would set on first send, so warmed sockets match real ones
+    adapter.cert_verify(pool, url, session.verify, session.cert)
+    return pool
+
+
+def warm_up_pool(session: requests.Session, url: str, connections: int, timeout: Optional[float] = None) -> int:
+    """
+    Open up to `connections` keep-alive connections (TCP connect + TLS handshake) to the host
+    of url and park them in the session's pool. Returns how many connections were opened.
+    """
+    if connections <= 0 or not urlparse(url).hostname:
+        return 0
+    if not isinstance(session.get_adapter(url), HTTPAdapter):
+        # Non-network adapters (e.g. the in-memory transport) have nothing to warm
+        return 0
+
+    pool = _connection_pool(session, url)
+    connections = min(connections, pool.pool.qsize())
+    idle = [pool._get_conn() for _ in range(connections)]
+
+    def connect(conn) -> bool:
+        if conn.sock is not None:
+            return False
+        if timeout is not None:
+            conn.timeout = timeout
+        conn.connect()
+        return True
+
+    opened = 0
+    try:
+        with ThreadPoolExecutor(max_workers=max(connections, 1), thread_name_prefix="warm-up") as executor:
+            for conn, future in [(conn, executor.submit(connect, conn)) for conn in idle]:
+                try:
+                    opened += future.result()
+                except (OSError, HTTPError):
+                    # Warm-up is best effort; the real request will surface connection errors
+                    conn.close()
+    finally:
+        for conn in idle:
+            pool._put_conn(conn)
+    return opened
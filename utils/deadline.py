@@ -0,0 +1,149 @@
+"""
+Deadline propagation for logical API operations
+"""
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, wait
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, TypeVar
+
+import requests
+from urllib3.exceptions import MaxRetryError, ResponseError
+from urllib3.util.retry import Retry
+from urllib3.util.timeout import Timeout
+
+from utils.tracing import tracer
+
+T = TypeVar("T")
+
+
+class DeadlineExceeded(requests.exceptions.Timeout):
+    """ The time budget of a logical operation ran out before a request could be sent """
+
+
+class Deadline:
+    """ Absolute point in time by which a logical operation has to finish """
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+_current_deadline: "ContextVar[Optional[Deadline]]" = ContextVar("current_deadline", default=None)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """ The innermost active deadline, None outside any deadline scope """
+    return _current_deadline.get()
+
+
+@contextmanager
+def deadline_scope(seconds: float) -> Iterator[Deadline]:
+    """
+    Bound everything inside the block to `seconds`. Nested scopes never extend an outer
+    deadline, so a bulk operation's total budget also caps every call made within it.
+
+    Usage:
+        with deadline_scope(120):
+            for user in users:
+                license_client.assign_license(...)
+    """
+    deadline = Deadline(seconds)
+    outer = _current_deadline.get()
+    if outer is not None and outer.expires_at < deadline.expires_at:
+        deadline = outer
+    token = _current_deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current_deadline.reset(token)
+
+
+def submit_in_context(executor: Executor, fn: Callable[..., Any], *args: Any) -> Future:
+    """ Submit fn(*args) with a copy of the caller's context, so an enclosing deadline_scope bounds the worker's calls too """
+    return executor.submit(copy_context().run, fn, *args)
+
+
+def submit_bounded(
+    executor: Executor,
+    fn: Callable[[T], Any],
+    items: Iterable[T],
+    max_in_flight: int,
+    on_done: Callable[[T, Future], None]
+) -> None:
+    """
+    Run fn(item) for every item with at most max_in_flight submitted at a time and call
+    on_done(item, future) on the calling thread as each one finishes. Items are consumed
+    lazily, so huge inputs stream through in constant memory.
+
+    Usage:
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            submit_bounded(executor, assign, records, 16, lambda record, future: journal(record, future.result()))
+    """
+    in_flight: Dict[Future, T] = {}
+
+    def collect():
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            on_done(in_flight.pop(future), future)
+
+    for item in items:
+        while len(in_flight) >= max_in_flight:
+            collect()
+        in_flight[submit_in_context(executor, fn, item)] = item
+    while in_flight:
+        collect()
+
+
+# urllib3 rejects non-positive timeouts; an attempt started with no time left fails right away instead
+MIN_ATTEMPT_TIMEOUT = 0.001
+
+
+class DeadlineTimeout(Timeout):
+    """
+    (connect, read) timeout whose every attempt, retries included, is capped by what is left of a
+    deadline. urllib3 clones the timeout for each attempt, so the cap is applied in clone().
+    """
+
+    def __init__(self, connect: float, read: float, deadline: Deadline):
+        super().__init__(connect=connect, read=read)
+        self.deadline = deadline
+
+    def clone(self) -> Timeout:
+        remaining = max(self.deadline.remaining(), MIN_ATTEMPT_TIMEOUT)
+        return Timeout(connect=min(self._connect, remaining), read=min(self._read, remaining))
+
+
+class DeadlineRetry(Retry):
+    """
+    Retry strategy that gives up once the next backoff would overrun the current deadline; the
+    retried attempt itself only gets what remains (see DeadlineTimeout). It also closes and reopens tracing attempt spans, since retries happen inside urllib3.
+    """
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        tracer.end_attempt(status_code=response.status if response is not None else None, error=error)
+        new_retry = super().increment(method, url, response, error, _pool, _stacktrace)
+
+        deadline = current_deadline()
+        if deadline is None:
+            return new_retry
+
+        wait = new_retry.get_backoff_time()
+        if response is not None and self.respect_retry_after_header:
+            wait = new_retry.get_retry_after(response) or wait
+        if deadline.remaining() <= wait:
+            # Surface the same errors as exhausted retries, so callers need no new handling
+            reason = error or ResponseError(f"deadline of {deadline.seconds}s leaves no time for another retry")
+            raise MaxRetryError(_pool, url, reason) from reason
+        return new_retry
+
+    def sleep(self, response=None):
+        super().sleep(response)
+        tracer.begin_attempt()
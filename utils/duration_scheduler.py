@@ -0,0 +1,185 @@
+"""
+Duration-aware test scheduling for pytest-xdist
+"""
+import json
+import os
+import statistics
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+
+
+DURATION_STORE_FILE = "reports/test_durations.json"
+JSON_REPORT_FILE = "reports/pytest_report.json"
+
+# Number of most recent runs kept per test in the rolling store
+DURATION_HISTORY_SIZE = 5
+
+
+class DurationStore:
+    """ Rolling store of per-test durations (setup + call + teardown) """
+
+    def __init__(self, path: Path, history_size: int = DURATION_HISTORY_SIZE):
+        self.path = Path(path)
+        self.history_size = history_size
+        self.history: Dict[str, List[float]] = {}
+        self._current: Dict[str, float] = {}
+
+    def load(self, json_report_path: Optional[Path] = None):
+        """ Load stored durations, seeding from the pytest-json-report file on first use """
+        if self.path.exists():
+            try:
+                with open(self.path, encoding="utf-8") as store_file:
+                    self.history = json.load(store_file)
+            except (OSError, ValueError):
+                self.history = {}
+        elif json_report_path is not None and Path(json_report_path).exists():
+            self.history = {
+                nodeid: [duration]
+                for nodeid, duration in self._read_json_report(json_report_path).items()
+            }
+        return self
+
+    @staticmethod
+    def _read_json_report(json_report_path: Path) -> Dict[str, float]:
+        try:
+            with open(json_report_path, encoding="utf-8") as report_file:
+                report = json.load(report_file)
+        except (OSError, ValueError):
+            return {}
+
+        durations = {}
+        for test in report.get("tests", []):
+            durations[test["nodeid"]] = sum(
+                test.get(phase, {}).get("duration", 0.0)
+                for phase in ("setup", "call", "teardown")
+            )
+        return durations
+
+    def estimate(self, nodeid: str) -> Optional[float]:
+        """ Expected duration of a test, None if it has never been recorded """
+        durations = self.history.get(nodeid)
+        if not durations:
+            return None
+        return statistics.median(durations)
+
+    def estimates(self, nodeids: List[str]) -> List[float]:
+        """ Expected durations for a collection; unknown tests get the median of the known ones """
+        known = [self.estimate(nodeid) for nodeid in nodeids]
+        recorded = [duration for duration in known if duration is not None]
+        default = statistics.median(recorded) if recorded else 0.0
+        return [default if duration is None else duration for duration in known]
+
+    def add(self, nodeid: str, duration: float):
+        """ Accumulate the duration of one test phase for the current run """
+        self._current[nodeid] = self._current.get(nodeid, 0.0) + duration
+
+    def save(self):
+        """ Merge the current run into the rolling history and write it to disk """
+        if not self._current:
+            return
+        for nodeid, duration in self._current.items():
+            durations = self.history.setdefault(nodeid, [])
+            durations.append(round(duration, 4))
+            del durations[:-self.history_size]
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as store_file:
+            json.dump(self.history, store_file, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+def _longest_first_scheduling(config, log, store: DurationStore):
+    """ Build a LoadScheduling variant that always hands out the longest pending test next """
+    from xdist.scheduler import LoadScheduling
+
+    class LongestFirstScheduling(LoadScheduling):
+        """ Longest Processing Time first: idle workers pull the longest remaining test """
+
+        def __init__(self, config, log=None):
+            super().__init__(config, log)
+            # One test at a time keeps every worker at two queued items, so each
+            # freed worker receives the longest remaining test rather than a chunk
+            self.maxschedchunk = 1
+            self._durations: List[float] = []
+            self._priorities: List[int] = []
+
+        def schedule(self):
+            if self.collection is not None:
+                return super().schedule()
+
+            if not self._check_nodes_have_same_collection():
+                self.log("**Different tests collected, aborting run**")
+                return
+
+            self.collection = list(self.node2collection.values())[0]
+            self._durations = store.estimates(self.collection)
+            # With --impacted, tests impacted by local changes go out before the rest
+            selector = self.config.pluginmanager.get_plugin("impact-selector")
+            self._priorities = [selector.priority(nodeid) if selector else 0 for nodeid in self.collection]
+            self.pending[:] = range(len(self.collection))
+
+            # Deal the first two tests per worker round-robin so the longest
+            # tests start on different workers instead of queueing on one
+            for _ in range(2):
+                for node in self.nodes:
+                    self._send_tests(node, 1)
+
+            if not self.pending:
+                for node in self.nodes:
+                    node.shutdown()
+
+        def _send_tests(self, node, num):
+            self.pending.sort(key=lambda index: (self._priorities[index], -self._durations[index]))
+            super()._send_tests(node, num)
+
+    return LongestFirstScheduling(config, log)
+
+
+class DurationRecorder:
+    """ Collects per-test durations for the store and installs the longest-first scheduler """
+
+    def __init__(self, store: DurationStore):
+        self.store = store
+
+    def pytest_runtest_logreport(self, report):
+        # Under xdist the controller receives every worker's reports, so the
+        # store is fed and written by a single process
+        self.store.add(report.nodeid, report.duration)
+
+    def pytest_sessionfinish(self, session):
+        self.store.save()
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_xdist_make_scheduler(self, config, log):
+        if config.getoption("no_duration_scheduling") or config.getvalue("dist") != "load":
+            return None
+        return _longest_first_scheduling(config, log, self.store)
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("duration-scheduler")
+    group.addoption(
+        "--no-duration-scheduling",
+        action="store_true",
+        default=False,
+        help="Use the default xdist load scheduler instead of longest-test-first scheduling"
+    )
+    group.addoption(
+        "--duration-store",
+        action="store",
+        default=DURATION_STORE_FILE,
+        help=f"Rolling per-test duration store (default: {DURATION_STORE_FILE})"
+    )
+
+
+def pytest_configure(config):
+    if hasattr(config, "workerinput"):
+        return
+    store_path = Path(config.getoption("duration_store"))
+    if not store_path.is_absolute():
+        store_path = config.rootpath / store_path
+    store = DurationStore(store_path).load(config.rootpath / JSON_REPORT_FILE)
+    config.pluginmanager.register(DurationRecorder(store), "duration-recorder")
@@ -0,0 +1,360 @@
+"""
+Payload fuzzing for the assign and changeLicensesTeam endpoints
+
+Valid seed payloads are mutated in bulk (dropped fields, swapped types, boundary values, invalid
+emails, oversized lists, malformed JSON) and sent concurrently. Responses are grouped by their
+(endpoint, status, error code) signature; findings (5xx, transport errors, error bodies without
+a code) are minimized to the fewest and shortest mutations that reproduce the same signature.
+
+Seeds cannot change state: assign targets an already assigned license and change-team moves a
+license to the team it is already in. Both only use licenses of the TEAM_IDS teams, and the target
+server has to be named explicitly.
+
+Usage:
+    python -m utils.fuzzing --standin --cases 5000 --workers 32
+    python -m utils.fuzzing --base-url http://localhost:8080/api/v1 --cases 500 --targets assign [--output reports/fuzz_findings.jsonl]
+"""
+import argparse
+import copy
+import json
+import random
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config.api_config import config, endpoints
+from utils.api_client import LicenseAPIClient
+from utils.deadline import submit_bounded
+from utils.test_helpers import TestDataGenerator
+
+
+FINDINGS_FILE = "reports/fuzz_findings.jsonl"
+
+ENDPOINTS = {
+    "assign": endpoints.ASSIGN_LICENSE,
+    "change_team": endpoints.CHANGE_LICENSE_TEAM,
+}
+
+# (target, status code or "EXC", error code or exception type)
+Signature = Tuple[str, Any, str]
+
+BOUNDARY_VALUES: List[Any] = [
+    None, "", " ", 0, -1, 2 ** 31, 2 ** 63, -2 ** 63, 1.5, float("1e308"), True, False, [], {},
+    "null", "0", "\u0000", "‮A", "𝔘ñïçødé", "<script>alert(1)</script>", "' OR '1'='1", "../../etc/passwd",
+]
+LONG_STRING_LENGTHS = [101, 256, 1025, 65537]
+MAX_MUTATIONS = 3
+
+
+class Mutation:
+    """ A concrete, replayable change to a seed payload """
+
+    __slots__ = ("kind", "path", "value")
+
+    SET = "set"
+    DELETE = "delete"
+    RAW = "raw"
+
+    def __init__(self, kind: str, path: Tuple = (), value: Any = None):
+        self.kind = kind
+        self.path = path
+        self.value = value
+
+    def apply(self, payload: Any) -> Any:
+        if self.kind == self.RAW:
+            return self.value
+        parent = payload
+        for key in self.path[:-1]:
+            try:
+                parent = parent[key]
+            except (KeyError, IndexError, TypeError):
+                # An earlier mutation removed or replaced the parent; nothing to change
+                return payload
+        key = self.path[-1]
+        if self.kind == self.DELETE:
+            if isinstance(parent, dict):
+                parent.pop(key, None)
+            elif isinstance(parent, list) and isinstance(key, int) and key < len(parent):
+                del parent[key]
+        elif isinstance(parent, dict) or (isinstance(parent, list) and isinstance(key, int) and key < len(parent)):
+            parent[key] = copy.deepcopy(self.value)
+        return payload
+
+    def to_dict(self) -> Dict[str, Any]:
+        value = self.value
+        if isinstance(value, str) and len(value) > 200:
+            value = f"{value[:20]}... ({len(value)} chars)"
+        return {"kind": self.kind, "path": list(self.path), "value": value}
+
+
+class FuzzCase:
+    __slots__ = ("target", "mutations")
+
+    def __init__(self, target: str, mutations: List[Mutation]):
+        self.target = target
+        self.mutations = mutations
+
+    def render(self, seed: Dict[str, Any]) -> str:
+        """ Request body: the seed with all mutations applied, serialized unless a raw body replaced it """
+        payload: Any = copy.deepcopy(seed)
+        for mutation in self.mutations:
+            if mutation.kind == Mutation.RAW:
+                return mutation.value
+            payload = mutation.apply(payload)
+        return json.dumps(payload)
+
+
+def _paths(value: Any, prefix: Tuple = ()) -> Iterator[Tuple]:
+    """ Every field and list element path in a payload """
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield prefix + (key,)
+            yield from _paths(child, prefix + (key,))
+    elif isinstance(value, list):
+        for index, child in enumerate(value):
+            yield prefix + (index,)
+            yield from _paths(child, prefix + (index,))
+
+
+class MutationGenerator:
+    """ Draws random mutations for a seed payload """
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        self.data_generator = TestDataGenerator()
+        self.invalid_emails = self.data_generator.generate_invalid_email_addresses()
+
+    def mutations(self, seed: Dict[str, Any]) -> List[Mutation]:
+        if self.rng.random() < 0.1:
+            return [self._raw(seed)]
+        paths = list(_paths(seed))
+        return [self._mutation(seed, paths) for _ in range(self.rng.randint(1, MAX_MUTATIONS))]
+
+    def _mutation(self, seed: Dict[str, Any], paths: List[Tuple]) -> Mutation:
+        path = self.rng.choice(paths)
+        strategy = self.rng.random()
+        if strategy < 0.2:
+            return Mutation(Mutation.DELETE, path)
+        if strategy < 0.3:
+            return Mutation(Mutation.SET, path[:-1] + (f"unexpected_{self.rng.randint(0, 999)}",), "x")
+        if strategy < 0.45:
+            return Mutation(Mutation.SET, path, self.rng.choice("aZ9@._-'é ") * self.rng.choice(LONG_STRING_LENGTHS))
+        if strategy < 0.55 and "email" in path:
+            return Mutation(Mutation.SET, path, self.rng.choice(self.invalid_emails))
+        if strategy < 0.65:
+            list_path = next((p for p in paths if isinstance(_get(seed, p), list)), None)
+            if list_path is not None:
+                items = _get(seed, list_path)
+                size = self.rng.choice([0, 2, 100, 5000])
+                filler = items[0] if items and self.rng.random() < 0.5 else self.data_generator.generate_invalid_license_id()
+                return Mutation(Mutation.SET, list_path, [filler] * size)
+        return Mutation(Mutation.SET, path, self.rng.choice(BOUNDARY_VALUES))
+
+    def _raw(self, seed: Dict[str, Any]) -> Mutation:
+        serialized = json.dumps(seed)
+        body = self.rng.choice([
+            self.data_generator.generate_invalid_json(),
+            serialized[:self.rng.randint(0, len(serialized) - 1)],
+            json.dumps([seed]),
+            json.dumps(serialized),
+            "",
+            "0",
+            serialized.replace('"', "'"),
+            serialized + "}",
+        ])
+        return Mutation(Mutation.RAW, value=body)
+
+
+def _get(payload: Any, path: Tuple) -> Any:
+    for key in path:
+        payload = payload[key]
+    return payload
+
+
+class FuzzReport:
+    def __init__(self):
+        self.signatures: Counter = Counter()
+        self.examples: Dict[Signature, FuzzCase] = {}
+        self.findings: List[Tuple[Signature, FuzzCase]] = []
+        self.sent = 0
+        self.elapsed = 0.0
+
+    def format(self) -> str:
+        rate = self.sent / self.elapsed * 60 if self.elapsed else 0.0
+        lines = [f"Sent {self.sent} cases in {self.elapsed:.1f}s ({rate:,.0f} cases/min), "
+                 f"{len(self.signatures)} distinct signatures, {len(self.findings)} finding(s)",
+                 f"{'count':>7}  {'endpoint':<12}{'status':>7}  code"]
+        for (target, status, code), count in self.signatures.most_common():
+            lines.append(f"{count:>7}  {target:<12}{status:>7}  {code}")
+        for signature, case in self.findings:
+            lines.append(f"\nFinding {signature}: {json.dumps([m.to_dict() for m in case.mutations])}")
+        return "\n".join(lines)
+
+
+class Fuzzer:
+    """ Sends mutated payloads concurrently and minimizes the ones producing findings """
+
+    def __init__(self, client: LicenseAPIClient, seeds: Dict[str, Dict[str, Any]], workers: int = 32, seed: Optional[int] = None):
+        unknown = set(seeds) - set(ENDPOINTS)
+        if unknown:
+            raise ValueError(f"Unknown fuzz targets {sorted(unknown)}, expected some of {sorted(ENDPOINTS)}")
+        self.client = client
+        self.seeds = seeds
+        self.workers = workers
+        self.rng = random.Random(seed)
+        self.generator = MutationGenerator(self.rng)
+
+    def cases(self, count: int) -> Iterator[FuzzCase]:
+        targets = list(self.seeds)
+        for _ in range(count):
+            target = self.rng.choice(targets)
+            yield FuzzCase(target, self.generator.mutations(self.seeds[target]))
+
+    def signature(self, case: FuzzCase) -> Signature:
+        body = case.render(self.seeds[case.target])
+        try:
+            response = self.client.post(ENDPOINTS[case.target], data=body.encode("utf-8"))
+        except Exception as e:
+            return case.target, "EXC", type(e).__name__
+        try:
+            error = response.json()
+        except ValueError:
+            error = None
+        code = error.get("code") if isinstance(error, dict) else None
+        return case.target, response.status_code, code or "-"
+
+    @staticmethod
+    def is_finding(signature: Signature) -> bool:
+        _, status, code = signature
+        return status == "EXC" or status >= 500 or (status >= 400 and code == "-")
+
+    def run(self, count: int, minimize: bool = True) -> FuzzReport:
+        report = FuzzReport()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="fuzz") as executor:
+            submit_bounded(executor, self.signature, self.cases(count), self.workers * 2,
+                           lambda case, future: self._record(report, case, future.result()))
+        report.elapsed = time.perf_counter() - start
+
+        if minimize:
+            report.findings = [
+                (signature, self.minimize(case, signature))
+                for signature, case in report.examples.items()
+                if self.is_finding(signature)
+            ]
+        return report
+
+    @staticmethod
+    def _record(report: FuzzReport, case: FuzzCase, signature: Signature):
+        report.sent += 1
+        report.signatures[signature] += 1
+        report.examples.setdefault(signature, case)
+
+    def minimize(self, case: FuzzCase, signature: Signature) -> FuzzCase:
+        """
+        Drop mutations one at a time while the signature still reproduces, then halve long
+        string values. The result is 1-minimal: removing any remaining mutation changes the outcome.
+        """
+        mutations = list(case.mutations)
+        index = 0
+        while index < len(mutations) and len(mutations) > 1:
+            candidate = mutations[:index] + mutations[index + 1:]
+            if self.signature(FuzzCase(case.target, candidate)) == signature:
+                mutations = candidate
+            else:
+                index += 1
+
+        for index, mutation in enumerate(mutations):
+            if mutation.kind == Mutation.DELETE or not isinstance(mutation.value, str):
+                continue
+            value = mutation.value
+            while len(value) > 1:
+                shorter = value[:len(value) // 2]
+                candidate = mutations[:index] + [Mutation(mutation.kind, mutation.path, shorter)] + mutations[index + 1:]
+                if self.signature(FuzzCase(case.target, candidate)) != signature:
+                    break
+                value = shorter
+                mutations = candidate
+        return FuzzCase(case.target, mutations)
+
+
+def build_seeds(client: LicenseAPIClient) -> Dict[str, Dict[str, Any]]:
+    """ Valid-shaped payloads whose unmutated form leaves the organization unchanged; only TEAM_IDS licenses are used """
+    inventory = client.get_license_inventory()
+    # Licenses of other teams may belong to real users
+    assigned_ids = [license_id for team_id in config.TEAM_IDS.values() for license_id in inventory.assigned_ids(team_id)]
+    user = TestDataGenerator().generate_user_data()
+    team_id = next(iter(config.TEAM_IDS.values()))
+    team_license_ids = inventory.assigned_ids(team_id) + inventory.available_ids(team_id)
+    return {
+        "assign": {
+            "contact": {"email": user["email"], "firstName": user["firstName"], "lastName": user["lastName"]},
+            "includeOfflineActivationCode": True,
+            "license": {"productCode": "", "team": 1},
+            # Already assigned, so even a valid mutation is rejected instead of consuming a license
+            "licenseId": assigned_ids[0] if assigned_ids else TestDataGenerator().generate_invalid_license_id(),
+            "sendEmail": False,
+        },
+        "change_team": {
+            # Moving licenses to the team they already belong to is a no-op
+            "licenseIds": team_license_ids[:2],
+            "targetTeamId": team_id,
+        },
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m utils.fuzzing", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cases", type=int, default=1000, help="Number of mutated payloads to send")
+    parser.add_argument("--workers", type=int, default=32, help="Concurrent requests")
+    parser.add_argument("--targets", default="assign,change_team", help="Comma-separated endpoints to fuzz")
+    parser.add_argument("--seed", type=int, help="Random seed, for reproducible runs")
+    parser.add_argument("--no-minimize", action="store_true", help="Report findings without minimizing them")
+    parser.add_argument("--output", type=Path, default=Path(FINDINGS_FILE), help="NDJSON file for minimized findings")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--base-url", help="API base URL to fuzz")
+    target.add_argument("--standin", action="store_true", help="Serve an in-memory license model on localhost and fuzz it")
+    args = parser.parse_args(argv)
+    targets = [name.strip() for name in args.targets.split(",") if name.strip()]
+    unknown = sorted(set(targets) - set(ENDPOINTS))
+    if unknown or not targets:
+        parser.error(f"--targets must be a comma-separated subset of {sorted(ENDPOINTS)}, got {args.targets!r}")
+
+    if args.standin:
+        from utils.inmemory_transport import standin_server
+        target_api = standin_server()
+    else:
+        target_api = nullcontext(args.base_url)
+
+    with target_api as base_url:
+        if args.standin:
+            print(f"Stand-in server listening on {base_url}")
+        # No retries: every response is a data point, and retried 5xx would hide findings
+        client = LicenseAPIClient(thread_safe=True, base_url=base_url, max_retries=0)
+        try:
+            client.warm_up()
+            seeds = build_seeds(client)
+            fuzzer = Fuzzer(client, {name: seeds[name] for name in targets}, args.workers, args.seed)
+            report = fuzzer.run(args.cases, minimize=not args.no_minimize)
+        finally:
+            client.close()
+
+    print(report.format())
+    if report.findings:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "a", encoding="utf-8") as output:
+            for (target, status, code), case in report.findings:
+                output.write(json.dumps({
+                    "endpoint": target, "status": status, "code": code,
+                    "mutations": [mutation.to_dict() for mutation in case.mutations],
+                }) + "\n")
+        print(f"\nFindings written to {args.output}")
+    return 1 if report.findings else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""
+Hedged requests for idempotent reads
+"""
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Callable
+
+import requests
+
+from utils.deadline import submit_in_context
+from utils.latency import LatencyWindow
+
+
+class HedgeBudget:
+    """
+    Token bucket limiting hedges to a fraction of primary requests.
+    Every primary request earns `max_extra_ratio` tokens (up to `burst`), every hedge spends one;
+    the bucket starts with one token so a slow first read can already be hedged.
+    """
+
+    def __init__(self, max_extra_ratio: float, burst: float = 10):
+        self.max_extra_ratio = max_extra_ratio
+        self.burst = burst
+        self._tokens = 1.0
+        self.hedges = 0
+        self._lock = threading.Lock()
+
+    def on_request(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.max_extra_ratio)
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.hedges += 1
+                return True
+            return False
+
+
+class HedgedRequester:
+    """
+    Sends a second copy of an idempotent request when the first has not answered within the
+    observed latency percentile for that endpoint; the first successful reply wins.
+
+    A request already on the wire cannot be aborted with requests, so the losing attempt is
+    left to finish in the background and its response is closed as soon as it arrives,
+    returning the connection to the pool. Every successful attempt, losers included, adds its
+    own latency to the window, so the hedge delay follows the latency of single requests rather
+    than the faster latency of hedged pairs.
+    """
+
+    def __init__(
+        self,
+        delay_percentile: float,
+        max_extra_ratio: float,
+        default_delay: float,
+        min_samples: int = 20,
+        max_workers: int = 8
+    ):
+        self.delay_percentile = delay_percentile
+        self.default_delay = default_delay
+        self.min_samples = min_samples
+        self.latencies = LatencyWindow()
+        self.budget = HedgeBudget(max_extra_ratio)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def hedge_delay(self, key: str) -> float:
+        delay = self.latencies.percentile(key, self.delay_percentile, self.min_samples)
+        return self.default_delay if delay is None else delay
+
+    def execute(self, key: str, send: Callable[[], requests.Response]) -> requests.Response:
+        """ Run send(), hedging it with a second send() if it is slower than the hedge delay """
+        self.budget.on_request()
+        attempts = [self._submit(key, send)]
+
+        done, _ = wait(attempts, timeout=self.hedge_delay(key))
+        if not done and self.budget.try_acquire():
+            attempts.append(self._submit(key, send))
+
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((future for future in done if future.exception() is None), None)
+            if winner is None:
+                error = next(iter(done)).exception()
+                continue
+            for attempt in attempts:
+                if attempt is not winner:
+                    attempt.add_done_callback(_close_response)
+            return winner.result()
+        raise error
+
+    def _submit(self, key: str, send: Callable[[], requests.Response]) -> Future:
+        return submit_in_context(self._executor, self._timed, key, send)
+
+    def _timed(self, key: str, send: Callable[[], requests.Response]) -> requests.Response:
+        start = time.perf_counter()
+        response = send()
+        self.latencies.add(key, time.perf_counter() - start)
+        return response
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+def _close_response(future: Future):
+    if future.exception() is None:
+        future.result().close()
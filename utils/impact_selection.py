@@ -0,0 +1,501 @@
+"""
+Change-aware test selection from recorded call coverage
+
+A recording run (--record-impact) notes, per test, every function in utils/, config/ and tests/
+that ran during its setup, call and teardown, e.g. utils/api_client.py::LicenseAPIClient.change_license_team,
+including what the fixtures it uses ran when they were set up, even if that happened for an earlier test.
+Later runs diff the working tree against the commit the map was recorded at, map changed lines to
+the enclosing functions, and select the tests that called them. Code outside functions, such as class
+attributes and module constants (e.g. EndpointsConfig.ASSIGN_LICENSE), can be read anywhere, including
+by other module-level code, so changing it impacts every test. So does a changed pytest.ini or
+requirements.txt. Tests missing from the map, and tests that touched a deleted file, count as impacted.
+
+Usage:
+    python -m pytest --record-impact            # record reports/impact/<worker>.json
+    python -m pytest --impacted                 # impacted tests first, then the rest
+    python -m pytest --impacted-only [-n 4]     # impacted tests only
+    python -m utils.impact_selection [--base main]
+"""
+import argparse
+import ast
+import json
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import pytest
+
+
+IMPACT_DIR = "reports/impact"
+
+# Directories whose functions are recorded, relative to the project root
+SOURCE_ROOTS = ("utils", "config", "tests")
+
+# Non-Python files whose changes can affect any test
+GLOBAL_FILES = {"pytest.ini", "requirements.txt"}
+
+HUNK_HEADER = re.compile(r"^@@ -\d+(?:,\d+)? \+(\d+)(?:,(\d+))? @@")
+
+
+class CallRecorder:
+    """ Collects the functions under the source roots called while active, from every thread """
+
+    def __init__(self, root: Path, source_roots: Iterable[str] = SOURCE_ROOTS, exclude: Iterable[str] = ()):
+        self.root = root
+        self.prefixes = tuple(str(root / source_root) + os.sep for source_root in source_roots)
+        self.exclude = set(exclude)
+        self.symbols: Set[str] = set()
+        # Code object -> symbol (None outside the source roots), so each function is resolved once
+        self._codes: Dict[object, Optional[str]] = {}
+        # File -> function and class ranges, to rebuild qualified names before Python 3.11
+        self._ranges: Dict[str, List[Tuple[int, int, str, bool]]] = {}
+        self._previous = None
+
+    def _trace(self, frame, event, arg):
+        code = frame.f_code
+        try:
+            symbol = self._codes[code]
+        except KeyError:
+            symbol = self._codes[code] = self._symbol(code)
+        if symbol is not None:
+            self.symbols.add(symbol)
+        # No local tracing: only call events are needed, so traced code runs at full speed otherwise
+        return None
+
+    def _symbol(self, code) -> Optional[str]:
+        filename = code.co_filename
+        if code.co_name == "<module>" or not filename.startswith(self.prefixes) or filename in self.exclude:
+            return None
+        return f"{Path(filename).relative_to(self.root).as_posix()}::{self._qualname(code)}"
+
+    def _qualname(self, code) -> str:
+        """
+        code.co_qualname only exists from Python 3.11. Before that, the name is rebuilt from the
+        innermost definition of the same name around code.co_firstlineno (the first decorator line
+        of a decorated function), so recorded symbols match the ones changed_symbols() reports.
+        """
+        qualname = getattr(code, "co_qualname", None)
+        if qualname is not None:
+            return qualname
+        ranges = self._ranges.get(code.co_filename)
+        if ranges is None:
+            ranges = self._ranges[code.co_filename] = definition_ranges(Path(code.co_filename))
+        functions = [
+            entry for entry in ranges
+            if entry[3] and entry[0] <= code.co_firstlineno <= entry[1]
+        ]
+        innermost = max(functions, key=lambda entry: entry[0], default=None)
+        if innermost is None:
+            return code.co_name
+        if innermost[2].rsplit(".", 1)[-1] == code.co_name:
+            return innermost[2]
+        # A lambda or comprehension inside the function
+        return f"{innermost[2]}.<locals>.{code.co_name}"
+
+    def start(self):
+        self.symbols = set()
+        self._previous = sys.gettrace()
+        sys.settrace(self._trace)
+        # Threads started during the test (ThreadPoolExecutor workers) are recorded as well
+        threading.settrace(self._trace)
+
+    def stop(self) -> Set[str]:
+        sys.settrace(self._previous)
+        threading.settrace(self._previous)
+        return self.symbols
+
+
+class ImpactMap:
+    """ Test node ID -> functions it exercised, plus the commit the recording was made at """
+
+    def __init__(self, tests: Optional[Dict[str, Set[str]]] = None, commit: Optional[str] = None):
+        self.tests: Dict[str, Set[str]] = tests or {}
+        self.commit = commit
+
+    @classmethod
+    def load(cls, impact_dir: Path) -> "ImpactMap":
+        """
+        Merge the per-worker files, newer recordings overriding older ones. The diff base is the
+        oldest commit involved, so no change made since any of the recordings is missed.
+        """
+        recordings = []
+        for path in impact_dir.glob("*.json"):
+            try:
+                with open(path, encoding="utf-8") as impact_file:
+                    recordings.append(json.load(impact_file))
+            except (OSError, ValueError):
+                continue
+        recordings.sort(key=lambda recording: recording.get("recorded_at", 0))
+        impact_map = cls()
+        for recording in recordings:
+            for nodeid, symbols in recording.get("tests", {}).items():
+                impact_map.tests[nodeid] = set(symbols)
+        if recordings:
+            impact_map.commit = recordings[0].get("commit")
+        return impact_map
+
+    def save(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as impact_file:
+            json.dump({
+                "commit": self.commit,
+                "recorded_at": time.time(),
+                "tests": {nodeid: sorted(symbols) for nodeid, symbols in sorted(self.tests.items())},
+            }, impact_file, indent=1)
+        os.replace(tmp_path, path)
+
+
+def _git(root: Path, *args: str) -> str:
+    result = subprocess.run(["git", *args], cwd=root, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise Exception(f"git {' '.join(args)} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def head_commit(root: Path) -> Optional[str]:
+    try:
+        return _git(root, "rev-parse", "HEAD").strip()
+    except (Exception, OSError):
+        return None
+
+
+def changed_lines(root: Path, base: str) -> Dict[str, Optional[Set[int]]]:
+    """
+    Files changed in the working tree relative to `base`, with the changed line numbers of the
+    current version. None means the whole file: untracked, deleted or renamed files.
+    """
+    changes: Dict[str, Optional[Set[int]]] = {}
+    old_path = current = None
+    for line in _git(root, "diff", "--unified=0", "--no-color", "--no-renames", base, "--").splitlines():
+        if line.startswith("--- "):
+            old_path = line[6:] if line.startswith("--- a/") else None
+        elif line.startswith("+++ "):
+            current = line[6:] if line.startswith("+++ b/") else None
+            if current is not None:
+                changes[current] = set()
+            elif old_path is not None:
+                changes[old_path] = None
+        elif current is not None:
+            match = HUNK_HEADER.match(line)
+            if match:
+                start, count = int(match.group(1)), int(match.group(2) or 1)
+                # A pure deletion (count 0) sits between `start` and the next line
+                changes[current].update(range(start, start + count) if count else (start, start + 1))
+    for path in _git(root, "ls-files", "--others", "--exclude-standard").splitlines():
+        changes[path] = None
+    return changes
+
+
+class _Definitions(ast.NodeVisitor):
+    """ Line ranges of every function and class, with qualified names as in code.co_qualname """
+
+    def __init__(self):
+        self.ranges: List[Tuple[int, int, str, bool]] = []
+        self._stack: List[str] = []
+
+    def _visit(self, node, is_function: bool):
+        qualname = ".".join(self._stack + [node.name])
+        start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+        self.ranges.append((start, node.end_lineno, qualname, is_function))
+        self._stack.extend([node.name, "<locals>"] if is_function else [node.name])
+        self.generic_visit(node)
+        del self._stack[-(2 if is_function else 1):]
+
+    def visit_FunctionDef(self, node):
+        self._visit(node, True)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node):
+        self._visit(node, False)
+
+
+def definition_ranges(path: Path) -> List[Tuple[int, int, str, bool]]:
+    """ (start, end, qualified name, is function) of every function and class in a file """
+    try:
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+    except (OSError, SyntaxError, ValueError):
+        return []
+    definitions = _Definitions()
+    definitions.visit(tree)
+    return definitions.ranges
+
+
+def changed_symbols(path: Path, lines: Set[int]) -> Tuple[Set[str], bool]:
+    """
+    Split changed lines of a Python file into (functions, changed outside functions). Lines inside
+    a function select it. Any other code (imports, constants, class attributes, unparsable code)
+    may be read by every test; blank lines, comments and docstrings change nothing.
+    """
+    try:
+        source = path.read_text(encoding="utf-8")
+        tree = ast.parse(source)
+    except (OSError, SyntaxError, ValueError):
+        return set(), True
+    definitions = _Definitions()
+    definitions.visit(tree)
+
+    functions: Set[str] = set()
+    outside: Set[int] = set()
+    for line in lines:
+        enclosing = [entry for entry in definitions.ranges if entry[0] <= line <= entry[1]]
+        innermost = max(enclosing, key=lambda entry: entry[0], default=None)
+        if innermost is not None and innermost[3]:
+            functions.add(innermost[2])
+        else:
+            outside.add(line)
+
+    neutral = {
+        number for number, text in enumerate(source.splitlines(), start=1)
+        if not text.strip() or text.strip().startswith("#")
+    }
+    for node in ast.walk(tree):
+        is_docstring = isinstance(node, ast.Expr) and isinstance(node.value, ast.Constant) and isinstance(node.value.value, str)
+        if is_docstring:
+            neutral.update(range(node.lineno, node.end_lineno + 1))
+    return functions, any(line not in neutral for line in outside)
+
+
+class ImpactAnalysis:
+    """ Which recorded tests are affected by the changes since a base commit """
+
+    def __init__(self, root: Path, impact_map: ImpactMap, base: Optional[str] = None):
+        self.root = root
+        self.impact_map = impact_map
+        self.base = base or impact_map.commit
+        self.run_all = False
+        # Files whose changes impact every test
+        self.global_changes: Set[str] = set()
+        self.changed_files: Set[str] = set()
+        self.symbols: Set[str] = set()
+        self.whole_files: Set[str] = set()
+        self._analyze()
+
+    def _analyze(self):
+        if not self.impact_map.tests or not self.base:
+            self.run_all = True
+            return
+        changes = changed_lines(self.root, self.base)
+        self.changed_files = set(changes)
+        for relative_path, lines in changes.items():
+            if relative_path in GLOBAL_FILES:
+                self.global_changes.add(relative_path)
+            if not relative_path.endswith(".py") or not relative_path.startswith(tuple(f"{r}/" for r in SOURCE_ROOTS)):
+                continue
+            path = self.root / relative_path
+            if lines is None or not path.exists():
+                self.whole_files.add(relative_path)
+                continue
+            functions, outside = changed_symbols(path, lines)
+            self.symbols.update(f"{relative_path}::{qualname}" for qualname in functions)
+            if outside:
+                self.global_changes.add(relative_path)
+        self.run_all = bool(self.global_changes)
+
+    def is_impacted(self, nodeid: str) -> bool:
+        if self.run_all:
+            return True
+        symbols = self.impact_map.tests.get(nodeid)
+        if symbols is None:
+            # Never recorded: a new test, or one renamed since the recording
+            return True
+        return bool(symbols & self.symbols) or any(symbol.split("::", 1)[0] in self.whole_files for symbol in symbols)
+
+    def describe(self) -> str:
+        if self.run_all:
+            if not self.impact_map.tests:
+                reason = "no impact map"
+            else:
+                reason = f"changed outside functions: {', '.join(sorted(self.global_changes))}"
+            return f"impact selection: every test is impacted ({reason})"
+        return (f"impact selection: {len(self.changed_files)} changed file(s), {len(self.symbols)} changed "
+                f"function(s) since {self.base[:12]}")
+
+
+class ImpactRecorder:
+    """
+    Records the functions each test's setup, call and teardown run and writes this process's share
+    of the map. Fixture setups are also recorded per fixture and credited to every test that uses
+    the fixture, so code run once by a session- or module-scoped fixture impacts all of its tests,
+    not just the first. Reporting hooks are left out, and so are utils/ pytest plugins, whose hooks
+    run for every test and would make each of them look impacted by any plugin change.
+    """
+
+    def __init__(self, root: Path, path: Path, plugin_files: Iterable[str] = ()):
+        self.recorder = CallRecorder(root, exclude=plugin_files)
+        self.path = path
+        self.impact_map = ImpactMap(commit=head_commit(root))
+        # FixtureDef -> functions its setups ran, across all parameters it was set up with
+        self.fixture_symbols: Dict[object, Set[str]] = {}
+
+    def _record(self, item):
+        self.recorder.start()
+        try:
+            yield
+        finally:
+            self.impact_map.tests.setdefault(item.nodeid, set()).update(self.recorder.stop())
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_fixture_setup(self, fixturedef, request):
+        # Dependencies are set up before this hook, so fixture setups never nest here
+        outer = self.recorder.symbols
+        self.recorder.symbols = set()
+        try:
+            yield
+        finally:
+            symbols = self.recorder.symbols
+            self.recorder.symbols = outer
+            outer.update(symbols)
+            self.fixture_symbols.setdefault(fixturedef, set()).update(symbols)
+
+    def _fixture_symbols(self, item) -> Set[str]:
+        symbols: Set[str] = set()
+        name2fixturedefs = getattr(getattr(item, "_fixtureinfo", None), "name2fixturedefs", {})
+        for name in getattr(item, "fixturenames", ()):
+            fixturedefs = name2fixturedefs.get(name)
+            if fixturedefs:
+                # The last definition is the one visible to the test (overrides come last)
+                symbols.update(self.fixture_symbols.get(fixturedefs[-1], ()))
+        return symbols
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_setup(self, item):
+        yield from self._record(item)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_call(self, item):
+        yield from self._record(item)
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_teardown(self, item):
+        yield from self._record(item)
+        self.impact_map.tests[item.nodeid].update(self._fixture_symbols(item))
+
+    def pytest_sessionfinish(self, session):
+        if self.impact_map.tests:
+            self.impact_map.save(self.path)
+
+
+class ImpactSelector:
+    """ Orders impacted tests first, or deselects the rest with --impacted-only """
+
+    def __init__(self, analysis: ImpactAnalysis, only: bool):
+        self.analysis = analysis
+        self.only = only
+        self.selected = 0
+        self.collected = 0
+
+    def priority(self, nodeid: str) -> int:
+        """ 0 for impacted tests, 1 for the rest; used by the longest-first xdist scheduler """
+        return 0 if self.analysis.is_impacted(nodeid) else 1
+
+    @pytest.hookimpl(trylast=True)
+    def pytest_collection_modifyitems(self, config, items):
+        impacted = [item for item in items if self.analysis.is_impacted(item.nodeid)]
+        rest = [item for item in items if not self.analysis.is_impacted(item.nodeid)]
+        self.collected = len(items)
+        self.selected = len(impacted)
+        if self.only:
+            if rest:
+                config.hook.pytest_deselected(items=rest)
+            items[:] = impacted
+        else:
+            items[:] = impacted + rest
+
+    def pytest_sessionfinish(self, session, exitstatus):
+        # Nothing impacted is a successful fast-lane run, not a collection error
+        if self.only and exitstatus == pytest.ExitCode.NO_TESTS_COLLECTED:
+            session.exitstatus = pytest.ExitCode.OK
+
+    def pytest_report_collectionfinish(self):
+        return f"{self.analysis.describe()}; {self.selected} of {self.collected} test(s) impacted"
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("impact-selection")
+    group.addoption(
+        "--record-impact",
+        action="store_true",
+        default=False,
+        help="Record the functions each test calls, for later --impacted runs"
+    )
+    group.addoption(
+        "--impacted",
+        action="store_true",
+        default=False,
+        help="Run tests impacted by changes since the recording first, then the rest"
+    )
+    group.addoption(
+        "--impacted-only",
+        action="store_true",
+        default=False,
+        help="Run only tests impacted by changes since the recording"
+    )
+    group.addoption(
+        "--impact-base",
+        action="store",
+        default=None,
+        help="Git revision to diff against (default: the commit the impact map was recorded at)"
+    )
+    group.addoption(
+        "--impact-dir",
+        action="store",
+        default=IMPACT_DIR,
+        help=f"Directory for impact maps, one per xdist worker (default: {IMPACT_DIR})"
+    )
+
+
+def pytest_configure(config):
+    impact_dir = Path(config.getoption("impact_dir"))
+    if not impact_dir.is_absolute():
+        impact_dir = config.rootpath / impact_dir
+    only = config.getoption("impacted_only")
+
+    if config.getoption("record_impact"):
+        worker_id = config.workerinput["workerid"] if hasattr(config, "workerinput") else "main"
+        if not hasattr(config, "workerinput") and not only and impact_dir.exists():
+            # A full recording replaces the previous one, including files of workers no longer used
+            for path in impact_dir.glob("*.json"):
+                path.unlink()
+        utils_dir = str(config.rootpath / "utils") + os.sep
+        plugin_files = {
+            plugin.__file__ for plugin in config.pluginmanager.get_plugins()
+            if getattr(plugin, "__file__", "").startswith(utils_dir)
+        }
+        recorder = ImpactRecorder(config.rootpath, impact_dir / f"{worker_id}.json", plugin_files)
+        config.pluginmanager.register(recorder, "impact-recorder")
+
+    if only or config.getoption("impacted"):
+        # Loaded before recording starts, so a run that also records still selects against the old map
+        analysis = ImpactAnalysis(config.rootpath, ImpactMap.load(impact_dir), config.getoption("impact_base"))
+        config.pluginmanager.register(ImpactSelector(analysis, only), "impact-selector")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m utils.impact_selection", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--impact-dir", type=Path, default=Path(IMPACT_DIR), help="Directory with recorded impact maps")
+    parser.add_argument("--base", help="Git revision to diff against (default: the recording commit)")
+    args = parser.parse_args(argv)
+
+    root = Path.cwd()
+    analysis = ImpactAnalysis(root, ImpactMap.load(args.impact_dir), args.base)
+    print(analysis.describe())
+    for symbol in sorted(analysis.symbols):
+        print(f"  changed: {symbol}")
+    for relative_path in sorted(analysis.whole_files):
+        print(f"  changed: {relative_path} (whole file)")
+    impacted = [nodeid for nodeid in sorted(analysis.impact_map.tests) if analysis.is_impacted(nodeid)]
+    print(f"\n{len(impacted)} of {len(analysis.impact_map.tests)} recorded test(s) impacted:")
+    for nodeid in impacted:
+        print(f"  {nodeid}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,376 @@
+"""
+In-process transport adapter serving the license endpoints from an in-memory model
+
+Mounted on the client session when JETBRAINS_API_TRANSPORT=inmemory, so requests never
+touch a socket and the suite runs at unit-test speed without API credentials. The same model
+can also be served over HTTP on localhost (serve_license_model, or the standin_server context
+manager) as a stand-in for load tests.
+"""
+import io
+import json
+import re
+import threading
+from contextlib import contextmanager
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
+
+from config.api_config import config, endpoints, status_codes, error_codes
+
+
+PRODUCT_CODES = {
+    "II": "IntelliJ IDEA Ultimate",
+    "PC": "PyCharm Professional",
+    "WS": "WebStorm",
+    "GO": "GoLand",
+}
+
+LICENSES_PER_TEAM = 50
+ASSIGNED_PER_TEAM = 10
+
+MAX_EMAIL_LENGTH = 100
+MAX_NAME_LENGTH = 100
+
+EMAIL_PATTERN = re.compile(
+    r"^[A-Za-z0-9._%+-]+@(?:[A-Za-z0-9](?:[A-Za-z0-9-]*[A-Za-z0-9])?\.)+[A-Za-z]{2,}$"
+)
+NAME_PATTERN = re.compile(r"^[^\W\d_]+(?:[ '.-][^\W\d_]*)*$")
+
+TEAM_LICENSES_PATH = re.compile(
+    "^" + re.escape(endpoints.GET_TEAM_LICENSES).replace(re.escape("{team_id}"), r"(?P<team_id>[^/]+)") + "$"
+)
+
+
+class APIError(Exception):
+    """ Error response produced by the model: status code plus code/description body """
+
+    def __init__(self, status_code: int, error: Dict[str, Any], description: Any = None):
+        super().__init__(error["code"])
+        self.status_code = status_code
+        self.body = {
+            "code": error["code"],
+            "description": error["description"] if description is None else description,
+        }
+
+
+class LicenseModel:
+    """ Thread-safe in-memory model of an organization's teams, licenses and API tokens """
+
+    def __init__(
+        self,
+        teams: Optional[Dict[str, int]] = None,
+        licenses_per_team: int = LICENSES_PER_TEAM,
+        assigned_per_team: int = ASSIGNED_PER_TEAM,
+        tokens: Optional[Dict[str, Optional[int]]] = None
+    ):
+        self.teams = {team_id: name for name, team_id in (teams or config.TEAM_IDS).items()}
+        self.licenses: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._seed(licenses_per_team, assigned_per_team)
+
+        # API key -> team ID it is restricted to, None for organization-wide keys
+        if tokens is not None:
+            self.tokens: Dict[str, Optional[int]] = dict(tokens)
+            return
+        self.tokens = {config.API_KEY: None}
+        team_ids = list(self.teams)
+        for team_key, team_id in ((config.API_KEY_TEAM_1, team_ids[0]), (config.API_KEY_TEAM_2, team_ids[-1])):
+            if team_key:
+                self.tokens[team_key] = team_id
+
+    def _seed(self, licenses_per_team: int, assigned_per_team: int):
+        product_codes = list(PRODUCT_CODES)
+        for team_id, team_name in self.teams.items():
+            for index in range(licenses_per_team):
+                license_id = f"{team_id % 100000:05d}{index:05d}"
+                product_code = product_codes[index % len(product_codes)]
+                license_data = {
+                    "licenseId": license_id,
+                    "product": {"code": product_code, "name": PRODUCT_CODES[product_code]},
+                    "team": {"id": team_id, "name": team_name},
+                    "assignee": None,
+                    "isAvailableToAssign": True,
+                    "isTrial": False,
+                    "isSuspended": False,
+                }
+                if index < assigned_per_team:
+                    self._assign(license_data, f"seeded_{license_id}@example.com", "Seeded", "User")
+                self.licenses[license_id] = license_data
+
+    @staticmethod
+    def _assign(license_data: Dict[str, Any], email: str, first_name: str, last_name: str):
+        license_data["assignee"] = {"type": "USER", "email": email, "name": f"{first_name} {last_name}"}
+        license_data["isAvailableToAssign"] = False
+
+    def authorize(self, headers: CaseInsensitiveDict) -> Optional[int]:
+        """ Return the team a token is restricted to (None for organization tokens) """
+        api_key = headers.get("X-Api-Key")
+        if not api_key:
+            raise APIError(status_codes.UNAUTHORIZED, error_codes.MISSING_TOKEN_HEADER)
+        if api_key not in self.tokens:
+            raise APIError(status_codes.UNAUTHORIZED, error_codes.INVALID_TOKEN)
+        return self.tokens[api_key]
+
+    def _find_license(self, license_id: Any, token_team: Optional[int]) -> Dict[str, Any]:
+        license_data = self.licenses.get(license_id) if isinstance(license_id, str) else None
+        if license_data is None or (token_team is not None and license_data["team"]["id"] != token_team):
+            raise APIError(status_codes.NOT_FOUND, error_codes.LICENSE_NOT_FOUND, str(license_id))
+        return license_data
+
+    def _find_team(self, team_id: Any) -> int:
+        try:
+            team_id = int(team_id)
+        except (TypeError, ValueError):
+            raise APIError(status_codes.NOT_FOUND, error_codes.TEAM_NOT_FOUND, str(team_id))
+        if team_id not in self.teams:
+            raise APIError(status_codes.NOT_FOUND, error_codes.TEAM_NOT_FOUND, str(team_id))
+        return team_id
+
+    @staticmethod
+    def _validate_contact(contact: Any):
+        if not isinstance(contact, dict):
+            raise APIError(status_codes.BAD_REQUEST, error_codes.INVALID_CONTACT_EMAIL, "contact is required")
+
+        email = contact.get("email")
+        if not isinstance(email, str) or len(email) > MAX_EMAIL_LENGTH or not EMAIL_PATTERN.match(email):
+            raise APIError(status_codes.BAD_REQUEST, error_codes.INVALID_CONTACT_EMAIL, email)
+
+        for field in ("firstName", "lastName"):
+            name = contact.get(field)
+            if not isinstance(name, str) or not name.strip():
+                raise APIError(status_codes.BAD_REQUEST, error_codes.INVALID_CONTACT_NAME, "Value is empty.")
+            if len(name) > MAX_NAME_LENGTH:
+                raise APIError(status_codes.BAD_REQUEST, error_codes.INVALID_CONTACT_NAME, "Value is too long.")
+            if not NAME_PATTERN.match(name):
+                raise APIError(status_codes.BAD_REQUEST, error_codes.INVALID_CONTACT_NAME,
+                               "Please, don't use special characters.")
+
+    def assign_license(self, payload: Dict[str, Any], token_team: Optional[int]):
+        self._validate_contact(payload.get("contact"))
+        contact = payload["contact"]
+        with self._lock:
+            license_data = self._find_license(payload.get("licenseId"), token_team)
+            if not license_data["isAvailableToAssign"]:
+                raise APIError(status_codes.BAD_REQUEST, error_codes.LICENSE_IS_NOT_AVAILABLE_TO_ASSIGN)
+            self._assign(license_data, contact["email"], contact["firstName"], contact["lastName"])
+
+    def change_licenses_team(self, payload: Dict[str, Any], token_team: Optional[int]) -> Dict[str, Any]:
+        if token_team is not None:
+            raise APIError(status_codes.FORBIDDEN, error_codes.TOKEN_TYPE_MISMATCH)
+        license_ids = payload.get("licenseIds")
+        if not isinstance(license_ids, list):
+            raise APIError(status_codes.BAD_REQUEST, error_codes.LICENSE_NOT_FOUND, "licenseIds must be a list")
+
+        with self._lock:
+            target_team_id = self._find_team(payload.get("targetTeamId"))
+            licenses = [self._find_license(license_id, None) for license_id in license_ids]
+            for license_data in licenses:
+                license_data["team"] = {"id": target_team_id, "name": self.teams[target_team_id]}
+        return {"licenseIds": license_ids}
+
+    def list_licenses(
+        self,
+        token_team: Optional[int],
+        team_id: Optional[Any] = None,
+        assigned: Optional[bool] = None
+    ) -> List[Dict[str, Any]]:
+        with self._lock:
+            if team_id is not None:
+                team_id = self._find_team(team_id)
+                if token_team is not None and token_team != team_id:
+                    raise APIError(status_codes.NOT_FOUND, error_codes.TEAM_NOT_FOUND, str(team_id))
+            else:
+                team_id = token_team
+            # Nested objects are replaced rather than mutated, so shallow copies are safe to hand out
+            return [
+                dict(license_data)
+                for license_data in self.licenses.values()
+                if (team_id is None or license_data["team"]["id"] == team_id)
+                and (assigned is None or license_data["isAvailableToAssign"] != assigned)
+            ]
+
+    def revoke_license(self, payload: Dict[str, Any], token_team: Optional[int]):
+        with self._lock:
+            license_data = self._find_license(payload.get("licenseId"), token_team)
+            license_data["assignee"] = None
+            license_data["isAvailableToAssign"] = True
+
+
+_default_model: Optional[LicenseModel] = None
+_default_model_lock = threading.Lock()
+
+
+def default_model() -> LicenseModel:
+    """ Process-wide model shared by every in-memory client, so fixtures and tests see the same state """
+    global _default_model
+    with _default_model_lock:
+        if _default_model is None:
+            _default_model = LicenseModel()
+        return _default_model
+
+
+# Customer code -> model of that organization, for multi-tenant runs
+_tenant_models: Dict[str, LicenseModel] = {}
+
+
+def register_tenant(customer_code: str, api_key: str, **model_options) -> LicenseModel:
+    """ Serve requests sent with `customer_code` from a separate model that accepts `api_key` as its organization token """
+    model = LicenseModel(tokens={api_key: None}, **model_options)
+    with _default_model_lock:
+        _tenant_models[customer_code] = model
+    return model
+
+
+def model_for(customer_code: Optional[str]) -> LicenseModel:
+    """ Model of a registered tenant, the default model for any other customer code """
+    model = _tenant_models.get(customer_code)
+    return default_model() if model is None else model
+
+
+class InMemoryLicenseAdapter(BaseAdapter):
+    """
+    requests transport adapter that answers license API calls from a LicenseModel; without an
+    explicit model each request goes to the model of its X-Customer-Code (see register_tenant)
+    """
+
+    def __init__(self, base_url: str = config.BASE_URL, model: Optional[LicenseModel] = None):
+        super().__init__()
+        self.base_path = urlparse(base_url).path.rstrip("/")
+        self.model = model
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        parsed = urlparse(request.url)
+        path = parsed.path[len(self.base_path):] if parsed.path.startswith(self.base_path) else parsed.path
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        try:
+            status_code, body = self._dispatch(request.method, path, query, request.headers, request.body)
+        except APIError as error:
+            status_code, body = error.status_code, error.body
+        return self._build_response(request, status_code, body)
+
+    def _dispatch(self, method: str, path: str, query: Dict[str, str], headers, body) -> Tuple[int, Any]:
+        model = self.model or model_for(headers.get("X-Customer-Code"))
+        token_team = model.authorize(headers)
+        assigned = {"true": True, "false": False}.get(query.get("assigned", "").lower())
+
+        if method == "GET" and path == endpoints.GET_LICENSES:
+            return status_codes.OK, model.list_licenses(token_team, assigned=assigned)
+        team_match = TEAM_LICENSES_PATH.match(path)
+        if method == "GET" and team_match:
+            return status_codes.OK, model.list_licenses(token_team, team_match.group("team_id"), assigned)
+
+        if method == "POST" and path == endpoints.ASSIGN_LICENSE:
+            model.assign_license(self._json_body(body), token_team)
+            return status_codes.OK, None
+        if method == "POST" and path == endpoints.CHANGE_LICENSE_TEAM:
+            return status_codes.OK, model.change_licenses_team(self._json_body(body), token_team)
+        if method == "POST" and path == endpoints.REVOKE_LICENSE:
+            model.revoke_license(self._json_body(body), token_team)
+            return status_codes.OK, None
+
+        return status_codes.NOT_FOUND, {"code": "NOT_FOUND", "description": f"{method} {path}"}
+
+    @staticmethod
+    def _json_body(body) -> Dict[str, Any]:
+        if isinstance(body, bytes):
+            body = body.decode("utf-8", errors="replace")
+        try:
+            payload = json.loads(body or "")
+        except ValueError as e:
+            raise APIError(status_codes.BAD_REQUEST, {"code": "INVALID_JSON", "description": None}, str(e))
+        if not isinstance(payload, dict):
+            raise APIError(status_codes.BAD_REQUEST, {"code": "INVALID_JSON", "description": "Expected a JSON object"})
+        return payload
+
+    def _build_response(self, request, status_code: int, body: Any) -> requests.Response:
+        content = b"" if body is None else json.dumps(body).encode("utf-8")
+        response = requests.Response()
+        response.status_code = status_code
+        response.reason = HTTPStatus(status_code).phrase
+        response.headers = CaseInsensitiveDict({
+            "Content-Type": "application/json",
+            "Content-Length": str(len(content)),
+        })
+        response._content = content
+        response._content_consumed = True
+        response.raw = io.BytesIO(content)
+        response.encoding = "utf-8"
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def close(self):
+        pass
+
+
+class _StandInRequestHandler(BaseHTTPRequestHandler):
+    """ Serves the license endpoints over HTTP through the server's InMemoryLicenseAdapter """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY keep-alive responses stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def _handle(self):
+        parsed = urlparse(self.path)
+        adapter = self.server.adapter
+        path = parsed.path[len(adapter.base_path):] if parsed.path.startswith(adapter.base_path) else parsed.path
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        try:
+            status_code, payload = adapter._dispatch(self.command, path, query, self.headers, body)
+        except APIError as error:
+            status_code, payload = error.status_code, error.body
+
+        content = b"" if payload is None else json.dumps(payload).encode("utf-8")
+        self.send_response(status_code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_GET = do_POST = _handle
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve_license_model(
+    host: str = "127.0.0.1",
+    port: int = 0,
+    model: Optional[LicenseModel] = None,
+    base_url: str = config.BASE_URL
+) -> ThreadingHTTPServer:
+    """
+    Start a local HTTP stand-in for the license API in a daemon thread; port 0 picks a free port.
+    Point a client at f"http://{host}:{server.server_port}{urlparse(base_url).path}" and call
+    server.shutdown() when done; standin_server() does both.
+    """
+    server = ThreadingHTTPServer((host, port), _StandInRequestHandler)
+    server.daemon_threads = True
+    server.adapter = InMemoryLicenseAdapter(base_url, model)
+    threading.Thread(target=server.serve_forever, name="license-stand-in", daemon=True).start()
+    return server
+
+
+@contextmanager
+def standin_server(model: Optional[LicenseModel] = None, base_url: str = config.BASE_URL) -> Iterator[str]:
+    """
+    Serve a license model on a free localhost port for the duration of the block and yield the
+    base URL to point clients at.
+
+    Usage:
+        with standin_server() as base_url:
+            client = LicenseAPIClient(base_url=base_url)
+    """
+    server = serve_license_model(model=model, base_url=base_url)
+    try:
+        yield f"http://127.0.0.1:{server.server_port}{urlparse(base_url).path}"
+    finally:
+        server.shutdown()
+        server.server_close()
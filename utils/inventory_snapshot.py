@@ -0,0 +1,323 @@
+"""
+Shared on-disk license inventory snapshot
+
+One process fetches the organization inventory and writes it to a SQLite file; every other
+process on the machine (e.g. xdist workers) queries that file instead of downloading and
+parsing its own copy. Reads go through SQLite's memory-mapped pages, so nothing is copied
+into Python beyond the rows a query returns. The snapshot records which transport, API host and
+organization it was taken from, and a reader from anywhere else re-fetches instead of reusing it.
+"""
+import hashlib
+import sqlite3
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.license_models import AVAILABLE, ASSIGNED, UNKNOWN, License, LicenseInventory
+
+
+# license_id, team_id, product_code, status, assignee_email
+Row = Tuple[str, Optional[int], Optional[str], int, Optional[str]]
+
+
+# Claims older than this are released, so licenses handed to a test that never assigned them
+# become available again to later runs
+CLAIM_TTL = 15 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS licenses (
+    license_id TEXT PRIMARY KEY,
+    team_id INTEGER,
+    product_code TEXT,
+    status INTEGER NOT NULL,
+    assignee_email TEXT,
+    content_hash INTEGER,
+    generation INTEGER NOT NULL,
+    claimed_by TEXT,
+    claimed_at REAL,
+    status_since REAL
+);
+CREATE INDEX IF NOT EXISTS idx_licenses_team_status ON licenses (team_id, status);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+"""
+
+
+def content_hash(team_id: Optional[int], product_code: Optional[str], status: int, assignee_email: Optional[str]) -> int:
+    """ Stable 64-bit hash of the fields a license can change, stored as a signed SQLite integer """
+    content = "\x1f".join("" if value is None else str(value) for value in (team_id, product_code, status, assignee_email))
+    return int.from_bytes(hashlib.blake2b(content.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+def inventory_rows(inventory: LicenseInventory) -> Iterator[Row]:
+    """ Flatten an inventory into snapshot rows straight from its columns """
+    for license_id, team_index, product_index, status, email in zip(
+        inventory.license_ids, inventory.team_indexes, inventory.product_indexes,
+        inventory.statuses, inventory.assignee_emails
+    ):
+        if license_id:
+            yield license_id, inventory.teams[team_index][0], inventory.products[product_index], status, email
+
+
+def row_license(row: Row) -> License:
+    """ Materialize a snapshot row; team names are not stored in the snapshot """
+    license_id, team_id, product_code, status, assignee_email = row
+    return License(
+        license_id=license_id,
+        team_id=team_id,
+        team_name=None,
+        product_code=product_code,
+        is_available_to_assign=None if status == UNKNOWN else status == AVAILABLE,
+        assignee_email=assignee_email
+    )
+
+
+class InventorySnapshot:
+    """ SQLite-backed license inventory shared between processes """
+
+    def __init__(self, path: Path, source: Optional[str] = None, busy_timeout: float = 120):
+        """
+        source identifies where the inventory comes from (see LicenseAPIClient.inventory_source);
+        it is stored on every full write and a snapshot of another source counts as stale.
+        """
+        self.path = Path(path)
+        self.source = source
+        # Licenses this connection marked consumed
+        self.consumed = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit mode; writers open explicit IMMEDIATE transactions that double as a cross-process lock
+        self.connection = sqlite3.connect(str(self.path), timeout=busy_timeout, isolation_level=None,
+                                          check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA mmap_size=268435456")
+        self.connection.executescript(SCHEMA)
+        self.connection.create_function("content_hash", 4, content_hash, deterministic=True)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(licenses)")}
+        if "content_hash" not in columns:
+            # Snapshots written before content hashes were tracked
+            self.connection.execute("ALTER TABLE licenses ADD COLUMN content_hash INTEGER")
+        self.connection.execute(
+            "UPDATE licenses SET content_hash = content_hash(team_id, product_code, status, assignee_email) "
+            "WHERE content_hash IS NULL"
+        )
+        if "status_since" not in columns:
+            # Snapshots written before status ages were tracked; their rows count from now
+            self.connection.execute("ALTER TABLE licenses ADD COLUMN status_since REAL")
+            self.connection.execute("UPDATE licenses SET status_since = ?", (time.time(),))
+
+    def close(self):
+        self.connection.close()
+
+    @contextmanager
+    def write_lock(self) -> Iterator[None]:
+        """
+        Run the block in one IMMEDIATE transaction, which doubles as a cross-process write lock.
+        Reads inside the block see no other writer's changes until it commits. Nested blocks join
+        the outer transaction.
+        """
+        if self.connection.in_transaction:
+            yield
+            return
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+            self.connection.execute("COMMIT")
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+
+    def _meta(self, key: str):
+        row = self.connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    @property
+    def taken_at(self) -> Optional[float]:
+        """ Unix time the inventory in the snapshot was fetched, None if it was never written """
+        return self._meta("taken_at")
+
+    @property
+    def generation(self) -> int:
+        """ Incremented on every write, so readers can tell whether cached state is still current """
+        return self._meta("generation") or 0
+
+    @property
+    def stored_source(self) -> Optional[str]:
+        """ Source of the inventory currently in the snapshot """
+        return self._meta("source")
+
+    def age(self) -> Optional[float]:
+        taken_at = self.taken_at
+        return None if taken_at is None else time.time() - taken_at
+
+    def write(self, inventory: LicenseInventory, taken_at: Optional[float] = None):
+        """ Replace the snapshot contents, keeping live claims on licenses that are still present """
+        with self.write_lock():
+            self._write(inventory, time.time() if taken_at is None else taken_at)
+
+    def _write(self, inventory: LicenseInventory, taken_at: float):
+        if self.source is not None and self.stored_source != self.source:
+            # Another environment's licenses and claims mean nothing here
+            self.connection.execute("DELETE FROM licenses")
+            self.connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('source', ?)", (self.source,))
+        generation = self.generation + 1
+        self._upsert(inventory_rows(inventory), generation, taken_at)
+        self.connection.execute("DELETE FROM licenses WHERE generation != ?", (generation,))
+        self._set_written(generation, taken_at)
+
+    def _upsert(self, rows: Iterable[Row], generation: int, taken_at: float):
+        # status_since keeps the time a license's status and assignee were first seen, across runs
+        self.connection.executemany(
+            """
+            INSERT INTO licenses (license_id, team_id, product_code, status, assignee_email, content_hash, generation,
+                                  status_since)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (license_id) DO UPDATE SET
+                team_id = excluded.team_id,
+                product_code = excluded.product_code,
+                status = excluded.status,
+                assignee_email = excluded.assignee_email,
+                content_hash = excluded.content_hash,
+                generation = excluded.generation,
+                status_since = CASE
+                    WHEN status = excluded.status AND assignee_email IS excluded.assignee_email THEN status_since
+                    ELSE excluded.status_since
+                END
+            """,
+            ((*row, content_hash(*row[1:]), generation, taken_at) for row in rows)
+        )
+
+    def _set_written(self, generation: int, taken_at: float):
+        self.connection.executemany(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            [("generation", generation), ("taken_at", taken_at)]
+        )
+
+    def apply_delta(self, upserts: List[Row], removed_ids: List[str], taken_at: Optional[float] = None):
+        """ Apply only added/changed rows and removals, leaving untouched rows (and their claims) alone """
+        taken_at = time.time() if taken_at is None else taken_at
+        with self.write_lock():
+            generation = self.generation + 1
+            self._upsert(upserts, generation, taken_at)
+            self.connection.executemany("DELETE FROM licenses WHERE license_id = ?", ((license_id,) for license_id in removed_ids))
+            self._set_written(generation, taken_at)
+
+    def content_hashes(self) -> Dict[str, int]:
+        """ license_id -> content hash for every license in the snapshot """
+        return dict(self.connection.execute("SELECT license_id, content_hash FROM licenses"))
+
+    def assigned_since(self) -> Dict[str, float]:
+        """ license_id -> Unix time its current assignment was first recorded, for every assigned license """
+        return dict(self.connection.execute(
+            "SELECT license_id, status_since FROM licenses WHERE status = ?", (ASSIGNED,)
+        ))
+
+    def get_licenses(self, license_ids: Iterable[str]) -> Dict[str, License]:
+        """ Load individual snapshot rows as License records """
+        licenses = {}
+        for license_id in license_ids:
+            row = self.connection.execute(
+                "SELECT license_id, team_id, product_code, status, assignee_email FROM licenses WHERE license_id = ?",
+                (license_id,)
+            ).fetchone()
+            if row is not None:
+                licenses[license_id] = row_license(row)
+        return licenses
+
+    def is_fresh(self, max_age: float) -> bool:
+        """ True when the snapshot is at most max_age seconds old and was taken from this snapshot's source """
+        age = self.age()
+        if age is None or age > max_age:
+            return False
+        return self.source is None or self.stored_source == self.source
+
+    def refresh_if_stale(self, fetch: Callable[[], LicenseInventory], max_age: float) -> bool:
+        """
+        Re-fetch the inventory when the snapshot is missing, older than max_age seconds or from
+        another source. The check and the fetch run under the write lock, so when several processes
+        start at once only the first one fetches and the rest read its result. Returns True if fetched.
+        """
+        if self.is_fresh(max_age):
+            return False
+
+        with self.write_lock():
+            if self.is_fresh(max_age):
+                return False
+            self._write(fetch(), time.time())
+            return True
+
+    def _ids(self, status: int, team_id: Optional[int]) -> List[str]:
+        query = "SELECT license_id FROM licenses WHERE status = ?"
+        params: list = [status]
+        if team_id is not None:
+            query += " AND team_id = ?"
+            params.append(int(team_id))
+        return [row[0] for row in self.connection.execute(query + " ORDER BY license_id", params)]
+
+    def available_ids(self, team_id: Optional[int] = None) -> List[str]:
+        """ IDs of licenses available to assign at snapshot time, optionally for one team """
+        return self._ids(AVAILABLE, team_id)
+
+    def assigned_ids(self, team_id: Optional[int] = None) -> List[str]:
+        """ IDs of licenses assigned at snapshot time, optionally for one team """
+        return self._ids(ASSIGNED, team_id)
+
+    def count_available(self, team_id: Optional[int] = None) -> int:
+        return len(self.available_ids(team_id))
+
+    def claim_available(
+        self,
+        count: int = 1,
+        team_id: Optional[int] = None,
+        owner: str = "",
+        claim_ttl: float = CLAIM_TTL
+    ) -> List[str]:
+        """
+        Atomically hand out up to `count` available licenses that no other process holds, so parallel
+        workers never assign the same license. Fewer IDs are returned when unclaimed licenses run out.
+        """
+        now = time.time()
+        query = """
+            SELECT license_id FROM licenses
+            WHERE status = ?{team_filter} AND (claimed_at IS NULL OR claimed_at < ?)
+            ORDER BY license_id
+            LIMIT ?
+        """.format(team_filter=" AND team_id = ?" if team_id is not None else "")
+        params: list = [AVAILABLE] + ([int(team_id)] if team_id is not None else []) + [now - claim_ttl, count]
+
+        with self.write_lock():
+            license_ids = [row[0] for row in self.connection.execute(query, params)]
+            self.connection.executemany(
+                "UPDATE licenses SET claimed_by = ?, claimed_at = ? WHERE license_id = ?",
+                [(owner, now, license_id) for license_id in license_ids]
+            )
+        return license_ids
+
+    def release(self, license_ids: Iterable[str], owner: str):
+        """ Drop `owner`'s claims on licenses it did not use """
+        self.connection.executemany(
+            "UPDATE licenses SET claimed_by = NULL, claimed_at = NULL WHERE license_id = ? AND claimed_by = ?",
+            [(license_id, owner) for license_id in license_ids]
+        )
+
+    def mark_consumed(self, license_ids: Iterable[str]):
+        """
+        Record that claimed licenses may have been assigned or moved: they stop counting as available
+        (status unknown) and lose their claims until the next fetch reports their real state. The
+        generation is bumped, so syncs holding the old content hashes reload them.
+        """
+        with self.write_lock():
+            before = self.connection.total_changes
+            self.connection.executemany(
+                "UPDATE licenses SET status = ?, content_hash = content_hash(team_id, product_code, ?, assignee_email), "
+                "claimed_by = NULL, claimed_at = NULL WHERE license_id = ?",
+                [(UNKNOWN, UNKNOWN, license_id) for license_id in license_ids]
+            )
+            changed = self.connection.total_changes - before
+            if changed:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('generation', ?)", (self.generation + 1,)
+                )
+        self.consumed += changed
@@ -0,0 +1,108 @@
+"""
+Incremental license inventory sync
+
+Each fetch is compared with the snapshot by licenseId and content hash; only added, removed
+and changed rows are written back, and listeners receive one event per change, so consumers
+do work proportional to churn rather than to inventory size.
+"""
+from typing import Callable, Dict, List, Optional
+
+from utils.inventory_snapshot import InventorySnapshot, Row, content_hash, inventory_rows, row_license
+from utils.license_models import License, LicenseInventory
+
+
+class ChangeEvent:
+    """ One change to one license between two inventory fetches """
+
+    ADDED = "added"
+    REMOVED = "removed"
+    ASSIGNED = "assigned"
+    REVOKED = "revoked"
+    TEAM_CHANGED = "team_changed"
+    UPDATED = "updated"
+
+    __slots__ = ("kind", "license_id", "before", "after")
+
+    def __init__(self, kind: str, license_id: str, before: Optional[License], after: Optional[License]):
+        self.kind = kind
+        self.license_id = license_id
+        self.before = before
+        self.after = after
+
+    def __repr__(self) -> str:
+        return f"ChangeEvent(kind={self.kind!r}, license_id={self.license_id!r})"
+
+
+class InventorySync:
+    """ Applies inventory fetches to an InventorySnapshot as deltas and reports what changed """
+
+    def __init__(self, snapshot: InventorySnapshot, listeners: Optional[List[Callable[[ChangeEvent], None]]] = None):
+        self.snapshot = snapshot
+        self.listeners: List[Callable[[ChangeEvent], None]] = list(listeners or [])
+        self._hashes: Dict[str, int] = {}
+        self._generation: Optional[int] = None
+
+    def _previous_hashes(self) -> Dict[str, int]:
+        # Another process may have written the snapshot since the last sync; reload only then
+        generation = self.snapshot.generation
+        if generation != self._generation:
+            self._hashes = self.snapshot.content_hashes()
+            self._generation = generation
+        return self._hashes
+
+    def sync(self, inventory: LicenseInventory) -> List[ChangeEvent]:
+        """
+        Write the differences between the snapshot and `inventory` and return the resulting events.
+        The stored state is read and the delta applied in one write transaction, so concurrent syncs
+        from other workers never diff against state that changes before their delta lands.
+        """
+        with self.snapshot.write_lock():
+            previous = self._previous_hashes()
+            current: Dict[str, int] = {}
+            upserts: List[Row] = []
+            for row in inventory_rows(inventory):
+                row_hash = content_hash(*row[1:])
+                current[row[0]] = row_hash
+                if previous.get(row[0]) != row_hash:
+                    upserts.append(row)
+            removed_ids = [license_id for license_id in previous if license_id not in current]
+
+            before = self.snapshot.get_licenses([row[0] for row in upserts if row[0] in previous] + removed_ids)
+            events: List[ChangeEvent] = []
+            for row in upserts:
+                after = row_license(row)
+                events.extend(_classify(row[0], before.get(row[0]), after))
+            events.extend(ChangeEvent(ChangeEvent.REMOVED, license_id, before.get(license_id), None)
+                          for license_id in removed_ids)
+
+            # Written even when nothing changed, so taken_at records when the inventory was last confirmed
+            self.snapshot.apply_delta(upserts, removed_ids)
+            self._hashes = current
+            self._generation = self.snapshot.generation
+
+        for event in events:
+            for listener in self.listeners:
+                listener(event)
+        return events
+
+    def refresh(self, fetch: Callable[[], LicenseInventory]) -> List[ChangeEvent]:
+        """ Fetch a new inventory (e.g. client.get_license_inventory) and sync it """
+        return self.sync(fetch())
+
+
+def _classify(license_id: str, before: Optional[License], after: License) -> List[ChangeEvent]:
+    """ A changed license can yield several events, e.g. moved to another team and assigned """
+    if before is None:
+        return [ChangeEvent(ChangeEvent.ADDED, license_id, None, after)]
+
+    events = []
+    if before.team_id != after.team_id:
+        events.append(ChangeEvent(ChangeEvent.TEAM_CHANGED, license_id, before, after))
+    if before.is_available_to_assign and after.is_available_to_assign is False:
+        events.append(ChangeEvent(ChangeEvent.ASSIGNED, license_id, before, after))
+    elif before.is_available_to_assign is False and after.is_available_to_assign:
+        events.append(ChangeEvent(ChangeEvent.REVOKED, license_id, before, after))
+    if not events:
+        # Reassigned to someone else, another product, or availability became unknown
+        events.append(ChangeEvent(ChangeEvent.UPDATED, license_id, before, after))
+    return events
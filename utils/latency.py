@@ -0,0 +1,48 @@
+"""
+Latency statistics helpers
+"""
+import math
+import re
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def normalize_endpoint(endpoint: str) -> str:
+    """ Collapse numeric path segments so team-specific URLs aggregate per endpoint """
+    return _ID_SEGMENT.sub("/{id}", endpoint.split("?", 1)[0])
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """ Linear-interpolated percentile of a non-empty list """
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100
+    lower = math.floor(rank)
+    upper = math.ceil(rank)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+class LatencyWindow:
+    """ Thread-safe rolling window of recent latencies per key """
+
+    def __init__(self, size: int = 200):
+        self.size = size
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def add(self, key: str, latency: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.size)).append(latency)
+
+    def percentile(self, key: str, pct: float, min_samples: int = 1) -> Optional[float]:
+        """ Percentile of the recent latencies for key, None until min_samples were recorded """
+        with self._lock:
+            samples = list(self._samples.get(key, ()))
+        if len(samples) < max(min_samples, 1):
+            return None
+        return percentile(samples, pct)
@@ -0,0 +1,150 @@
+"""
+Compact license records and columnar inventory storage
+"""
+import json
+import sys
+from array import array
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+
+# Availability column values; licenses without isAvailableToAssign are neither available nor assigned
+AVAILABLE = 1
+ASSIGNED = 0
+UNKNOWN = 2
+
+
+class License:
+    """ Single license record; __slots__ keeps it to a handful of references """
+
+    __slots__ = ("license_id", "team_id", "team_name", "product_code", "is_available_to_assign", "assignee_email")
+
+    def __init__(
+        self,
+        license_id: str,
+        team_id: Optional[int],
+        team_name: Optional[str],
+        product_code: Optional[str],
+        is_available_to_assign: Optional[bool],
+        assignee_email: Optional[str]
+    ):
+        self.license_id = license_id
+        self.team_id = team_id
+        self.team_name = team_name
+        self.product_code = product_code
+        self.is_available_to_assign = is_available_to_assign
+        self.assignee_email = assignee_email
+
+    def __repr__(self) -> str:
+        return (f"License(license_id={self.license_id!r}, team_id={self.team_id!r}, "
+                f"product_code={self.product_code!r}, is_available_to_assign={self.is_available_to_assign!r})")
+
+
+class LicenseInventory:
+    """
+    Column-oriented license list: one array per field, with team and product values interned
+    into small lookup tables. Rows are materialized as License objects only on access.
+    """
+
+    def __init__(self):
+        self.license_ids: List[str] = []
+        self.assignee_emails: List[Optional[str]] = []
+        self.statuses = bytearray()
+        self.team_indexes = array("H")
+        self.product_indexes = array("H")
+        # Index 0 of both lookup tables stands for a missing value
+        self.teams: List[Tuple[Optional[int], Optional[str]]] = [(None, None)]
+        self.products: List[Optional[str]] = [None]
+        self._team_lookup: Dict[Optional[int], int] = {None: 0}
+        self._product_lookup: Dict[Optional[str], int] = {None: 0}
+
+    @classmethod
+    def from_json(cls, content: Union[bytes, str]) -> "LicenseInventory":
+        """
+        Decode a /customer/licenses response body straight into columns. Each license object
+        is consumed by the JSON decoder hook as soon as it is parsed, so the full list of
+        dicts never exists in memory.
+        """
+        inventory = cls()
+
+        def consume_object(pairs: List[Tuple[str, Any]]) -> Any:
+            obj = dict(pairs)
+            if "licenseId" in obj:
+                inventory.append(obj)
+                return None
+            return obj
+
+        decoded = json.loads(content, object_pairs_hook=consume_object)
+        if not isinstance(decoded, list):
+            raise ValueError(f"Expected a JSON array of licenses, got {type(decoded).__name__}")
+        return inventory
+
+    def _intern_team(self, team: Any) -> int:
+        team_id = team.get("id") if isinstance(team, dict) else None
+        index = self._team_lookup.get(team_id)
+        if index is None:
+            index = len(self.teams)
+            team_name = team.get("name")
+            self.teams.append((team_id, sys.intern(team_name) if isinstance(team_name, str) else None))
+            self._team_lookup[team_id] = index
+        return index
+
+    def _intern_product(self, product: Any) -> int:
+        code = product.get("code") if isinstance(product, dict) else None
+        index = self._product_lookup.get(code)
+        if index is None:
+            index = len(self.products)
+            self.products.append(sys.intern(code) if isinstance(code, str) else code)
+            self._product_lookup[code] = index
+        return index
+
+    def append(self, license_data: Dict[str, Any]):
+        """ Add one license from its API representation """
+        available = license_data.get("isAvailableToAssign")
+        assignee = license_data.get("assignee")
+        self.license_ids.append(license_data.get("licenseId") or "")
+        self.assignee_emails.append(assignee.get("email") if isinstance(assignee, dict) else None)
+        self.statuses.append(UNKNOWN if available is None else (AVAILABLE if available else ASSIGNED))
+        self.team_indexes.append(self._intern_team(license_data.get("team")))
+        self.product_indexes.append(self._intern_product(license_data.get("product")))
+
+    def __len__(self) -> int:
+        return len(self.license_ids)
+
+    def __getitem__(self, index: int) -> License:
+        team_id, team_name = self.teams[self.team_indexes[index]]
+        status = self.statuses[index]
+        return License(
+            license_id=self.license_ids[index],
+            team_id=team_id,
+            team_name=team_name,
+            product_code=self.products[self.product_indexes[index]],
+            is_available_to_assign=None if status == UNKNOWN else status == AVAILABLE,
+            assignee_email=self.assignee_emails[index]
+        )
+
+    def __iter__(self) -> Iterator[License]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def _ids_with_status(self, status: int, team_id: Optional[int]) -> List[str]:
+        team_index = None
+        if team_id is not None:
+            team_index = self._team_lookup.get(int(team_id))
+            if team_index is None:
+                return []
+        return [
+            license_id
+            for license_id, license_status, license_team in zip(self.license_ids, self.statuses, self.team_indexes)
+            if license_id and license_status == status and (team_index is None or license_team == team_index)
+        ]
+
+    def available_ids(self, team_id: Optional[int] = None) -> List[str]:
+        """ IDs of licenses available to assign, optionally limited to one team """
+        return self._ids_with_status(AVAILABLE, team_id)
+
+    def assigned_ids(self, team_id: Optional[int] = None) -> List[str]:
+        """ IDs of assigned licenses, optionally limited to one team """
+        return self._ids_with_status(ASSIGNED, team_id)
+
+    def team_ids(self) -> List[int]:
+        return [team_id for team_id, _ in self.teams[1:] if team_id is not None]
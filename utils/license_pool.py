@@ -0,0 +1,191 @@
+"""
+Warm pool replenisher keeping assignable licenses available per team
+
+A background thread checks the available count of each watched team. When a team drops below
+its low watermark it is topped up to the high watermark, first by revoking stale assignments the
+tests made (assignee emails on TEST_EMAIL_DOMAIN, recorded in the snapshot at least `stale_after`
+seconds ago), then by moving spare, unclaimed available licenses from other watched teams with one
+batched change_license_team call per donor team. Failures of the background thread are logged and
+kept in `failures`.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from config.api_config import config, status_codes
+from utils.api_client import LicenseAPIClient
+from utils.inventory_sync import InventorySync
+from utils.license_models import ASSIGNED, AVAILABLE, LicenseInventory
+
+
+logger = logging.getLogger(__name__)
+
+
+class LicensePoolReplenisher:
+    """ Tops teams up to their watermarks; safe to call ensure() from several threads """
+
+    def __init__(
+        self,
+        client: LicenseAPIClient,
+        watermarks: Dict[int, Tuple[int, int]],
+        interval: float = 30,
+        sync: Optional[InventorySync] = None,
+        stale_after: float = 300
+    ):
+        """
+        watermarks maps team ID -> (low, high): a team below `low` available licenses is refilled to `high`.
+        Licenses are only moved between watched teams. With `sync`, every inventory fetch is also
+        applied to its snapshot, so snapshot readers see replenished licenses right away; only
+        licenses no test holds a claim on are moved, and test-owned assignments are revoked once
+        the snapshot has recorded them for `stale_after` seconds. Without `sync` nothing is revoked,
+        since there is no record of how old an assignment is.
+        """
+        for team_id, (low, high) in watermarks.items():
+            if not 0 <= low <= high:
+                raise ValueError(f"Invalid watermarks for team {team_id}: low={low}, high={high}")
+        self.client = client
+        self.watermarks = dict(watermarks)
+        self.interval = interval
+        self.sync = sync
+        self.stale_after = stale_after
+        self.revoked = 0
+        self.moved = 0
+        # Exceptions raised by background checks; see raise_failures()
+        self.failures: List[Exception] = []
+        self.owner = f"license-pool:{os.getpid()}"
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> "LicensePoolReplenisher":
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="license-pool", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.replenish()
+            except Exception as e:
+                logger.exception("License pool replenishment failed")
+                self.failures.append(e)
+
+    def raise_failures(self):
+        """ Re-raise the first background failure, so a broken replenisher fails the run visibly """
+        if self.failures:
+            raise Exception(
+                f"License pool replenishment failed {len(self.failures)} time(s); first error: {self.failures[0]}"
+            ) from self.failures[0]
+
+    def ensure(self, team_id: int, count: int) -> int:
+        """ Top up `team_id` so at least `count` licenses are available; returns the available count """
+        return self.replenish({int(team_id): count})[int(team_id)]
+
+    def replenish(self, required: Optional[Dict[int, int]] = None) -> Dict[int, int]:
+        """ Run one check; `required` raises individual teams' targets. Returns available counts per team """
+        with self._lock:
+            inventory = self._fetch()
+            available = {team_id: len(inventory.available_ids(team_id)) for team_id in self._teams(required)}
+            targets = {}
+            for team_id, count in available.items():
+                low, high = self.watermarks.get(team_id, (0, 0))
+                need = (required or {}).get(team_id, 0)
+                if count < max(low, need):
+                    targets[team_id] = max(high, need)
+            if not targets:
+                return available
+
+            test_owned = self._test_owned_assignments(inventory)
+            for team_id, target in targets.items():
+                available[team_id] += self._revoke(test_owned.get(team_id, []), target - available[team_id])
+            for team_id, target in targets.items():
+                if available[team_id] < target:
+                    self._rebalance(inventory, available, team_id, target)
+
+            if self.sync is not None:
+                # Publish the replenished licenses to snapshot readers
+                self._fetch()
+            return available
+
+    def _teams(self, required: Optional[Dict[int, int]]) -> List[int]:
+        return list(dict.fromkeys([*self.watermarks, *(required or {})]))
+
+    def _fetch(self) -> LicenseInventory:
+        inventory = self.client.get_license_inventory()
+        if self.sync is not None:
+            self.sync.sync(inventory)
+        return inventory
+
+    def _test_owned_assignments(self, inventory: LicenseInventory) -> Dict[int, List[str]]:
+        """
+        Stale licenses assigned to test addresses, per team. The age of an assignment is the time
+        since the snapshot first recorded it, by this or any earlier run sharing the snapshot, so
+        leftovers of earlier runs are revoked right away while a license a test assigned moments
+        ago is never revoked under it.
+        """
+        if self.sync is None:
+            return {}
+        domain = config.TEST_EMAIL_DOMAIN.lower()
+        cutoff = time.time() - self.stale_after
+        assigned_since = self.sync.snapshot.assigned_since()
+        owned: Dict[int, List[str]] = {}
+        for license_id, status, email, team_index in zip(
+            inventory.license_ids, inventory.statuses, inventory.assignee_emails, inventory.team_indexes
+        ):
+            if license_id and status == ASSIGNED and email and email.lower().endswith(domain):
+                since = assigned_since.get(license_id)
+                if since is not None and since <= cutoff:
+                    owned.setdefault(inventory.teams[team_index][0], []).append(license_id)
+        return owned
+
+    def _revoke(self, license_ids: List[str], count: int) -> int:
+        revoked = 0
+        for license_id in license_ids[:max(count, 0)]:
+            if self.client.revoke_license(license_id).status_code == status_codes.OK:
+                revoked += 1
+        self.revoked += revoked
+        return revoked
+
+    def _rebalance(self, inventory: LicenseInventory, available: Dict[int, int], team_id: int, target: int):
+        """ Move spare available licenses from other watched teams, one batched call per donor """
+        for donor_id in self.watermarks:
+            shortfall = target - available[team_id]
+            if donor_id == team_id or shortfall <= 0:
+                continue
+            spare = available[donor_id] - self.watermarks[donor_id][1]
+            if spare <= 0:
+                continue
+            license_ids = self._spare_licenses(inventory, donor_id, min(spare, shortfall))
+            if not license_ids:
+                continue
+            try:
+                response = self.client.change_license_team(license_ids=license_ids, target_team_id=team_id)
+            finally:
+                if self.sync is not None:
+                    self.sync.snapshot.release(license_ids, self.owner)
+            if response.status_code == status_codes.OK:
+                available[donor_id] -= len(license_ids)
+                available[team_id] += len(license_ids)
+                self.moved += len(license_ids)
+
+    def _spare_licenses(self, inventory: LicenseInventory, donor_id: int, count: int) -> List[str]:
+        """
+        Up to `count` available licenses of the donor team. With a snapshot they are claimed under its
+        write lock first, so a license a test on another worker holds is never moved away under it.
+        """
+        if self.sync is not None:
+            return self.sync.snapshot.claim_available(count, team_id=donor_id, owner=self.owner)
+        return [
+            license_id
+            for license_id, status, team_index in zip(inventory.license_ids, inventory.statuses, inventory.team_indexes)
+            if license_id and status == AVAILABLE and inventory.teams[team_index][0] == donor_id
+        ][:count]
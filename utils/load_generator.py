@@ -0,0 +1,336 @@
+"""
+Open-loop load generator for the license endpoints
+
+Requests are started on a fixed arrival schedule regardless of how long earlier ones take, and
+latency is measured from each request's intended start time, so a slow server shows up as
+growing latency instead of silently lowering the offered load.
+
+Usage:
+    python -m utils.load_generator --base-url URL --rate 50 --duration 30 [--mix assign=1,change_team=1,get_licenses=2]
+    python -m utils.load_generator --standin --rate 200 --duration 10
+
+One target is required: --standin serves an in-memory license model over HTTP on localhost and
+targets it; --base-url targets any other server implementing the API (pass config.BASE_URL
+explicitly to load the real account). Only licenses of the TEAM_IDS teams are assigned or moved.
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Callable, Deque, Dict, List, Optional
+
+from config.api_config import config, status_codes
+from utils.api_client import LicenseAPIClient
+from utils.deadline import submit_in_context
+from utils.test_helpers import TestDataGenerator
+
+
+OPERATIONS = ("assign", "change_team", "get_licenses")
+DEFAULT_MIX = "assign=1,change_team=1,get_licenses=2"
+
+# Requests starting later than this after their intended time mean the generator itself is saturated
+LATE_START_THRESHOLD = 0.01
+
+
+class LatencyHistogram:
+    """
+    Thread-safe log-linear histogram in the HdrHistogram layout: values (in microseconds) are
+    bucketed by power of two, each power split into 2**(significant_bits - 1) linear sub-buckets,
+    so every recorded value is kept within 2**-(significant_bits - 1) relative error.
+    """
+
+    def __init__(self, significant_bits: int = 8):
+        self.significant_bits = significant_bits
+        self.sub_bucket_count = 1 << significant_bits
+        self.half_count = self.sub_bucket_count >> 1
+        self.counts: Counter = Counter()
+        self.total = 0
+        self.max_value = 0
+        self._lock = threading.Lock()
+
+    def _index(self, value: int) -> int:
+        if value < self.sub_bucket_count:
+            return value
+        shift = value.bit_length() - self.significant_bits
+        return self.sub_bucket_count + (shift - 1) * self.half_count + ((value >> shift) - self.half_count)
+
+    def _highest_equivalent(self, index: int) -> int:
+        if index < self.sub_bucket_count:
+            return index
+        shift, offset = divmod(index - self.sub_bucket_count, self.half_count)
+        shift += 1
+        return ((offset + self.half_count + 1) << shift) - 1
+
+    def record(self, seconds: float):
+        value = max(0, int(seconds * 1_000_000))
+        with self._lock:
+            self.counts[self._index(value)] += 1
+            self.total += 1
+            self.max_value = max(self.max_value, value)
+
+    def value_at_percentile(self, pct: float) -> float:
+        """ Latency in seconds at or below which pct percent of the recorded values fall """
+        with self._lock:
+            if not self.total:
+                return 0.0
+            target = max(1, int(self.total * pct / 100 + 0.5))
+            seen = 0
+            for index in sorted(self.counts):
+                seen += self.counts[index]
+                if seen >= target:
+                    return min(self._highest_equivalent(index), self.max_value) / 1_000_000
+            return self.max_value / 1_000_000
+
+
+class OperationStats:
+    """ Latency histogram and outcome counts of one operation """
+
+    def __init__(self):
+        self.histogram = LatencyHistogram()
+        self.outcomes: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def record(self, outcome: str, latency: float):
+        self.histogram.record(latency)
+        with self._lock:
+            self.outcomes[outcome] += 1
+
+    @property
+    def errors(self) -> int:
+        return sum(count for outcome, count in self.outcomes.items() if outcome != "OK")
+
+
+class LoadGenerator:
+    """ Drives a weighted mix of license operations at a fixed arrival rate """
+
+    def __init__(
+        self,
+        client: LicenseAPIClient,
+        mix: Dict[str, float],
+        rate: float,
+        duration: float,
+        max_workers: int = 32,
+        interval: float = 1.0,
+        output: Callable[[str], None] = print,
+        seed: Optional[int] = None
+    ):
+        unknown = set(mix) - set(OPERATIONS)
+        if unknown:
+            raise ValueError(f"Unknown operations {sorted(unknown)}, expected some of {OPERATIONS}")
+        if rate <= 0 or duration <= 0:
+            raise ValueError("rate and duration must be positive")
+        self.client = client
+        self.mix = mix
+        self.rate = rate
+        self.duration = duration
+        self.max_workers = max_workers
+        self.interval = interval
+        self.output = output
+        self.random = random.Random(seed)
+        self.data_generator = TestDataGenerator()
+        self.team_ids = list(config.TEAM_IDS.values())
+
+        self.operations: Dict[str, OperationStats] = {name: OperationStats() for name in mix}
+        self.sent = 0
+        self.late_starts = 0
+        self._interval_histogram = LatencyHistogram()
+        self._interval_counts: Counter = Counter()
+        self._interval_lock = threading.Lock()
+
+        self.available: Deque[str] = deque()
+        self.movable: List[str] = []
+
+    def prepare(self):
+        """
+        One inventory fetch provides the licenses assign and change_team work on. Only licenses of
+        the TEAM_IDS teams are used, so licenses of real users on other teams are never touched.
+        """
+        inventory = self.client.get_license_inventory()
+        for team_id in self.team_ids:
+            self.available.extend(inventory.available_ids(team_id))
+        team_ids = set(self.team_ids)
+        self.movable = [
+            license_id for license_id, team_index in zip(inventory.license_ids, inventory.team_indexes)
+            if license_id and inventory.teams[team_index][0] in team_ids
+        ]
+        if "assign" in self.mix and not self.available:
+            raise Exception("assign is in the mix but no TEAM_IDS licenses are available to assign")
+        if "change_team" in self.mix and not self.movable:
+            raise Exception("change_team is in the mix but the TEAM_IDS teams have no licenses")
+
+    def run(self) -> float:
+        """ Send requests for `duration` seconds; returns the elapsed wall time including the drain """
+        self.prepare()
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        stop_reporting = threading.Event()
+        start = time.perf_counter()
+        reporter = threading.Thread(target=self._report_intervals, args=(start, stop_reporting), daemon=True)
+        reporter.start()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="load") as executor:
+            for index in range(int(self.rate * self.duration)):
+                intended = start + index / self.rate
+                delay = intended - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                name = self.random.choices(names, weights)[0]
+                arguments = self._arguments(name)
+                submit_in_context(executor, self._execute, name, arguments, intended)
+                self.sent += 1
+
+        stop_reporting.set()
+        reporter.join()
+        return time.perf_counter() - start
+
+    def _arguments(self, name: str) -> Dict:
+        # Faker is not shared across threads; request data is generated on the scheduling thread
+        if name == "assign":
+            return {"user": self.data_generator.generate_user_data()}
+        if name == "change_team":
+            return {"license_id": self.random.choice(self.movable), "target_team_id": self.random.choice(self.team_ids)}
+        return {}
+
+    def _execute(self, name: str, arguments: Dict, intended: float):
+        started = time.perf_counter()
+        if started - intended > LATE_START_THRESHOLD:
+            with self._interval_lock:
+                self.late_starts += 1
+
+        license_id = None
+        try:
+            if name == "assign":
+                license_id = self.available.popleft() if self.available else None
+                if license_id is None:
+                    outcome = "NO_AVAILABLE_LICENSE"
+                else:
+                    user = arguments["user"]
+                    response = self.client.assign_license(
+                        email=user["email"], first_name=user["firstName"], last_name=user["lastName"],
+                        license_id=license_id
+                    )
+                    outcome = _outcome(response)
+            elif name == "change_team":
+                outcome = _outcome(self.client.change_license_team(
+                    license_ids=[arguments["license_id"]], target_team_id=arguments["target_team_id"]
+                ))
+            else:
+                outcome = _outcome(self.client.get_licenses())
+        except Exception as e:
+            outcome = type(e).__name__
+        latency = time.perf_counter() - intended
+
+        self.operations[name].record(outcome, latency)
+        self._interval_histogram.record(latency)
+        with self._interval_lock:
+            self._interval_counts["done"] += 1
+            if outcome != "OK":
+                self._interval_counts["errors"] += 1
+
+        if license_id is not None:
+            # Recycle the license outside the measured latency so sustained runs do not drain the pool
+            if outcome == "OK":
+                try:
+                    self.client.revoke_license(license_id)
+                except Exception:
+                    return
+            self.available.append(license_id)
+
+    def _report_intervals(self, start: float, stop: threading.Event):
+        self.output(f"{'time':>6}{'done':>8}{'req/s':>9}{'errors':>8}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}")
+        tick = 0
+        while not stop.wait(max(0.0, start + (tick + 1) * self.interval - time.perf_counter())):
+            tick += 1
+            self._emit_interval(tick * self.interval, self.interval)
+        elapsed = time.perf_counter() - start
+        self._emit_interval(elapsed, elapsed - tick * self.interval)
+
+    def _emit_interval(self, elapsed: float, length: float):
+        with self._interval_lock:
+            histogram, self._interval_histogram = self._interval_histogram, LatencyHistogram()
+            counts, self._interval_counts = self._interval_counts, Counter()
+        if not histogram.total:
+            return
+        self.output(
+            f"{elapsed:>5.0f}s{counts['done']:>8}{counts['done'] / max(length, 1e-9):>9.1f}{counts['errors']:>8}"
+            + "".join(f"{histogram.value_at_percentile(pct) * 1000:>8.1f}ms" for pct in (50, 90, 99, 100))
+        )
+
+    def summary(self, elapsed: float) -> str:
+        completed = sum(stats.histogram.total for stats in self.operations.values())
+        lines = [
+            f"\nTarget {self.rate:.1f} req/s for {self.duration:.0f}s: sent {self.sent}, completed {completed} "
+            f"in {elapsed:.1f}s ({completed / elapsed:.1f} req/s), late starts {self.late_starts}",
+            f"{'operation':<14}{'count':>7}{'errors':>8}" + "".join(f"{label:>10}" for label in ("p50", "p90", "p99", "p99.9", "max")),
+        ]
+        for name, stats in self.operations.items():
+            lines.append(
+                f"{name:<14}{stats.histogram.total:>7}{stats.errors:>8}"
+                + "".join(f"{stats.histogram.value_at_percentile(pct) * 1000:>8.1f}ms" for pct in (50, 90, 99, 99.9, 100))
+            )
+        outcomes = Counter()
+        for name, stats in self.operations.items():
+            outcomes.update({f"{name} {outcome}": count for outcome, count in stats.outcomes.items() if outcome != "OK"})
+        if outcomes:
+            lines.append("Errors:")
+            lines.extend(f"  {count:>6}  {outcome}" for outcome, count in outcomes.most_common())
+        return "\n".join(lines)
+
+
+def _outcome(response) -> str:
+    """ "OK" for 200, otherwise the status code plus the API error code if the body has one """
+    if response.status_code == status_codes.OK:
+        return "OK"
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    code = body.get("code") if isinstance(body, dict) else None
+    return f"{response.status_code} {code}" if code else str(response.status_code)
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight) if weight else 1.0
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m utils.load_generator", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rate", type=float, default=10, help="Target arrival rate in requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds to keep sending")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Weighted operation mix (default: {DEFAULT_MIX})")
+    parser.add_argument("--workers", type=int, default=32, help="Maximum requests in flight")
+    parser.add_argument("--interval", type=float, default=1.0, help="Seconds between progress lines")
+    parser.add_argument("--seed", type=int, help="Seed for the operation mix")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--base-url", help="API base URL to send load to")
+    target.add_argument("--standin", action="store_true", help="Serve an in-memory license model on localhost and target it")
+    args = parser.parse_args(argv)
+
+    if args.standin:
+        from utils.inmemory_transport import LicenseModel, standin_server
+        target_api = standin_server(model=LicenseModel(licenses_per_team=200, assigned_per_team=20))
+    else:
+        target_api = nullcontext(args.base_url)
+
+    with target_api as base_url:
+        if args.standin:
+            print(f"Stand-in server listening on {base_url}")
+        client = LicenseAPIClient(thread_safe=True, base_url=base_url)
+        client.warm_up()
+        generator = LoadGenerator(client, args.mix, args.rate, args.duration, args.workers, args.interval, seed=args.seed)
+        elapsed = generator.run()
+        print(generator.summary(elapsed))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,307 @@
+"""
+Multi-tenant fan-out across customer codes and API keys
+
+A MultiTenantExecutor holds one thread-safe client per tenant (customer code and API key) and runs
+inventory queries and bulk operations for all tenants concurrently. Every tenant has its own
+token-bucket request budget and a cap on in-flight operations, so a slow or tightly limited
+organization never holds up the others. Results come back tagged with their tenant.
+
+Tenants are read from a JSON file (APIConfig.TENANTS_FILE), where "api_key_env" names the
+environment variable holding the key and "api_key" may hold the key itself:
+    [{"customer_code": "ABC123", "api_key_env": "JETBRAINS_API_KEY_ACME", "name": "Acme"}, ...]
+
+Usage:
+    python -m utils.multi_tenant [--tenants tenants.json] [--team-id 2573297] [--output reports/licenses.ndjson]
+    python -m utils.multi_tenant --standin 5 [--rate 20]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar
+
+from config.api_config import config
+from utils.api_client import LicenseAPIClient
+from utils.deadline import submit_in_context
+from utils.inventory_snapshot import inventory_rows
+from utils.license_models import ASSIGNED, AVAILABLE, LicenseInventory
+
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+STATUS_NAMES = {AVAILABLE: "available", ASSIGNED: "assigned"}
+
+
+class TenantCredentials:
+    """ Customer code and API key of one organization; the key never appears in repr() """
+
+    __slots__ = ("customer_code", "api_key", "name")
+
+    def __init__(self, customer_code: str, api_key: str, name: Optional[str] = None):
+        if not customer_code or not api_key:
+            raise ValueError(f"Tenant {name or customer_code!r} needs both a customer code and an API key")
+        self.customer_code = customer_code
+        self.api_key = api_key
+        self.name = name or customer_code
+
+    def __repr__(self) -> str:
+        return f"TenantCredentials(customer_code={self.customer_code!r}, name={self.name!r})"
+
+
+def load_tenants(path: Path) -> List[TenantCredentials]:
+    """ Read tenant credentials from a JSON list, resolving "api_key_env" from the environment """
+    with open(path, encoding="utf-8") as tenants_file:
+        entries = json.load(tenants_file)
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"{path} must contain a non-empty JSON list of tenants")
+    return [
+        TenantCredentials(
+            customer_code=entry.get("customer_code", ""),
+            api_key=entry.get("api_key") or os.getenv(entry.get("api_key_env", ""), ""),
+            name=entry.get("name")
+        )
+        for entry in entries
+    ]
+
+
+class RateLimiter:
+    """ Token bucket allowing `rate` requests per second on average and bursts of up to `burst` """
+
+    def __init__(self, rate: float, burst: int):
+        if rate <= 0 or burst < 1:
+            raise ValueError(f"Invalid rate limit: rate={rate}, burst={burst}")
+        self.rate = rate
+        self.burst = burst
+        self.waited = 0.0
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """ Take one token, sleeping until one is available """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+                self.waited += delay
+            time.sleep(delay)
+
+
+class RateLimitedClient(LicenseAPIClient):
+    """
+    LicenseAPIClient taking a token from its tenant's bucket before every call (hedged copies
+    included). Retries made inside urllib3 are not charged, as they already back off on 429.
+    """
+
+    def __init__(self, rate_limiter: RateLimiter, **kwargs):
+        super().__init__(**kwargs)
+        self.rate_limiter = rate_limiter
+
+    def _make_request(self, *args, **kwargs):
+        self.rate_limiter.acquire()
+        return super()._make_request(*args, **kwargs)
+
+
+class TenantResult:
+    """ Outcome of one operation for one tenant: its return value or the exception it raised """
+
+    __slots__ = ("tenant", "item", "value", "error", "elapsed")
+
+    def __init__(self, tenant: TenantCredentials, item: Any, value: Any, error: Optional[Exception], elapsed: float):
+        self.tenant = tenant
+        self.item = item
+        self.value = value
+        self.error = error
+        self.elapsed = elapsed
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def __repr__(self) -> str:
+        outcome = "ok" if self.ok else f"error={self.error!r}"
+        return f"TenantResult(tenant={self.tenant.customer_code!r}, item={self.item!r}, {outcome})"
+
+
+class MultiTenantExecutor:
+    """ Runs operations for many tenants at once, each within its own request budget """
+
+    def __init__(
+        self,
+        tenants: Iterable[TenantCredentials],
+        rate_limit: float = config.TENANT_RATE_LIMIT,
+        burst: int = config.TENANT_BURST,
+        tenant_concurrency: int = config.TENANT_CONCURRENCY,
+        max_workers: int = 32,
+        base_url: Optional[str] = None
+    ):
+        self.tenants = list(tenants)
+        customer_codes = [tenant.customer_code for tenant in self.tenants]
+        duplicates = sorted({code for code in customer_codes if customer_codes.count(code) > 1})
+        if duplicates:
+            raise ValueError(f"Duplicate tenant customer codes: {duplicates}")
+        if tenant_concurrency < 1 or max_workers < 1:
+            raise ValueError(f"Invalid concurrency: tenant_concurrency={tenant_concurrency}, max_workers={max_workers}")
+        self.tenant_concurrency = tenant_concurrency
+        self.max_workers = max_workers
+        self.clients: Dict[str, RateLimitedClient] = {
+            tenant.customer_code: RateLimitedClient(
+                RateLimiter(rate_limit, burst),
+                api_key=tenant.api_key,
+                customer_code=tenant.customer_code,
+                thread_safe=True,
+                base_url=base_url
+            )
+            for tenant in self.tenants
+        }
+
+    def __enter__(self) -> "MultiTenantExecutor":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        for client in self.clients.values():
+            client.close()
+
+    def run(self, operation: Callable[[LicenseAPIClient], R]) -> List[TenantResult]:
+        """ Call operation(client) once per tenant """
+        return self.map(lambda client, _: operation(client), {tenant.customer_code: [None] for tenant in self.tenants})
+
+    def inventories(self, team_id: Optional[str] = None, assigned: Optional[bool] = None) -> List[TenantResult]:
+        """ Every tenant's license inventory (organization-wide or for one team) as LicenseInventory values """
+        return self.run(lambda client: client.get_license_inventory(team_id=team_id, assigned=assigned))
+
+    def map(self, operation: Callable[[LicenseAPIClient, T], R], items: Dict[str, Iterable[T]]) -> List[TenantResult]:
+        """
+        Call operation(client, item) for every item of every tenant, keyed by customer code.
+        Tenants are served round-robin, each with at most tenant_concurrency operations in flight;
+        item iterables are consumed lazily. Results are ordered by tenant, then by item.
+        """
+        tenants = {tenant.customer_code: (index, tenant) for index, tenant in enumerate(self.tenants)}
+        unknown = sorted(set(items) - set(tenants))
+        if unknown:
+            raise ValueError(f"Unknown tenant customer codes: {unknown}")
+
+        pending: Dict[str, Iterator[Tuple[int, T]]] = {code: enumerate(tenant_items) for code, tenant_items in items.items()}
+        active = {code: 0 for code in pending}
+        in_flight: Dict[Future, Tuple[str, Tuple[int, int]]] = {}
+        results: List[Tuple[Tuple[int, int], TenantResult]] = []
+        workers = max(1, min(self.max_workers, len(pending) * self.tenant_concurrency))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="tenant") as executor:
+            while pending or in_flight:
+                for code in list(pending):
+                    while active[code] < self.tenant_concurrency and len(in_flight) < workers:
+                        entry = next(pending[code], None)
+                        if entry is None:
+                            del pending[code]
+                            break
+                        item_index, item = entry
+                        tenant_index, tenant = tenants[code]
+                        future = submit_in_context(executor, self._call, tenant, operation, item)
+                        in_flight[future] = (code, (tenant_index, item_index))
+                        active[code] += 1
+                if not in_flight:
+                    continue
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    code, order = in_flight.pop(future)
+                    active[code] -= 1
+                    results.append((order, future.result()))
+        results.sort(key=lambda entry: entry[0])
+        return [result for _, result in results]
+
+    def _call(self, tenant: TenantCredentials, operation: Callable[[LicenseAPIClient, T], R], item: T) -> TenantResult:
+        start = time.perf_counter()
+        try:
+            value, error = operation(self.clients[tenant.customer_code], item), None
+        except Exception as e:
+            value, error = None, e
+        return TenantResult(tenant, item, value, error, time.perf_counter() - start)
+
+
+def tagged_licenses(results: Iterable[TenantResult]) -> Iterator[Dict[str, Any]]:
+    """ Merge inventory results into one stream of license rows tagged with their tenant """
+    for result in results:
+        if not result.ok:
+            continue
+        for license_id, team_id, product_code, status, assignee_email in inventory_rows(result.value):
+            yield {
+                "customer_code": result.tenant.customer_code,
+                "tenant": result.tenant.name,
+                "license_id": license_id,
+                "team_id": team_id,
+                "product_code": product_code,
+                "status": STATUS_NAMES.get(status, "unknown"),
+                "assignee_email": assignee_email,
+            }
+
+
+def format_inventory_summary(results: List[TenantResult], executor: MultiTenantExecutor) -> str:
+    lines = [f"{'tenant':<24}{'customer code':<18}{'licenses':>9}{'available':>10}{'assigned':>9}"
+             f"{'time':>8}{'throttled':>10}  error"]
+    for result in results:
+        inventory: Optional[LicenseInventory] = result.value
+        counts = (len(inventory), len(inventory.available_ids()), len(inventory.assigned_ids())) if inventory is not None else ("-",) * 3
+        waited = executor.clients[result.tenant.customer_code].rate_limiter.waited
+        error = "" if result.ok else f"{type(result.error).__name__}: {result.error}"
+        lines.append(f"{result.tenant.name[:23]:<24}{result.tenant.customer_code[:17]:<18}{counts[0]:>9}{counts[1]:>10}"
+                     f"{counts[2]:>9}{result.elapsed:7.2f}s{waited:9.2f}s  {error}")
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m utils.multi_tenant", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tenants", type=Path, default=Path(config.TENANTS_FILE) if config.TENANTS_FILE else None,
+                        help="JSON file with tenant credentials (default: JETBRAINS_TENANTS_FILE)")
+    parser.add_argument("--team-id", help="Only fetch licenses of this team ID")
+    parser.add_argument("--rate", type=float, default=config.TENANT_RATE_LIMIT, help="Requests per second per tenant")
+    parser.add_argument("--output", type=Path, help="Write the merged, tenant-tagged licenses as NDJSON")
+    parser.add_argument("--standin", type=int, metavar="N",
+                        help="Serve N synthetic tenants from a local in-memory stand-in instead of the API")
+    args = parser.parse_args(argv)
+
+    if args.standin:
+        from utils.inmemory_transport import register_tenant, standin_server
+        tenants = [TenantCredentials(f"standin-{index}", f"standin-key-{index}", f"Stand-in {index}")
+                   for index in range(1, args.standin + 1)]
+        for tenant in tenants:
+            register_tenant(tenant.customer_code, tenant.api_key)
+        target_api = standin_server()
+    elif args.tenants is not None:
+        tenants = load_tenants(args.tenants)
+        target_api = nullcontext(None)
+    else:
+        parser.error("--tenants (or JETBRAINS_TENANTS_FILE) is required unless --standin is given")
+
+    with target_api as base_url, MultiTenantExecutor(tenants, rate_limit=args.rate, base_url=base_url) as executor:
+        start = time.perf_counter()
+        results = executor.inventories(team_id=args.team_id)
+        elapsed = time.perf_counter() - start
+        print(format_inventory_summary(results, executor))
+
+    failed = sum(not result.ok for result in results)
+    print(f"\n{len(results)} tenant(s) in {elapsed:.2f}s, {failed} failed")
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as output:
+            for row in tagged_licenses(results):
+                output.write(json.dumps(row) + "\n")
+        print(f"Merged licenses written to {args.output}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,172 @@
+"""
+Opt-in per-test profiling with collapsed-stack (flamegraph) output
+
+Profile tests marked with @pytest.mark.profile, or every test with --profile. For each test
+three files are written to the profile directory (next to the HTML report by default):
+    <test>.prof       cProfile stats (pstats / snakeviz)
+    <test>.collapsed  sampled stacks in collapsed format (flamegraph.pl, speedscope)
+    <test>.txt        time in utils/api_client.py functions versus network and retry wait
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pytest
+
+
+PROFILE_DIR = "reports/profiles"
+SAMPLING_INTERVAL = 0.005
+
+API_CLIENT_FILE = os.path.join("utils", "api_client.py")
+
+# Built-in functions that block on the network or on retry backoff, matched against pstats names
+WAIT_FUNCTIONS = {
+    "network": re.compile(
+        r"'(recv|recv_into|send|sendall|connect|connect_ex|do_handshake|read|write)' of '(_socket\.socket|_ssl\._SSLSocket)'"
+        r"|getaddrinfo|select\.(select|poll)|'poll' of 'select\.poll'"
+    ),
+    "retry backoff": re.compile(r"time\.sleep"),
+}
+
+# Dependencies whose own time is reported separately
+PACKAGE_PATHS = {
+    "faker": f"{os.sep}faker{os.sep}",
+    "json decoding": f"{os.sep}json{os.sep}",
+}
+
+
+class StackSampler:
+    """ Samples the stack of one thread at a fixed interval and counts collapsed stacks """
+
+    def __init__(self, thread_id: int, interval: float = SAMPLING_INTERVAL):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({Path(code.co_filename).name}:{frame.f_lineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[";".join(reversed(stack))] += 1
+
+    def write_collapsed(self, path: Path):
+        with open(path, "w", encoding="utf-8") as collapsed_file:
+            for stack, count in self.samples.most_common():
+                collapsed_file.write(f"{stack} {count}\n")
+
+
+def summarize(stats: pstats.Stats) -> str:
+    """ Attribute profiled time to api_client functions, wait categories and heavy dependencies """
+    total = stats.total_tt
+    client_functions: List[Tuple[str, int, float, float]] = []
+    wait_totals: Dict[str, float] = {category: 0.0 for category in WAIT_FUNCTIONS}
+    package_totals: Dict[str, float] = {package: 0.0 for package in PACKAGE_PATHS}
+
+    for (filename, lineno, funcname), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+        if filename.endswith(API_CLIENT_FILE):
+            client_functions.append((funcname, ncalls, tottime, cumtime))
+        elif filename == "~":
+            for category, pattern in WAIT_FUNCTIONS.items():
+                if pattern.search(funcname):
+                    wait_totals[category] += tottime
+                    break
+        else:
+            for package, package_path in PACKAGE_PATHS.items():
+                if package_path in filename:
+                    package_totals[package] += tottime
+
+    lines = [f"Total profiled time: {total:.3f}s", "", "Wait time:"]
+    for category, seconds in wait_totals.items():
+        lines.append(f"  {category:<20} {seconds:8.3f}s  {seconds / total if total else 0:6.1%}")
+    lines.append("")
+    lines.append("Dependencies (own time):")
+    for package, seconds in package_totals.items():
+        lines.append(f"  {package:<20} {seconds:8.3f}s  {seconds / total if total else 0:6.1%}")
+    lines.append("")
+    lines.append("utils/api_client.py (cumulative includes wait):")
+    lines.append(f"  {'function':<32} {'calls':>6} {'own':>9} {'cumulative':>11}")
+    for funcname, ncalls, tottime, cumtime in sorted(client_functions, key=lambda entry: entry[3], reverse=True):
+        lines.append(f"  {funcname:<32} {ncalls:>6} {tottime:8.3f}s {cumtime:10.3f}s")
+
+    top = io.StringIO()
+    stats.stream = top
+    stats.sort_stats("cumulative").print_stats(25)
+    lines.extend(["", "Top functions by cumulative time:", top.getvalue()])
+    return "\n".join(lines)
+
+
+class ProfileRecorder:
+    """ Wraps selected tests (setup, call and teardown) in cProfile and a stack sampler """
+
+    def __init__(self, profile_dir: Path, profile_all: bool):
+        self.profile_dir = profile_dir
+        self.profile_all = profile_all
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item):
+        if not (self.profile_all or item.get_closest_marker("profile")):
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        sampler = StackSampler(threading.get_ident())
+        sampler.start()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            sampler.stop()
+            self._write(item.nodeid, profiler, sampler)
+
+    def _write(self, nodeid: str, profiler: cProfile.Profile, sampler: StackSampler):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        base_name = re.sub(r"[^\w.-]+", "_", nodeid).strip("_")
+        profiler.dump_stats(str(self.profile_dir / f"{base_name}.prof"))
+        sampler.write_collapsed(self.profile_dir / f"{base_name}.collapsed")
+        summary = summarize(pstats.Stats(profiler))
+        (self.profile_dir / f"{base_name}.txt").write_text(f"{nodeid}\n\n{summary}", encoding="utf-8")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("profiling")
+    group.addoption(
+        "--profile",
+        action="store_true",
+        default=False,
+        help="Profile every test, not only those marked with @pytest.mark.profile"
+    )
+    group.addoption(
+        "--profile-dir",
+        action="store",
+        default=PROFILE_DIR,
+        help=f"Directory for per-test profiles and collapsed stacks (default: {PROFILE_DIR})"
+    )
+
+
+def pytest_configure(config):
+    profile_dir = Path(config.getoption("profile_dir"))
+    if not profile_dir.is_absolute():
+        profile_dir = config.rootpath / profile_dir
+    config.pluginmanager.register(ProfileRecorder(profile_dir, config.getoption("profile")), "profile-recorder")
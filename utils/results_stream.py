@@ -0,0 +1,310 @@
+"""
+Streaming NDJSON test results with on-demand HTML/JSON reports
+
+Every finished test is appended to reports/results.ndjson as one JSON line (setup/call/teardown
+outcomes and durations, failure text and, for failed phases, the captured stdout/stderr/log
+sections), flushed as soon as its teardown
+report arrives. Under xdist only the controller writes, since it receives every worker's reports,
+so lines never interleave. A crashed or interrupted run keeps every line written so far.
+
+Usage:
+    python -m utils.results_stream html [--input reports/results.ndjson] [--output reports/pytest_report.html]
+    python -m utils.results_stream json [--input reports/results.ndjson] [--output reports/pytest_report.json]
+    python -m utils.results_stream summary
+"""
+import argparse
+import html
+import json
+import sys
+import time
+import uuid
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pytest
+
+
+RESULTS_STREAM_FILE = "reports/results.ndjson"
+HTML_REPORT_FILE = "reports/pytest_report.html"
+JSON_REPORT_FILE = "reports/pytest_report.json"
+
+PHASES = ("setup", "call", "teardown")
+
+# Display order of outcomes in summaries
+OUTCOMES = ("failed", "error", "passed", "skipped", "xfailed", "xpassed")
+
+
+def overall_outcome(record: Dict[str, Any]) -> str:
+    """ Overall outcome of a test from its phases, following pytest's terminal summary """
+    setup, call, teardown = (record.get(phase, {}) for phase in PHASES)
+    if setup.get("outcome") == "failed":
+        return "error"
+    if setup.get("outcome") == "skipped":
+        return "skipped"
+    outcome = call.get("outcome", "error")
+    if call.get("wasxfail") is not None:
+        outcome = "xfailed" if outcome == "skipped" else "xpassed"
+    if teardown.get("outcome") == "failed" and outcome in ("passed", "xfailed", "xpassed"):
+        return "error"
+    return outcome
+
+
+def phase_details(phase: str, result: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+    """ (title, text) pairs of a phase's failure text followed by its captured output sections """
+    if result.get("longrepr"):
+        yield phase, result["longrepr"]
+    for title, content in result.get("sections", []):
+        yield title, content
+
+
+class ResultsStreamWriter:
+    """ Appends one NDJSON line per finished test; runs in the controller (or the only process) """
+
+    def __init__(self, path: Path, markers: List[str]):
+        self.path = path
+        self.markers = set(markers)
+        self.run_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self._file = None
+        # Phases reported so far for tests whose teardown has not been reported yet
+        self._pending: Dict[str, Dict[str, Any]] = {}
+
+    def _write(self, record: Dict[str, Any]):
+        self._file.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+        # Flushed per line, so a crash loses at most the test in progress
+        self._file.flush()
+
+    def pytest_sessionstart(self, session):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._write({
+            "type": "session",
+            "run_id": self.run_id,
+            "started_at": self.started_at,
+            "root": str(session.config.rootpath),
+            "workers": getattr(session.config.option, "numprocesses", None),
+            "python": sys.version.split()[0],
+            "pytest": pytest.__version__,
+        })
+
+    def pytest_collectreport(self, report):
+        if report.failed and self._file is not None:
+            self._write({"type": "collect_error", "nodeid": report.nodeid, "longrepr": str(report.longrepr)})
+
+    def pytest_runtest_logreport(self, report):
+        if self._file is None:
+            return
+        record = self._pending.get(report.nodeid)
+        if record is None:
+            record = self._pending[report.nodeid] = {
+                "type": "test",
+                "nodeid": report.nodeid,
+                "lineno": report.location[1],
+                "markers": sorted(keyword for keyword in report.keywords if keyword in self.markers),
+                "worker": getattr(report, "worker_id", None),
+                "start": getattr(report, "start", None),
+            }
+        phase: Dict[str, Any] = {"outcome": report.outcome, "duration": round(report.duration, 6)}
+        if hasattr(report, "wasxfail"):
+            phase["wasxfail"] = report.wasxfail
+        if report.failed or (report.skipped and report.longrepr):
+            phase["longrepr"] = report.longreprtext
+        if report.failed and report.sections:
+            # longreprtext leaves out captured output; keep it as pytest's (title, content) sections
+            phase["sections"] = [[title, content] for title, content in report.sections]
+        record[report.when] = phase
+        record["stop"] = getattr(report, "stop", None)
+        if report.when == "teardown":
+            self._finish(self._pending.pop(report.nodeid))
+
+    def _finish(self, record: Dict[str, Any]):
+        record["outcome"] = overall_outcome(record)
+        record["duration"] = round(sum(record.get(phase, {}).get("duration", 0.0) for phase in PHASES), 6)
+        self._write(record)
+
+    def pytest_sessionfinish(self, session, exitstatus):
+        if self._file is None:
+            return
+        # Tests without a teardown report, e.g. when an xdist worker crashed mid-test
+        for record in self._pending.values():
+            self._finish(record)
+        self._pending.clear()
+        self._write({"type": "session_finish", "exitstatus": int(exitstatus), "duration": time.time() - self.started_at})
+        self._file.close()
+        self._file = None
+
+
+def read_records(path: Path) -> Iterator[Dict[str, Any]]:
+    """ Records of a results stream, skipping a partially written last line """
+    with open(path, encoding="utf-8") as stream:
+        for line in stream:
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+class RunSummary:
+    """ Counts and session metadata from one pass over a results stream """
+
+    def __init__(self, path: Path):
+        self.session: Dict[str, Any] = {}
+        self.finish: Optional[Dict[str, Any]] = None
+        self.outcomes: Counter = Counter()
+        self.collect_errors = 0
+        self.test_duration = 0.0
+        for record in read_records(path):
+            kind = record.get("type")
+            if kind == "test":
+                self.outcomes[record["outcome"]] += 1
+                self.test_duration += record.get("duration", 0.0)
+            elif kind == "collect_error":
+                self.collect_errors += 1
+            elif kind == "session":
+                self.session = record
+            elif kind == "session_finish":
+                self.finish = record
+
+    @property
+    def total(self) -> int:
+        return sum(self.outcomes.values())
+
+    @property
+    def complete(self) -> bool:
+        """ False when the run crashed or was killed before the session finished """
+        return self.finish is not None
+
+    @property
+    def duration(self) -> float:
+        return self.finish["duration"] if self.finish else self.test_duration
+
+    def format(self) -> str:
+        counts = ", ".join(f"{self.outcomes[outcome]} {outcome}" for outcome in OUTCOMES if self.outcomes[outcome])
+        status = f"exit status {self.finish['exitstatus']}" if self.finish else "incomplete run"
+        errors = f", {self.collect_errors} collection error(s)" if self.collect_errors else ""
+        return f"{self.total} test(s): {counts or 'none'}{errors} in {self.duration:.2f}s ({status})"
+
+
+def write_json_report(input_path: Path, output_path: Path):
+    """ pytest-json-report compatible summary and tests, written test by test """
+    summary = RunSummary(input_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as output:
+        header = {
+            "created": summary.session.get("started_at"),
+            "duration": summary.duration,
+            "exitcode": summary.finish["exitstatus"] if summary.finish else None,
+            "root": summary.session.get("root"),
+            "summary": {**{outcome: summary.outcomes[outcome] for outcome in OUTCOMES if summary.outcomes[outcome]},
+                        "total": summary.total, "collected": summary.total},
+        }
+        # The header object is left open so tests can be appended one at a time
+        output.write(json.dumps(header)[:-1] + ', "tests": [')
+        first = True
+        for record in read_records(input_path):
+            if record.get("type") != "test":
+                continue
+            test = {"nodeid": record["nodeid"], "lineno": record.get("lineno"), "keywords": record.get("markers", []),
+                    "outcome": record["outcome"]}
+            for phase in PHASES:
+                if phase in record:
+                    test[phase] = record[phase]
+            output.write(("\n" if first else ",\n") + json.dumps(test))
+            first = False
+        output.write("\n]}\n")
+
+
+HTML_HEAD = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title><style>
+body {{ font-family: sans-serif; margin: 2em; }}
+table {{ border-collapse: collapse; width: 100%; }}
+th, td {{ border: 1px solid #ddd; padding: 4px 8px; text-align: left; vertical-align: top; }}
+pre {{ white-space: pre-wrap; margin: 0; font-size: 12px; }}
+.passed {{ color: #2e7d32; }} .failed, .error {{ color: #c62828; }} .skipped, .xfailed, .xpassed {{ color: #ef6c00; }}
+</style></head><body>
+<h1>{title}</h1>
+<p>{summary}</p>
+<table><tr><th>Result</th><th>Test</th><th>Markers</th><th>Worker</th><th>Duration (s)</th></tr>
+"""
+
+
+def write_html_report(input_path: Path, output_path: Path):
+    """ Self-contained HTML report, written row by row so memory stays flat for large runs """
+    summary = RunSummary(input_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w", encoding="utf-8") as output:
+        output.write(HTML_HEAD.format(title=html.escape(output_path.name), summary=html.escape(summary.format())))
+        for record in read_records(input_path):
+            if record.get("type") == "collect_error":
+                output.write(f'<tr><td class="error">collection error</td><td colspan="4">{html.escape(record["nodeid"])}'
+                             f'<details><summary>details</summary><pre>{html.escape(record["longrepr"])}</pre></details></td></tr>\n')
+                continue
+            if record.get("type") != "test":
+                continue
+            outcome = record["outcome"]
+            details = "".join(
+                f"<details><summary>{html.escape(title)}</summary><pre>{html.escape(text)}</pre></details>"
+                for phase in PHASES for title, text in phase_details(phase, record.get(phase, {}))
+            )
+            output.write(
+                f'<tr><td class="{outcome}">{outcome}</td><td>{html.escape(record["nodeid"])}{details}</td>'
+                f'<td>{html.escape(", ".join(record.get("markers", [])))}</td><td>{record.get("worker") or ""}</td>'
+                f'<td>{record.get("duration", 0.0):.3f}</td></tr>\n'
+            )
+        output.write("</table></body></html>\n")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("results-stream")
+    group.addoption(
+        "--results-stream",
+        action="store",
+        default=RESULTS_STREAM_FILE,
+        help=f"NDJSON file receiving one line per finished test (default: {RESULTS_STREAM_FILE})"
+    )
+    group.addoption(
+        "--no-results-stream",
+        action="store_true",
+        default=False,
+        help="Do not write the NDJSON results stream"
+    )
+
+
+def pytest_configure(config):
+    # Workers forward their reports to the controller, which is the only writer
+    if hasattr(config, "workerinput") or config.getoption("no_results_stream"):
+        return
+    stream_path = Path(config.getoption("results_stream"))
+    if not stream_path.is_absolute():
+        stream_path = config.rootpath / stream_path
+    markers = [line.split(":", 1)[0].split("(", 1)[0].strip() for line in config.getini("markers")]
+    config.pluginmanager.register(ResultsStreamWriter(stream_path, markers), "results-stream")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m utils.results_stream", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("command", choices=["html", "json", "summary"], help="Report to generate")
+    parser.add_argument("--input", type=Path, default=Path(RESULTS_STREAM_FILE), help="Results stream to read")
+    parser.add_argument("--output", type=Path, help=f"Report file (default: {HTML_REPORT_FILE} or {JSON_REPORT_FILE})")
+    args = parser.parse_args(argv)
+
+    if not args.input.exists():
+        print(f"No results stream at {args.input}")
+        return 1
+    summary = RunSummary(args.input)
+    if args.command == "html":
+        output = args.output or Path(HTML_REPORT_FILE)
+        write_html_report(args.input, output)
+        print(f"HTML report written to {output}")
+    elif args.command == "json":
+        output = args.output or Path(JSON_REPORT_FILE)
+        write_json_report(args.input, output)
+        print(f"JSON report written to {output}")
+    print(summary.format())
+    failed = summary.outcomes["failed"] or summary.outcomes["error"] or summary.collect_errors
+    return 0 if summary.complete and not failed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
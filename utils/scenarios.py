@@ -0,0 +1,333 @@
+"""
+Concurrent scenario engine for multi-step license workflows
+
+A scenario is a set of steps with dependencies; many independent instances run concurrently,
+and within an instance a step starts as soon as the steps it depends on have passed. The
+report gives per-step latency percentiles and failure rates.
+
+Usage:
+    python -m utils.scenarios [--instances 20] [--workers 8] [--team-id 2573297] [--target-team-id 2717496]
+"""
+import argparse
+import sys
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from config.api_config import config, status_codes
+from utils.api_client import LicenseAPIClient
+from utils.deadline import submit_in_context
+from utils.latency import percentile
+from utils.test_helpers import TestDataGenerator
+
+
+PENDING = "pending"
+RUNNING = "running"
+PASSED = "passed"
+FAILED = "failed"
+SKIPPED = "skipped"
+
+
+class StepSkipped(Exception):
+    """ Raised by a step action that has nothing to do for this instance """
+
+
+class Step:
+    """
+    One unit of work in a scenario. `action(context)` gets the instance context (which holds
+    the results of passed steps under their names) and its return value is stored under `name`.
+    A step runs once all `depends_on` steps passed; with `always_run` it runs once they have
+    finished whatever the outcome, which suits cleanup steps.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        action: Callable[[Dict[str, Any]], Any],
+        depends_on: Sequence[str] = (),
+        always_run: bool = False
+    ):
+        self.name = name
+        self.action = action
+        self.depends_on = tuple(depends_on)
+        self.always_run = always_run
+
+
+class Scenario:
+    """ Named set of steps forming a dependency DAG """
+
+    def __init__(self, name: str, steps: Iterable[Step], setup: Optional[Callable[[int], Dict[str, Any]]] = None):
+        self.name = name
+        self.steps = list(steps)
+        # Builds the initial context of instance N; runs on the scheduling thread
+        self.setup = setup
+        self._validate()
+
+    def _validate(self):
+        names = [step.name for step in self.steps]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Duplicate step names in scenario {self.name}: {names}")
+        for step in self.steps:
+            unknown = set(step.depends_on) - set(names)
+            if unknown:
+                raise ValueError(f"Step {step.name} depends on unknown steps: {sorted(unknown)}")
+
+        # Kahn's algorithm: every step must become reachable once its dependencies are resolved
+        resolved = set()
+        remaining = list(self.steps)
+        while remaining:
+            ready = [step for step in remaining if set(step.depends_on) <= resolved]
+            if not ready:
+                raise ValueError(f"Dependency cycle in scenario {self.name}: {[step.name for step in remaining]}")
+            resolved.update(step.name for step in ready)
+            remaining = [step for step in remaining if step.name not in resolved]
+
+
+class StepStats:
+    """ Outcome counts, latencies and error messages of one step across all instances """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies: List[float] = []
+        self.outcomes: Counter = Counter()
+        self.errors: Counter = Counter()
+
+    @property
+    def runs(self) -> int:
+        return self.outcomes[PASSED] + self.outcomes[FAILED]
+
+    @property
+    def failure_rate(self) -> float:
+        return self.outcomes[FAILED] / self.runs if self.runs else 0.0
+
+    def latency(self, pct: float) -> Optional[float]:
+        return percentile(self.latencies, pct) if self.latencies else None
+
+
+class ScenarioReport:
+    """ Aggregated results of a scenario run """
+
+    def __init__(self, scenario: Scenario, instances: int):
+        self.scenario = scenario
+        self.instances = instances
+        self.steps: Dict[str, StepStats] = {step.name: StepStats(step.name) for step in scenario.steps}
+        self.completed = 0
+        self.elapsed = 0.0
+
+    @property
+    def failures(self) -> int:
+        return sum(stats.outcomes[FAILED] for stats in self.steps.values())
+
+    def format(self) -> str:
+        lines = [
+            f"Scenario {self.scenario.name}: {self.completed}/{self.instances} instances passed "
+            f"in {self.elapsed:.2f}s",
+            f"{'step':<16}{'runs':>6}{'failed':>8}{'skipped':>9}{'fail %':>8}{'p50':>9}{'p95':>9}{'p99':>9}",
+        ]
+        for stats in self.steps.values():
+            latencies = "".join(
+                f"{value * 1000:>7.1f}ms" if value is not None else f"{'-':>9}"
+                for value in (stats.latency(50), stats.latency(95), stats.latency(99))
+            )
+            lines.append(f"{stats.name:<16}{stats.runs:>6}{stats.outcomes[FAILED]:>8}{stats.outcomes[SKIPPED]:>9}"
+                         f"{stats.failure_rate:>8.1%}{latencies}")
+            for message, count in stats.errors.most_common(3):
+                lines.append(f"    {count}x {message}")
+        return "\n".join(lines)
+
+
+class _Instance:
+    def __init__(self, index: int, scenario: Scenario):
+        self.index = index
+        self.context: Dict[str, Any] = {"instance": index}
+        if scenario.setup is not None:
+            self.context.update(scenario.setup(index))
+        self.states: Dict[str, str] = {step.name: PENDING for step in scenario.steps}
+
+    @property
+    def finished(self) -> bool:
+        return all(state not in (PENDING, RUNNING) for state in self.states.values())
+
+
+class ScenarioRunner:
+    """ Runs many scenario instances concurrently on a shared thread pool """
+
+    def __init__(self, max_workers: int = 8, max_active_instances: Optional[int] = None):
+        self.max_workers = max_workers
+        # Bounding active instances keeps setup (e.g. license reservation) close to use
+        self.max_active_instances = max_active_instances or max_workers * 2
+
+    def run(self, scenario: Scenario, instances: int) -> ScenarioReport:
+        report = ScenarioReport(scenario, instances)
+        steps = {step.name: step for step in scenario.steps}
+        pending_indexes = iter(range(instances))
+        active: List[_Instance] = []
+        in_flight: Dict[Future, Tuple[_Instance, Step]] = {}
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="scenario") as executor:
+            while True:
+                while len(active) < self.max_active_instances:
+                    index = next(pending_indexes, None)
+                    if index is None:
+                        break
+                    active.append(_Instance(index, scenario))
+
+                for instance in active:
+                    for step in self._ready_steps(instance, steps, report):
+                        instance.states[step.name] = RUNNING
+                        future = submit_in_context(executor, self._run_step, step, instance.context)
+                        in_flight[future] = (instance, step)
+
+                for instance in [instance for instance in active if instance.finished]:
+                    active.remove(instance)
+                    if all(state == PASSED for state in instance.states.values()):
+                        report.completed += 1
+
+                if not in_flight:
+                    if not active:
+                        break
+                    continue
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    instance, step = in_flight.pop(future)
+                    outcome, elapsed, result = future.result()
+                    instance.states[step.name] = outcome
+                    stats = report.steps[step.name]
+                    stats.outcomes[outcome] += 1
+                    if outcome == PASSED:
+                        instance.context[step.name] = result
+                        stats.latencies.append(elapsed)
+                    elif outcome == FAILED:
+                        stats.latencies.append(elapsed)
+                        stats.errors[result] += 1
+
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    @staticmethod
+    def _ready_steps(instance: _Instance, steps: Dict[str, Step], report: ScenarioReport) -> List[Step]:
+        """ Steps whose dependencies are resolved; steps blocked by a failed dependency are skipped """
+        ready = []
+        changed = True
+        while changed:
+            changed = False
+            for name, state in instance.states.items():
+                if state != PENDING:
+                    continue
+                step = steps[name]
+                dependency_states = [instance.states[dependency] for dependency in step.depends_on]
+                if any(state in (PENDING, RUNNING) for state in dependency_states):
+                    continue
+                if step.always_run or all(state == PASSED for state in dependency_states):
+                    if step not in ready:
+                        ready.append(step)
+                else:
+                    instance.states[name] = SKIPPED
+                    report.steps[name].outcomes[SKIPPED] += 1
+                    changed = True
+        return ready
+
+    @staticmethod
+    def _run_step(step: Step, context: Dict[str, Any]) -> Tuple[str, float, Any]:
+        start = time.perf_counter()
+        try:
+            result = step.action(context)
+        except StepSkipped:
+            return SKIPPED, time.perf_counter() - start, None
+        except Exception as e:
+            return FAILED, time.perf_counter() - start, f"{type(e).__name__}: {e}"
+        return PASSED, time.perf_counter() - start, result
+
+
+def _expect_ok(response, action: str):
+    if response.status_code != status_codes.OK:
+        raise Exception(f"{action} returned {response.status_code} - {response.text[:200]}")
+
+
+def license_lifecycle_scenario(
+    client: LicenseAPIClient,
+    license_ids: Iterable[str],
+    team_id: int,
+    target_team_id: int
+) -> Scenario:
+    """
+    assign -> verify (license listed as assigned in its team) -> move to target team -> revoke
+    -> move back. Each instance takes its own license from `license_ids`; revoke runs whenever
+    assign passed and the move back whenever the move passed, so failed instances leave no
+    license assigned or in the target team.
+    """
+    pool: Deque[str] = deque(license_ids)
+    data_generator = TestDataGenerator()
+    lock = threading.Lock()
+
+    def setup(index: int) -> Dict[str, Any]:
+        with lock:
+            license_id = pool.popleft() if pool else None
+        return {"license_id": license_id, "user": data_generator.generate_user_data()}
+
+    def assign(context: Dict[str, Any]) -> str:
+        if context["license_id"] is None:
+            raise Exception("no available licenses left")
+        user = context["user"]
+        response = client.assign_license(
+            email=user["email"],
+            first_name=user["firstName"],
+            last_name=user["lastName"],
+            license_id=context["license_id"]
+        )
+        _expect_ok(response, "assign")
+        return context["license_id"]
+
+    def verify(context: Dict[str, Any]):
+        if context["assign"] not in client.get_team_assigned_licenses(team_id=str(team_id)):
+            raise Exception(f"license {context['assign']} not listed as assigned in team {team_id}")
+
+    def move(context: Dict[str, Any]):
+        _expect_ok(client.change_license_team(license_ids=[context["assign"]], target_team_id=target_team_id), "move")
+
+    def revoke(context: Dict[str, Any]):
+        if "assign" not in context:
+            raise StepSkipped()
+        _expect_ok(client.revoke_license(context["assign"]), "revoke")
+
+    def restore(context: Dict[str, Any]):
+        if "move" not in context:
+            raise StepSkipped()
+        _expect_ok(client.change_license_team(license_ids=[context["assign"]], target_team_id=team_id), "move back")
+
+    return Scenario(
+        "license_lifecycle",
+        [
+            Step("assign", assign),
+            Step("verify", verify, depends_on=["assign"]),
+            Step("move", move, depends_on=["verify"]),
+            Step("revoke", revoke, depends_on=["move"], always_run=True),
+            Step("restore", restore, depends_on=["revoke"], always_run=True),
+        ],
+        setup=setup
+    )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    team_ids = list(config.TEAM_IDS.values())
+    parser = argparse.ArgumentParser(prog="python -m utils.scenarios", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--instances", type=int, default=20, help="Workflow instances to run")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent steps")
+    parser.add_argument("--team-id", type=int, default=team_ids[0], help="Team the licenses are taken from")
+    parser.add_argument("--target-team-id", type=int, default=team_ids[-1], help="Team the licenses are moved to")
+    args = parser.parse_args(argv)
+
+    client = LicenseAPIClient(thread_safe=True)
+    license_ids = client.get_team_available_licenses(team_id=str(args.team_id))[:args.instances]
+    scenario = license_lifecycle_scenario(client, license_ids, args.team_id, args.target_team_id)
+    report = ScenarioRunner(max_workers=args.workers).run(scenario, args.instances)
+    print(report.format())
+    return 1 if report.failures or report.completed < args.instances else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,371 @@
+"""
+Soak test for long-lived clients: memory, file descriptor and connection pool growth
+
+One thread-safe LicenseAPIClient is driven by several worker threads through a long mix of
+calls (license lists, assign + revoke, team moves and back, rejected requests) against a local
+stand-in. Process RSS, open file descriptors, connections opened by the pools (checked out ones
+included) and idle, live per-thread sessions and tracemalloc's traced memory are sampled at a
+fixed interval. After a warm-up, the median of the first samples is compared with the median of
+the last ones; growth beyond the thresholds, more connections than pool slots or growing sessions
+fail the run, and tracemalloc's top allocators since the warm-up point at the source. Finally the client is closed and its sockets
+must be released.
+
+Usage:
+    python -m utils.soak --calls 1000000 [--workers 8] [--interval 10]
+    python -m utils.soak --duration 600 --no-tracemalloc --max-rss-growth 16
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from config.api_config import config, status_codes
+from utils.api_client import LicenseAPIClient
+from utils.inmemory_transport import LicenseModel, serve_license_model
+from utils.load_generator import parse_mix
+
+
+DEFAULT_MIX = "get_licenses=1,get_team_licenses=2,assign_revoke=3,change_team=2,rejected=2"
+
+# Samples at each end whose median is compared, so one noisy sample cannot fail the run
+COMPARED_SAMPLES = 3
+TOP_ALLOCATORS = 10
+
+
+def rss_bytes() -> Optional[int]:
+    """ Current resident set size; None where /proc is not available """
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def open_fds() -> Optional[int]:
+    for fd_dir in ("/proc/self/fd", "/dev/fd"):
+        try:
+            return len(os.listdir(fd_dir))
+        except OSError:
+            continue
+    return None
+
+
+def pool_stats(client: LicenseAPIClient) -> Tuple[int, int, int]:
+    """
+    (connection pools, connections opened by them, idle pooled connections) across the client's
+    HTTP adapters. With keep-alive the opened count is the live one, checked-out connections included;
+    it keeps growing when connections are churned instead of reused.
+    """
+    pools = connections = idle = 0
+    for adapter in {id(adapter): adapter for adapter in client.session.adapters.values()}.values():
+        pool_manager = getattr(adapter, "poolmanager", None)
+        if pool_manager is None:
+            continue
+        for key in pool_manager.pools.keys():
+            pool = pool_manager.pools.get(key)
+            if pool is None:
+                continue
+            pools += 1
+            connections += pool.num_connections
+            # The pool queue is padded with None up to maxsize; only real entries are idle connections
+            idle += sum(1 for connection in list(pool.pool.queue) if connection is not None) if pool.pool else 0
+    return pools, connections, idle
+
+
+class Sample:
+    __slots__ = ("elapsed", "calls", "rss", "fds", "pools", "connections", "idle", "sessions", "traced")
+
+    def __init__(self, elapsed: float, calls: int, client: LicenseAPIClient):
+        self.elapsed = elapsed
+        self.calls = calls
+        self.rss = rss_bytes()
+        self.fds = open_fds()
+        self.pools, self.connections, self.idle = pool_stats(client)
+        self.sessions = client.live_thread_sessions
+        self.traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else None
+
+    def format(self) -> str:
+        rss = f"{self.rss / 2 ** 20:8.1f}" if self.rss is not None else "       -"
+        traced = f"{self.traced / 2 ** 20:8.1f}" if self.traced is not None else "       -"
+        fds = self.fds if self.fds is not None else "-"
+        return f"{self.elapsed:8.0f}s {self.calls:>11,} {rss} {traced} {fds:>5} {self.pools:>6} {self.connections:>6} {self.idle:>6} {self.sessions:>8}"
+
+
+SAMPLE_HEADER = (f"{'elapsed':>9} {'calls':>11} {'rss MiB':>8} {'traced':>8} {'fds':>5} {'pools':>6} {'conns':>6} "
+                 f"{'idle':>6} {'sessions':>8}")
+
+
+class SoakRunner:
+    """ Drives a mixed workload from worker threads until a call count or time limit is reached """
+
+    def __init__(self, client: LicenseAPIClient, mix: Dict[str, float], workers: int = 8, seed: Optional[int] = None):
+        operations = self._operations()
+        unknown = set(mix) - set(operations)
+        if unknown:
+            raise ValueError(f"Unknown operations {sorted(unknown)}, expected some of {sorted(operations)}")
+        self.client = client
+        self.mix = mix
+        self.workers = workers
+        self.seed = seed
+        self.team_ids = list(config.TEAM_IDS.values())
+        self.last_error: Optional[str] = None
+        self._operations_by_name = operations
+        # Per-worker counters, so worker threads never update the same slot
+        self._counts = [0] * workers
+        self._errors = [0] * workers
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._licenses: List[Dict[str, List[str]]] = []
+
+    def _operations(self) -> Dict[str, Callable[[int, random.Random, int], bool]]:
+        return {
+            "get_licenses": self._get_licenses,
+            "get_team_licenses": self._get_team_licenses,
+            "assign_revoke": self._assign_revoke,
+            "change_team": self._change_team,
+            "rejected": self._rejected,
+        }
+
+    @property
+    def calls(self) -> int:
+        return sum(self._counts)
+
+    @property
+    def errors(self) -> int:
+        return sum(self._errors)
+
+    def start(self):
+        """ Split available licenses between workers, so concurrent assigns never compete """
+        inventory = self.client.get_license_inventory()
+        available = inventory.available_ids()
+        if len(available) < self.workers * 2:
+            raise Exception(f"Need at least {self.workers * 2} available licenses, found {len(available)}")
+        for worker in range(self.workers):
+            owned = available[worker::self.workers]
+            self._licenses.append({"assign": owned[1:], "move": owned[:1]})
+        for worker in range(self.workers):
+            thread = threading.Thread(target=self._run, args=(worker,), name=f"soak-{worker}", daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def stop(self):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+
+    def _run(self, worker: int):
+        rng = random.Random(None if self.seed is None else self.seed + worker)
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        iteration = 0
+        while not self._stop.is_set():
+            name = rng.choices(names, weights)[0]
+            try:
+                ok = self._operations_by_name[name](worker, rng, iteration)
+            except Exception as e:
+                ok = False
+                self.last_error = f"{name}: {type(e).__name__}: {e}"
+            if not ok:
+                self._errors[worker] += 1
+            iteration += 1
+
+    def _count(self, worker: int, calls: int = 1):
+        self._counts[worker] += calls
+
+    def _get_licenses(self, worker: int, rng: random.Random, iteration: int) -> bool:
+        response = self.client.get_licenses()
+        self._count(worker)
+        return response.status_code == status_codes.OK and len(response.content) > 0
+
+    def _get_team_licenses(self, worker: int, rng: random.Random, iteration: int) -> bool:
+        response = self.client.get_team_licenses(rng.choice(self.team_ids), assigned=rng.choice([None, True, False]))
+        self._count(worker)
+        return response.status_code == status_codes.OK
+
+    def _assign_revoke(self, worker: int, rng: random.Random, iteration: int) -> bool:
+        license_id = rng.choice(self._licenses[worker]["assign"])
+        assigned = self.client.assign_license(
+            email=f"soak.{worker}.{iteration}{config.TEST_EMAIL_DOMAIN}",
+            first_name="Soak",
+            last_name="Test",
+            license_id=license_id
+        )
+        revoked = self.client.revoke_license(license_id)
+        self._count(worker, 2)
+        return assigned.status_code == status_codes.OK and revoked.status_code == status_codes.OK
+
+    def _change_team(self, worker: int, rng: random.Random, iteration: int) -> bool:
+        license_id = self._licenses[worker]["move"][0]
+        ok = True
+        # There and back, so the inventory is unchanged afterwards
+        for target_team_id in (self.team_ids[-1], self.team_ids[0]):
+            response = self.client.change_license_team([license_id], target_team_id)
+            self._count(worker)
+            ok = ok and response.status_code == status_codes.OK
+        return ok
+
+    def _rejected(self, worker: int, rng: random.Random, iteration: int) -> bool:
+        """ Error responses exercise different code paths (and bodies) than successful ones """
+        if rng.random() < 0.5:
+            response = self.client.assign_license(raw_json='{"licenseId": ')
+        else:
+            response = self.client.revoke_license(f"missing-{iteration}")
+        self._count(worker)
+        return response.status_code >= 400
+
+
+def _median(samples: List[Sample], field: str) -> Optional[float]:
+    values = [getattr(sample, field) for sample in samples if getattr(sample, field) is not None]
+    return statistics.median(values) if values else None
+
+
+def evaluate(
+    baseline: List[Sample],
+    final: List[Sample],
+    max_rss_growth: float,
+    max_traced_growth: float,
+    max_fd_growth: int,
+    max_connections: int
+) -> List[str]:
+    """ Threshold violations between the baseline and final samples (growths in MiB) """
+    failures = []
+    for field, label, limit, scale in (
+        ("rss", "RSS", max_rss_growth, 2 ** 20),
+        ("traced", "traced memory", max_traced_growth, 2 ** 20),
+        ("fds", "open file descriptors", max_fd_growth, 1),
+    ):
+        before, after = _median(baseline, field), _median(final, field)
+        if before is None or after is None:
+            continue
+        growth = (after - before) / scale
+        if growth > limit:
+            unit = " MiB" if scale > 1 else ""
+            failures.append(f"{label} grew by {growth:.1f}{unit} (limit {limit}{unit})")
+    if final[-1].pools > max(sample.pools for sample in baseline):
+        failures.append(f"connection pools grew from {baseline[-1].pools} to {final[-1].pools}")
+    # More connections than pool slots means more threads than slots, or connections churned instead of reused
+    limit = max_connections * max(1, final[-1].pools)
+    if final[-1].connections > limit:
+        failures.append(f"{final[-1].connections} connections opened by the pools exceed the limit of {limit}")
+    if final[-1].sessions > max(sample.sessions for sample in baseline):
+        failures.append(f"per-thread sessions grew from {baseline[-1].sessions} to {final[-1].sessions}")
+    return failures
+
+
+def format_top_allocators(baseline: tracemalloc.Snapshot, limit: int = TOP_ALLOCATORS) -> str:
+    current = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+    ])
+    lines = ["Top allocators since warm-up (tracemalloc):"]
+    growth = sorted(current.compare_to(baseline, "lineno"), key=lambda stat: stat.size_diff, reverse=True)
+    for stat in growth[:limit]:
+        frame = stat.traceback[0]
+        lines.append(f"  {stat.size_diff / 1024:+10.1f} KiB {stat.count_diff:+8} blocks  {frame.filename}:{frame.lineno}")
+    return "\n".join(lines)
+
+
+def _serve_standin(ports: "multiprocessing.Queue", stop: "multiprocessing.Event"):
+    server = serve_license_model(model=LicenseModel(licenses_per_team=200, assigned_per_team=20))
+    ports.put(server.server_port)
+    stop.wait()
+    server.shutdown()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m utils.soak", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1_000_000, help="Stop after this many API calls")
+    parser.add_argument("--duration", type=float, help="Stop after this many seconds (whichever limit comes first)")
+    parser.add_argument("--workers", type=int, default=8, help="Threads sharing the client")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix(DEFAULT_MIX),
+                        help=f"Weighted operation mix (default: {DEFAULT_MIX})")
+    parser.add_argument("--interval", type=float, default=10, help="Seconds between resource samples")
+    parser.add_argument("--warmup", type=float, default=30, help="Seconds before the baseline samples are taken")
+    parser.add_argument("--seed", type=int, help="Seed for the operation mix")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Skip allocation tracing (faster, no allocator report)")
+    parser.add_argument("--max-rss-growth", type=float, default=32, help="Allowed RSS growth after warm-up, MiB")
+    parser.add_argument("--max-traced-growth", type=float, default=16, help="Allowed traced memory growth after warm-up, MiB")
+    parser.add_argument("--max-fd-growth", type=int, default=4, help="Allowed growth of open file descriptors")
+    args = parser.parse_args(argv)
+
+    # The stand-in runs in a child process: its memory stays out of the measurements and it does not share the GIL
+    ports: multiprocessing.Queue = multiprocessing.Queue()
+    stop_server = multiprocessing.Event()
+    server = multiprocessing.Process(target=_serve_standin, args=(ports, stop_server), name="soak-stand-in", daemon=True)
+    server.start()
+    base_url = f"http://127.0.0.1:{ports.get(timeout=30)}{urlparse(config.BASE_URL).path}"
+
+    if not args.no_tracemalloc:
+        tracemalloc.start()
+    fds_before = open_fds()
+    client = LicenseAPIClient(thread_safe=True, base_url=base_url, max_retries=0)
+    runner = SoakRunner(client, args.mix, args.workers, args.seed)
+    print(f"Soaking {base_url} with {args.workers} workers, mix {args.mix}")
+    print(SAMPLE_HEADER)
+
+    samples: List[Sample] = []
+    baseline_snapshot = None
+    baseline_count = None
+    start = time.perf_counter()
+    try:
+        runner.start()
+        while True:
+            time.sleep(args.interval)
+            elapsed = time.perf_counter() - start
+            samples.append(Sample(elapsed, runner.calls, client))
+            print(samples[-1].format(), flush=True)
+            if baseline_count is None and elapsed >= args.warmup:
+                # The baseline is taken once connections, caches and the model have settled
+                baseline_count = len(samples)
+                if tracemalloc.is_tracing():
+                    baseline_snapshot = tracemalloc.take_snapshot()
+            if runner.calls >= args.calls or (args.duration is not None and elapsed >= args.duration):
+                break
+    finally:
+        runner.stop()
+
+    elapsed = time.perf_counter() - start
+    print(f"\n{runner.calls:,} calls in {elapsed:.0f}s ({runner.calls / elapsed:,.0f}/s), {runner.errors} failed operation(s)")
+    if runner.last_error:
+        print(f"Last error: {runner.last_error}")
+
+    failures = []
+    if baseline_count is None or len(samples) - baseline_count < COMPARED_SAMPLES:
+        failures.append("run too short to compare against the warm-up baseline; raise --calls/--duration or lower --warmup/--interval")
+    else:
+        baseline = samples[baseline_count - 1:baseline_count - 1 + COMPARED_SAMPLES]
+        failures.extend(evaluate(
+            baseline, samples[-COMPARED_SAMPLES:], args.max_rss_growth, args.max_traced_growth, args.max_fd_growth,
+            max_connections=config.POOL_MAXSIZE
+        ))
+    if baseline_snapshot is not None:
+        print(format_top_allocators(baseline_snapshot))
+
+    # Closing the client must hand every pooled socket back to the OS
+    client.close()
+    stop_server.set()
+    server.join()
+    fds_after = open_fds()
+    if fds_before is not None and fds_after is not None:
+        print(f"Open file descriptors: {fds_before} before the client, {fds_after} after close()")
+        if fds_after > fds_before + args.max_fd_growth:
+            failures.append(f"{fds_after - fds_before} file descriptors still open after client.close()")
+
+    if runner.errors:
+        failures.append(f"{runner.errors} operation(s) failed")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    if not failures:
+        print("PASS: no growth beyond the thresholds")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
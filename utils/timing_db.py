@@ -0,0 +1,269 @@
+"""
+Persistent test timing database with latency regression report
+
+Usage:
+    python -m utils.timing_db report [--db reports/timings.db] [--baseline-runs 5] [--threshold 0.25]
+"""
+import argparse
+import sqlite3
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import pytest
+
+from utils.latency import normalize_endpoint, percentile
+
+
+TIMING_DB_FILE = "reports/timings.db"
+
+# Relative growth of p50/p95 over the baseline that counts as a regression
+REGRESSION_THRESHOLD = 0.25
+# Absolute growth (seconds) below which a change is treated as noise
+REGRESSION_MIN_DELTA = 0.05
+BASELINE_RUNS = 5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS test_timings (
+    run_id TEXT NOT NULL,
+    nodeid TEXT NOT NULL,
+    setup REAL NOT NULL DEFAULT 0,
+    call REAL NOT NULL DEFAULT 0,
+    teardown REAL NOT NULL DEFAULT 0,
+    outcome TEXT
+);
+CREATE TABLE IF NOT EXISTS request_timings (
+    run_id TEXT NOT NULL,
+    nodeid TEXT,
+    method TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    status_code INTEGER,
+    duration REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_test_timings_run ON test_timings (run_id);
+CREATE INDEX IF NOT EXISTS idx_request_timings_run ON request_timings (run_id);
+"""
+
+class TimingDatabase:
+    """ SQLite store of per-test phase timings and per-request latencies across runs """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # xdist workers write concurrently at session end, so wait on the lock instead of failing
+        self.connection = sqlite3.connect(str(self.path), timeout=30)
+        self.connection.executescript(SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def start_run(self, run_id: str):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR IGNORE INTO runs (run_id, started_at) VALUES (?, ?)",
+                (run_id, time.time())
+            )
+
+    def add_test_timings(self, run_id: str, rows: List[Tuple[str, float, float, float, Optional[str]]]):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO test_timings (run_id, nodeid, setup, call, teardown, outcome) VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, *row) for row in rows]
+            )
+
+    def add_request_timings(self, run_id: str, rows: List[Tuple[Optional[str], str, str, Optional[int], float]]):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO request_timings (run_id, nodeid, method, endpoint, status_code, duration) VALUES (?, ?, ?, ?, ?, ?)",
+                [(run_id, *row) for row in rows]
+            )
+
+    def recent_runs(self, limit: int) -> List[str]:
+        """ Most recent run IDs, newest first """
+        rows = self.connection.execute(
+            "SELECT run_id FROM runs ORDER BY started_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def test_samples(self, run_ids: List[str]) -> Dict[str, List[float]]:
+        """ Total test durations (setup + call + teardown) per test for the given runs """
+        return self._samples(
+            "SELECT nodeid, setup + call + teardown FROM test_timings WHERE run_id IN ({})", run_ids
+        )
+
+    def endpoint_samples(self, run_ids: List[str]) -> Dict[str, List[float]]:
+        """ Request durations per 'METHOD endpoint' for the given runs """
+        return self._samples(
+            "SELECT method || ' ' || endpoint, duration FROM request_timings WHERE run_id IN ({})", run_ids
+        )
+
+    def _samples(self, query: str, run_ids: List[str]) -> Dict[str, List[float]]:
+        samples: Dict[str, List[float]] = {}
+        if not run_ids:
+            return samples
+        placeholders = ", ".join("?" for _ in run_ids)
+        for key, value in self.connection.execute(query.format(placeholders), run_ids):
+            samples.setdefault(key, []).append(value)
+        return samples
+
+
+class TimingRecorder:
+    """ Records setup/call/teardown durations and API request latencies into the timing database """
+
+    def __init__(self, db_path: Path, run_id: str, is_worker: bool):
+        self.db_path = db_path
+        self.run_id = run_id
+        self.is_worker = is_worker
+        self.current_nodeid: Optional[str] = None
+        self.test_timings: Dict[str, Dict[str, float]] = {}
+        self.outcomes: Dict[str, str] = {}
+        self.request_timings: List[Tuple[Optional[str], str, str, Optional[int], float]] = []
+
+    def on_request(self, method: str, endpoint: str, status_code: Optional[int], elapsed: float):
+        self.request_timings.append(
+            (self.current_nodeid, method, normalize_endpoint(endpoint), status_code, elapsed)
+        )
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item):
+        self.current_nodeid = item.nodeid
+        yield
+        self.current_nodeid = None
+
+    def pytest_runtest_logreport(self, report):
+        # Under xdist the controller sees every worker's reports; workers only record requests
+        if self.is_worker:
+            return
+        self.test_timings.setdefault(report.nodeid, {})[report.when] = report.duration
+        if report.when == "call" or report.outcome != "passed":
+            self.outcomes.setdefault(report.nodeid, report.outcome)
+
+    @pytest.hookimpl(optionalhook=True)
+    def pytest_configure_node(self, node):
+        node.workerinput["timing_run_id"] = self.run_id
+
+    def pytest_sessionfinish(self, session):
+        database = TimingDatabase(self.db_path)
+        try:
+            database.start_run(self.run_id)
+            database.add_test_timings(self.run_id, [
+                (nodeid, phases.get("setup", 0.0), phases.get("call", 0.0), phases.get("teardown", 0.0),
+                 self.outcomes.get(nodeid, "passed"))
+                for nodeid, phases in self.test_timings.items()
+            ])
+            database.add_request_timings(self.run_id, self.request_timings)
+        finally:
+            database.close()
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("timing-db")
+    group.addoption(
+        "--timing-db",
+        action="store",
+        default=TIMING_DB_FILE,
+        help=f"SQLite database for per-test and per-request timings (default: {TIMING_DB_FILE})"
+    )
+    group.addoption(
+        "--no-timing-db",
+        action="store_true",
+        default=False,
+        help="Do not record timings for this run"
+    )
+
+
+def pytest_configure(config):
+    if config.getoption("no_timing_db"):
+        return
+    from utils.api_client import APIClient
+
+    db_path = Path(config.getoption("timing_db"))
+    if not db_path.is_absolute():
+        db_path = config.rootpath / db_path
+
+    workerinput = getattr(config, "workerinput", None)
+    if workerinput is not None:
+        run_id = workerinput.get("timing_run_id", uuid.uuid4().hex)
+        recorder = TimingRecorder(db_path, run_id, is_worker=True)
+    else:
+        recorder = TimingRecorder(db_path, uuid.uuid4().hex, is_worker=False)
+
+    APIClient.request_listeners.append(recorder.on_request)
+    config.pluginmanager.register(recorder, "timing-recorder")
+    config.add_cleanup(lambda: APIClient.request_listeners.remove(recorder.on_request))
+
+
+def find_regressions(
+    baseline: Dict[str, List[float]],
+    current: Dict[str, List[float]],
+    threshold: float = REGRESSION_THRESHOLD,
+    min_delta: float = REGRESSION_MIN_DELTA
+) -> List[Tuple[str, str, float, float]]:
+    """ Return (name, stat, baseline, current) for every p50/p95 that grew beyond the threshold """
+    regressions = []
+    for name, values in sorted(current.items()):
+        if name not in baseline:
+            continue
+        for stat, pct in (("p50", 50), ("p95", 95)):
+            before = percentile(baseline[name], pct)
+            after = percentile(values, pct)
+            if after - before > min_delta and after > before * (1 + threshold):
+                regressions.append((name, stat, before, after))
+    return regressions
+
+
+def report(args) -> int:
+    database = TimingDatabase(Path(args.db))
+    try:
+        runs = database.recent_runs(args.current_runs + args.baseline_runs)
+        current_runs, baseline_runs = runs[:args.current_runs], runs[args.current_runs:]
+        if not baseline_runs:
+            print(f"Not enough runs in {args.db} to compare (found {len(runs)})")
+            return 0
+
+        sections = [
+            ("Tests", database.test_samples(baseline_runs), database.test_samples(current_runs)),
+            ("Endpoints", database.endpoint_samples(baseline_runs), database.endpoint_samples(current_runs)),
+        ]
+    finally:
+        database.close()
+
+    print(f"Comparing {len(current_runs)} current run(s) against {len(baseline_runs)} baseline run(s), "
+          f"threshold +{args.threshold:.0%}")
+    regression_count = 0
+    for title, baseline, current in sections:
+        regressions = find_regressions(baseline, current, args.threshold, args.min_delta)
+        regression_count += len(regressions)
+        print(f"\n{title}: {len(regressions)} regression(s)")
+        for name, stat, before, after in regressions:
+            # A zero baseline (e.g. a test that was skipped) has no meaningful relative growth
+            growth = f"+{after / before - 1:.0%}" if before > 0 else "from zero"
+            print(f"  {stat} {before:.3f}s -> {after:.3f}s ({growth})  {name}")
+
+    return 1 if regression_count else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m utils.timing_db", description=__doc__.strip().splitlines()[0])
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    report_parser = subparsers.add_parser("report", help="Flag tests and endpoints whose p50/p95 regressed")
+    report_parser.add_argument("--db", default=TIMING_DB_FILE, help="Timing database path")
+    report_parser.add_argument("--current-runs", type=int, default=1, help="Number of latest runs to evaluate")
+    report_parser.add_argument("--baseline-runs", type=int, default=BASELINE_RUNS, help="Number of preceding runs forming the baseline")
+    report_parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="Relative growth that counts as a regression")
+    report_parser.add_argument("--min-delta", type=float, default=REGRESSION_MIN_DELTA, help="Absolute growth in seconds ignored as noise")
+    report_parser.set_defaults(handler=report)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
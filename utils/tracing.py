@@ -0,0 +1,231 @@
+"""
+Span tracing for tests and API calls, exported as OTLP JSON lines
+
+Every test gets a root span, every logical API call (APIClient._make_request) a child span, and
+every HTTP attempt under it a client span, including the retries urllib3 performs internally.
+Each line of the export file is an OTLP/JSON ExportTraceServiceRequest, the format written by the
+OpenTelemetry collector's file exporter, so traces can be loaded into Jaeger, Tempo or otel-tui.
+Tracing is off until an exporter is configured; the pytest side lives in utils/tracing_plugin.py.
+"""
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+
+SERVICE_NAME = "jetbrains-api-automation"
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_CLIENT = 3
+
+STATUS_UNSET = 0
+STATUS_ERROR = 2
+
+
+class Span:
+    """ A timed operation in a trace; attempts are tracked on the span of the logical call """
+
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "kind", "start_ns", "end_ns",
+                 "attributes", "status_code", "status_message", "attempt", "attempt_count")
+
+    recording = True
+
+    def __init__(self, name: str, kind: int, parent: Optional["Span"], attributes: Optional[Dict[str, Any]] = None):
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent is not None else ""
+        self.name = name
+        self.kind = kind
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.status_code = STATUS_UNSET
+        self.status_message = ""
+        # Open HTTP attempt span and number of attempts started under this span
+        self.attempt: Optional[Span] = None
+        self.attempt_count = 0
+
+    def set_attribute(self, key: str, value: Any):
+        self.attributes[key] = value
+
+    def set_error(self, message: str):
+        self.status_code = STATUS_ERROR
+        self.status_message = message
+
+    @property
+    def traceparent(self) -> str:
+        """ W3C trace context header value pointing at this span """
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+    def end(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            tracer.export(self)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns),
+            "attributes": [_otlp_attribute(key, value) for key, value in self.attributes.items() if value is not None],
+            "status": {"code": self.status_code, "message": self.status_message},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+class _NonRecordingSpan:
+    """ Stand-in used while tracing is disabled, so call sites need no checks """
+
+    recording = False
+    traceparent = None
+
+    def set_attribute(self, key: str, value: Any):
+        pass
+
+    def set_error(self, message: str):
+        pass
+
+
+NON_RECORDING_SPAN = _NonRecordingSpan()
+
+_current_span: "ContextVar[Optional[Span]]" = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    """ The innermost active span, None outside any span or while tracing is disabled """
+    return _current_span.get()
+
+
+def _otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        typed = {"boolValue": value}
+    elif isinstance(value, int):
+        typed = {"intValue": str(value)}
+    elif isinstance(value, float):
+        typed = {"doubleValue": value}
+    else:
+        typed = {"stringValue": str(value)}
+    return {"key": key, "value": typed}
+
+
+class SpanExporter:
+    """ Appends finished spans to a file, one OTLP/JSON ExportTraceServiceRequest per line """
+
+    def __init__(self, path: Path):
+        self.path = path
+        # Opened on the first span, so processes that trace nothing (e.g. the xdist controller) leave no file
+        self._file = None
+        self._lock = threading.Lock()
+
+    def export(self, spans: List[Span]):
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_otlp_attribute("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": [span.to_otlp() for span in spans]}],
+            }]
+        }
+        line = json.dumps(request, separators=(",", ":")) + "\n"
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line)
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class Tracer:
+    """ Creates spans and hands finished ones to the exporter; disabled (no-op) until configured """
+
+    def __init__(self):
+        self.exporter: Optional[SpanExporter] = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def configure(self, exporter: SpanExporter):
+        self.exporter = exporter
+
+    def shutdown(self):
+        exporter, self.exporter = self.exporter, None
+        if exporter is not None:
+            exporter.close()
+
+    def export(self, span: Span):
+        exporter = self.exporter
+        if exporter is not None:
+            exporter.export([span])
+
+    @contextmanager
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: Optional[Dict[str, Any]] = None) -> Iterator[Any]:
+        """ Run the block as a child of the current span; exceptions mark the span as failed """
+        if not self.enabled:
+            yield NON_RECORDING_SPAN
+            return
+        span = Span(name, kind, current_span(), attributes)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.set_error(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_attempt(operation=span)
+            span.end()
+
+    def begin_attempt(self):
+        """
+        Open a client span for the next HTTP attempt of the current logical call, which must carry
+        http.request.method and url.full attributes
+        """
+        operation = current_span()
+        if operation is None or not self.enabled:
+            return
+        self.end_attempt(operation=operation)
+        method = operation.attributes.get("http.request.method")
+        attempt = Span(f"{method} attempt {operation.attempt_count + 1}", SPAN_KIND_CLIENT, operation, {
+            "http.request.method": method,
+            "url.full": operation.attributes.get("url.full"),
+            "http.request.resend_count": operation.attempt_count,
+        })
+        operation.attempt = attempt
+        operation.attempt_count += 1
+
+    def end_attempt(
+        self,
+        status_code: Optional[int] = None,
+        error: Optional[BaseException] = None,
+        operation: Optional[Span] = None
+    ):
+        """ Close the open attempt span of the current (or given) logical call with its outcome """
+        operation = operation or current_span()
+        if operation is None or operation.attempt is None:
+            return
+        attempt, operation.attempt = operation.attempt, None
+        if status_code is not None:
+            attempt.set_attribute("http.response.status_code", status_code)
+            if status_code >= 400:
+                attempt.set_error(str(status_code))
+        if error is not None:
+            attempt.set_attribute("error.type", type(error).__name__)
+            attempt.set_error(str(error))
+        attempt.end()
+
+
+tracer = Tracer()
@@ -0,0 +1,68 @@
+"""
+Per-test span tracing for pytest
+
+Usage:
+    python -m pytest --tracing [--tracing-dir reports/traces]
+
+Spans go to <tracing-dir>/traces-<worker>.jsonl as OTLP JSON lines (see utils/tracing.py).
+"""
+from pathlib import Path
+
+import pytest
+
+from utils.tracing import SpanExporter, current_span, tracer
+
+
+TRACE_DIR = "reports/traces"
+
+
+class TraceRecorder:
+    """ Wraps each test (setup, call and teardown) in a root span """
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item):
+        with tracer.span(item.nodeid, attributes={"test.nodeid": item.nodeid, "test.name": item.name}):
+            yield
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_makereport(self, item, call):
+        outcome = yield
+        report = outcome.get_result()
+        span = current_span()
+        if span is None:
+            return
+        span.set_attribute(f"test.{report.when}.outcome", report.outcome)
+        if report.failed:
+            span.set_error(f"{report.when} failed")
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("tracing")
+    group.addoption(
+        "--tracing",
+        action="store_true",
+        default=False,
+        help="Record spans for tests, API calls and HTTP attempts as OTLP JSON lines"
+    )
+    group.addoption(
+        "--tracing-dir",
+        action="store",
+        default=TRACE_DIR,
+        help=f"Directory for span files, one per xdist worker (default: {TRACE_DIR})"
+    )
+
+
+def pytest_configure(config):
+    if not config.getoption("tracing"):
+        return
+    trace_dir = Path(config.getoption("tracing_dir"))
+    if not trace_dir.is_absolute():
+        trace_dir = config.rootpath / trace_dir
+    # Separate files per process, so concurrent workers never interleave partial lines
+    worker_id = config.workerinput["workerid"] if hasattr(config, "workerinput") else "main"
+    tracer.configure(SpanExporter(trace_dir / f"traces-{worker_id}.jsonl"))
+    config.pluginmanager.register(TraceRecorder(), "trace-recorder")
+
+
+def pytest_unconfigure(config):
+    tracer.shutdown()